@@ -1,8 +1,10 @@
+import functools
 from fastapi import Depends, HTTPException, status
 from fastapi.security import OAuth2PasswordBearer
 from sqlalchemy.orm import Session
 from google.oauth2 import id_token
 from google.auth.transport import requests
+import requests as req
 from app.core.config import settings
 from app.db.base import get_db
 from app.models.user import User
@@ -12,6 +14,12 @@ oauth2_scheme = OAuth2PasswordBearer(tokenUrl="token")
 # Replace with your actual Google Client ID
 GOOGLE_CLIENT_ID = settings.GOOGLE_CLIENT_ID
 
+# One keep-alive session for Google's certs and userinfo endpoints, instead of a new connection per request
+_google_session = req.Session()
+_google_request = functools.partial(
+    requests.Request(session=_google_session), timeout=settings.GOOGLE_AUTH_TIMEOUT_SECONDS
+)
+
 def get_current_user(token: str = Depends(oauth2_scheme), db: Session = Depends(get_db)) -> User:
     credentials_exception = HTTPException(
         status_code=status.HTTP_401_UNAUTHORIZED,
@@ -23,11 +31,17 @@ def get_current_user(token: str = Depends(oauth2_scheme), db: Session = Depends(
         # Verify the token with Google
         # Try as ID Token first (JWT)
         try:
-            idinfo = id_token.verify_oauth2_token(token, requests.Request(), GOOGLE_CLIENT_ID)
+            idinfo = id_token.verify_oauth2_token(token, _google_request, GOOGLE_CLIENT_ID)
         except ValueError:
             # Fallback: Try as Access Token
-            import requests as req
-            resp = req.get(f"https://www.googleapis.com/oauth2/v3/userinfo", headers={"Authorization": f"Bearer {token}"})
+            try:
+                resp = _google_session.get(
+                    "https://www.googleapis.com/oauth2/v3/userinfo",
+                    headers={"Authorization": f"Bearer {token}"},
+                    timeout=settings.GOOGLE_AUTH_TIMEOUT_SECONDS,
+                )
+            except req.RequestException as e:
+                raise ValueError(f"Userinfo request failed: {e}")
             if resp.status_code != 200:
                 raise ValueError("Invalid Access Token")
             idinfo = resp.json()
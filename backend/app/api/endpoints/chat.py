@@ -1,15 +1,26 @@
+import asyncio
 from typing import List, Dict, Any
-from fastapi import APIRouter, Depends, HTTPException
+from fastapi import APIRouter, Depends, HTTPException, Response
 from sqlalchemy.orm import Session
 from pydantic import BaseModel
 from datetime import datetime
 from zoneinfo import ZoneInfo
 
-from app.db.base import get_db
+from app.core.config import settings
+from app.db.base import get_db, SessionLocal, release_connection
 from app.api.deps import get_current_user
 from app.models.user import User
 from app.services.llm_service import llm_service
 from app.models.meal import Meal
+from app.models.chat import ChatSession, ChatMessage
+from app.schemas.chat import (
+    ChatSession as ChatSessionSchema,
+    ChatSessionCreate,
+    ChatSessionDetail,
+    SessionMessageRequest,
+)
+from app.services.chat_history import chat_history, trim_history
+from app.api.streaming import relay_text, sse_response
 
 router = APIRouter()
 
@@ -19,6 +30,67 @@ class ChatRequest(BaseModel):
 
 class ChatResponse(BaseModel):
     response: str
+    session_id: int | None = None
+
+def _build_context(db: Session, current_user: User) -> str:
+    """Today's intake, last meal and language instructions prepended to the user's message."""
+    # Fetch today's meals for context
+    # Use Eastern Time (ET) for "today"
+    utc = ZoneInfo("UTC")
+    et = ZoneInfo("America/New_York")
+    now_et = datetime.now(et)
+    today = now_et.date()
+    
+    recent_meals = db.query(Meal).filter(Meal.user_id == current_user.id).order_by(Meal.created_at.desc()).limit(50).all()
+    print(f"DEBUG: Found {len(recent_meals)} recent meals")
+    
+    todays_meals = []
+    for m in recent_meals:
+        # Convert stored UTC time to ET
+        # Assuming m.created_at is naive UTC as per default SQLAlchemy behavior
+        if m.created_at:
+            created_at_utc = m.created_at.replace(tzinfo=utc)
+            created_at_et = created_at_utc.astimezone(et)
+            if created_at_et.date() == today:
+                todays_meals.append(m)
+    total_calories = sum(m.calories for m in todays_meals)
+    
+    meal_summary = ", ".join([f"{m.food_name} ({m.calories} kcal)" for m in todays_meals])
+    
+    last_meal = recent_meals[0] if recent_meals else None
+    last_meal_info = "None"
+    if last_meal:
+        last_meal_info = f"{last_meal.food_name} ({last_meal.calories} kcal) on {last_meal.created_at.strftime('%Y-%m-%d %H:%M')}"
+    
+    
+    # Language mapping for clearer LLM instructions
+    lang_map = {
+        'en': 'English',
+        'es': 'Spanish',
+        'hi': 'Hindi',
+        'fr': 'French',
+        'de': 'German',
+        'zh': 'Chinese',
+        'ja': 'Japanese'
+    }
+    user_lang_code = current_user.language or 'en'
+    user_lang_name = lang_map.get(user_lang_code, 'English')
+    
+    print(f"DEBUG: User language is {user_lang_code} ({user_lang_name})")
+
+    target_cals = current_user.target_calories or 2000
+
+    return (
+        f"Context: Today is {today}. "
+        f"The user has consumed {total_calories} kcal today. "
+        f"Daily goal is {target_cals} kcal. "
+        f"Meals eaten today: {meal_summary if meal_summary else 'None yet'}. "
+        f"Last recorded meal: {last_meal_info}. "
+        f"SYSTEM INSTRUCTION: You represent NutriVision, an AI Nutrition Coach. "
+        f"The user's preferred language is {user_lang_name}. "
+        f"You MUST respond entirely in {user_lang_name}. "
+        f"Do not respond in English unless the user asks you to switch languages."
+    )
 
 @router.post("/message", response_model=ChatResponse)
 async def chat_message(
@@ -26,67 +98,128 @@ async def chat_message(
     db: Session = Depends(get_db),
     current_user: User = Depends(get_current_user)
 ):
+    """Stateless chat with client-sent history (trimmed to the token budget); see /sessions."""
     try:
-        # Fetch today's meals for context
-        # Fetch today's meals for context
-        # Use Eastern Time (ET) for "today"
-        utc = ZoneInfo("UTC")
-        et = ZoneInfo("America/New_York")
-        now_et = datetime.now(et)
-        today = now_et.date()
-        
-        recent_meals = db.query(Meal).filter(Meal.user_id == current_user.id).order_by(Meal.created_at.desc()).limit(50).all()
-        print(f"DEBUG: Found {len(recent_meals)} recent meals")
-        
-        todays_meals = []
-        for m in recent_meals:
-            # Convert stored UTC time to ET
-            # Assuming m.created_at is naive UTC as per default SQLAlchemy behavior
-            if m.created_at:
-                created_at_utc = m.created_at.replace(tzinfo=utc)
-                created_at_et = created_at_utc.astimezone(et)
-                if created_at_et.date() == today:
-                    todays_meals.append(m)
-        total_calories = sum(m.calories for m in todays_meals)
-        
-        meal_summary = ", ".join([f"{m.food_name} ({m.calories} kcal)" for m in todays_meals])
-        
-        last_meal = recent_meals[0] if recent_meals else None
-        last_meal_info = "None"
-        if last_meal:
-            last_meal_info = f"{last_meal.food_name} ({last_meal.calories} kcal) on {last_meal.created_at.strftime('%Y-%m-%d %H:%M')}"
-        
-        
-        # Language mapping for clearer LLM instructions
-        lang_map = {
-            'en': 'English',
-            'es': 'Spanish',
-            'hi': 'Hindi',
-            'fr': 'French',
-            'de': 'German',
-            'zh': 'Chinese',
-            'ja': 'Japanese'
-        }
-        user_lang_code = current_user.language or 'en'
-        user_lang_name = lang_map.get(user_lang_code, 'English')
-        
-        print(f"DEBUG: User language is {user_lang_code} ({user_lang_name})")
-
-        target_cals = current_user.target_calories or 2000
-
-        context = (
-            f"Context: Today is {today}. "
-            f"The user has consumed {total_calories} kcal today. "
-            f"Daily goal is {target_cals} kcal. "
-            f"Meals eaten today: {meal_summary if meal_summary else 'None yet'}. "
-            f"Last recorded meal: {last_meal_info}. "
-            f"SYSTEM INSTRUCTION: You represent NutriVision, an AI Nutrition Coach. "
-            f"The user's preferred language is {user_lang_name}. "
-            f"You MUST respond entirely in {user_lang_name}. "
-            f"Do not respond in English unless the user asks you to switch languages."
-        )
-
-        response = await llm_service.generate_chat_response(request.history, request.message, context)
+        context = _build_context(db, current_user)
+        history = trim_history(request.history, settings.CHAT_HISTORY_TOKEN_BUDGET)
+        chat_history.record_prompt(history)
+        release_connection(db)
+        response = await llm_service.generate_chat_response(history, request.message, context, user_id=current_user.id)
         return {"response": response}
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
+
+@router.post("/message/stream")
+async def chat_message_stream(
+    request: ChatRequest,
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_user)
+):
+    """Same as /message, relayed as Server-Sent Events while the reply is generated."""
+    context = _build_context(db, current_user)
+    history = trim_history(request.history, settings.CHAT_HISTORY_TOKEN_BUDGET)
+    chat_history.record_prompt(history)
+    release_connection(db)
+    return sse_response(relay_text(
+        llm_service.stream_chat_response(history, request.message, context, user_id=current_user.id)
+    ))
+
+def _get_session(db: Session, session_id: int, current_user: User) -> ChatSession:
+    session = chat_history.get_session(db, session_id, current_user.id)
+    if session is None:
+        raise HTTPException(status_code=404, detail="Chat session not found")
+    return session
+
+@router.post("/sessions", response_model=ChatSessionSchema)
+def create_session(
+    request: ChatSessionCreate,
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_user)
+):
+    return chat_history.create_session(db, current_user.id, request.title)
+
+@router.get("/sessions", response_model=List[ChatSessionSchema])
+def list_sessions(
+    limit: int = 20,
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_user)
+):
+    return db.query(ChatSession).filter(ChatSession.user_id == current_user.id).order_by(
+        ChatSession.updated_at.desc()
+    ).limit(limit).all()
+
+@router.get("/sessions/{session_id}", response_model=ChatSessionDetail)
+def get_session(
+    session_id: int,
+    limit: int = 100,
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_user)
+):
+    """The session with its latest `limit` messages, oldest first."""
+    session = _get_session(db, session_id, current_user)
+    messages = db.query(ChatMessage).filter(ChatMessage.session_id == session.id).order_by(
+        ChatMessage.id.desc()
+    ).limit(limit).all()
+    return {"session": session, "messages": list(reversed(messages))}
+
+@router.delete("/sessions/{session_id}", status_code=204)
+def delete_session(
+    session_id: int,
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_user)
+):
+    session = _get_session(db, session_id, current_user)
+    db.query(ChatMessage).filter(ChatMessage.session_id == session.id).delete()
+    db.delete(session)
+    db.commit()
+    return Response(status_code=204)
+
+@router.post("/sessions/{session_id}/messages", response_model=ChatResponse)
+async def session_message(
+    session_id: int,
+    request: SessionMessageRequest,
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_user)
+):
+    """
+    Sends a message in a stored session; the server supplies the history
+    (recent turns within the token budget plus the running summary).
+    Failed replies are not stored.
+    """
+    session = _get_session(db, session_id, current_user)
+    context = _build_context(db, current_user) + chat_history.context(session)
+    history = chat_history.window(db, session)
+    release_connection(db)
+    try:
+        response = await llm_service.generate_chat_response(
+            history, request.message, context, strict=True, user_id=current_user.id
+        )
+    except asyncio.TimeoutError:
+        raise HTTPException(status_code=504, detail="The AI Coach is taking too long to respond. Please try again in a moment.")
+    except Exception as e:
+        raise HTTPException(status_code=502, detail=f"Error communicating with AI Coach: {str(e)}")
+    chat_history.record_exchange(db, session, request.message, response)
+    return {"response": response, "session_id": session.id}
+
+@router.post("/sessions/{session_id}/messages/stream")
+async def session_message_stream(
+    session_id: int,
+    request: SessionMessageRequest,
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_user)
+):
+    """Same as /sessions/{id}/messages, relayed as Server-Sent Events; the exchange is stored once the reply completes."""
+    session = _get_session(db, session_id, current_user)
+    context = _build_context(db, current_user) + chat_history.context(session)
+    history = chat_history.window(db, session)
+    release_connection(db)
+
+    def save(text: str):
+        # The request's session may be closed by the time the stream ends
+        with SessionLocal() as stream_db:
+            chat_history.record_exchange(stream_db, stream_db.get(ChatSession, session_id), request.message, text)
+
+    chunks = llm_service.stream_chat_response(
+        history, request.message, context, on_complete=save, user_id=current_user.id
+    )
+    return sse_response(relay_text(chunks))
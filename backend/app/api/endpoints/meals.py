@@ -1,28 +1,47 @@
-from fastapi import APIRouter, UploadFile, File, Depends, HTTPException
+from fastapi import APIRouter, UploadFile, File, Depends, HTTPException, Query
 from sqlalchemy.orm import Session
-from typing import List, Any
+from typing import List, Any, Dict
 import shutil
 import uuid
 from pathlib import Path
 
-from app.db.base import get_db
+from app.db.base import get_db, SessionLocal, release_connection
 from app.services.vision_service import vision_service
-from app.services.llm_service import llm_service
-from app.models.meal import Meal
-from app.schemas.meal import AnalysisResponse, Meal as MealSchema
+from app.services.inference_batcher import InferenceQueueFull
+from app.services.llm_service import llm_service, coaching_profile, advice_inputs
+from app.services.analysis_worker import analysis_worker, job_payload
+from app.models.meal import Meal, AnalysisJob
+from app.schemas.meal import AnalysisResponse, Meal as MealSchema, SimilarMeal, MealAnalysis
 
 from app.api.deps import get_current_user
 from app.models.user import User
 from app.services.nutrition_service import nutrition_service
+from app.services.class_table import class_table
+from app.services.prediction_cache import prediction_cache, image_cache_key
+from app.services.embedding_index import embedding_index
+from app.core.config import settings
+from app.api.streaming import relay_text, sse_response
 
 router = APIRouter()
 
 UPLOAD_DIR = Path("uploads")
 UPLOAD_DIR.mkdir(exist_ok=True)
 
+async def _analyze_image(contents: bytes) -> Dict[str, Any]:
+    """Vision prediction and portion estimate for one image."""
+    prediction = await vision_service.predict_food(contents)
+    if not prediction.get("is_food", True):
+        return {"prediction": prediction}
+    
+    portion = await vision_service.estimate_portion(
+        contents, prediction["food_name"], prediction.get("class_id"), prediction.get("class")
+    )
+    return {"prediction": prediction, "portion": portion}
+
 @router.post("/upload", response_model=AnalysisResponse)
 async def upload_meal(
     file: UploadFile = File(...), 
+    defer_advice: bool = False,
     db: Session = Depends(get_db),
     current_user: User = Depends(get_current_user)
 ):
@@ -34,39 +53,56 @@ async def upload_meal(
     with open(file_path, "wb") as f:
         f.write(contents)
         
-    # 1. Vision Analysis
+    # 1. Vision Analysis (cached per image content)
     try:
-        prediction = await vision_service.predict_food(contents)
-        
-        # Gatekeeper Check
-        if not prediction.get("is_food", True):
-             return {
-                 "meal": None, 
-                 "advice": "This image does not appear to be food. Please upload a photo of a meal.",
-                 "is_food": False
-             }
-             
-        portion = await vision_service.estimate_portion(contents, prediction["food_name"])
+        if settings.PREDICTION_CACHE_ENABLED:
+            await vision_service.ensure_loaded()
+            cache_key = image_cache_key(contents, vision_service.model_version)
+            analysis = await prediction_cache.get_or_compute(cache_key, lambda: _analyze_image(contents))
+        else:
+            analysis = await _analyze_image(contents)
+    except InferenceQueueFull:
+        raise HTTPException(status_code=503, detail="Vision service is busy, please retry shortly.")
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Vision analysis failed: {str(e)}")
     
-    # 2. Nutrition Lookup
-    nutrition_info = await nutrition_service.get_nutrition_info(prediction["food_name"])
+    prediction = analysis["prediction"]
+        
+    # Gatekeeper Check
+    if not prediction.get("is_food", True):
+         return {
+             "meal": None, 
+             "advice": "This image does not appear to be food. Please upload a photo of a meal.",
+             "is_food": False,
+             "model_stage": prediction.get("stage")
+         }
     
+    # 2. Nutrition Lookup: precomputed per class when the table has it, else
+    # by name (cached by the service, so a failed lookup's mock values never
+    # get pinned to this image)
+    entry = class_table.get(prediction.get("class_id"), prediction.get("class"))
+    nutrition_info = class_table.nutrition(entry) if entry else None
+    if nutrition_info is None:
+        nutrition_info = await nutrition_service.get_nutrition_info(prediction["food_name"])
+
     meal_data = {
         **prediction,
-        **portion,
+        **analysis["portion"],
         **nutrition_info
     }
     
-    # 3. LLM Coaching
-    # Mock user profile (augmented with real User data)
-    user_profile = {
-        "goal": "lose weight", 
-        "preferences": "low carb",
-        "language": current_user.language or "en"
-    }
-    advice = await llm_service.generate_dietary_analysis(meal_data, user_profile)
+    # 3. LLM Coaching: by a background job (poll /meals/{id}/analysis), streamed
+    # by the client from /meals/{id}/advice/stream, or inline
+    if defer_advice:
+        advice, analysis_status = "", "deferred"
+    elif settings.ANALYSIS_ASYNC_ENABLED:
+        advice, analysis_status = "", "pending"
+    else:
+        release_connection(db)
+        advice = await llm_service.generate_dietary_analysis(
+            advice_inputs(meal_data), coaching_profile(current_user), user_id=current_user.id
+        )
+        analysis_status = "done"
     
     # 4. Save to DB
     db_meal = Meal(
@@ -79,13 +115,28 @@ async def upload_meal(
         carbs=meal_data["carbs"],
         fats=meal_data["fats"],
         confidence=meal_data["confidence"],
-        analysis_text=advice
+        candidates=meal_data.get("candidates"),
+        analysis_text=advice or None,
+        analysis_status=analysis_status
     )
     db.add(db_meal)
+    db.flush()
+    embedding = prediction.get("embedding")
+    if embedding is not None and vision_service.embedding_version:
+        # Same transaction as the meal, so other workers never see one without the other
+        embedding_index.store(db, db_meal.id, current_user.id, vision_service.embedding_version, embedding)
+    job = None
+    if analysis_status == "pending":
+        job = AnalysisJob(meal_id=db_meal.id, user_id=current_user.id,
+                          payload=job_payload(meal_data, coaching_profile(current_user)))
+        db.add(job)
     db.commit()
     db.refresh(db_meal)
+    if job is not None:
+        analysis_worker.enqueue(job.id)
     
-    return {"meal": db_meal, "advice": advice, "is_food": True}
+    return {"meal": db_meal, "advice": advice, "is_food": True, "model_stage": prediction.get("stage"),
+            "analysis_status": analysis_status}
 
 @router.get("/", response_model=List[MealSchema])
 def get_meals(
@@ -96,3 +147,82 @@ def get_meals(
 ):
     meals = db.query(Meal).filter(Meal.user_id == current_user.id).order_by(Meal.created_at.desc()).offset(skip).limit(limit).all()
     return meals
+
+@router.get("/{meal_id}/analysis", response_model=MealAnalysis)
+def get_meal_analysis(
+    meal_id: int,
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_user)
+):
+    """Poll for advice generated in the background after upload."""
+    meal = db.query(Meal).filter(Meal.id == meal_id, Meal.user_id == current_user.id).first()
+    if meal is None:
+        raise HTTPException(status_code=404, detail="Meal not found")
+    job = db.query(AnalysisJob).filter(AnalysisJob.meal_id == meal_id).order_by(AnalysisJob.id.desc()).first()
+    return {
+        "meal_id": meal.id,
+        # Meals saved before background analysis have no status
+        "status": meal.analysis_status or "done",
+        "analysis_text": meal.analysis_text,
+        "attempts": job.attempts if job else 0,
+        "error": job.last_error if job and meal.analysis_status == "failed" else None,
+    }
+
+@router.get("/{meal_id}/advice/stream")
+def stream_meal_advice(
+    meal_id: int,
+    regenerate: bool = False,
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_user)
+):
+    """
+    Coaching advice for a saved meal as Server-Sent Events, token by token as
+    Gemini generates it (upload with defer_advice=true to get the meal back
+    first). The advice is saved to the meal only once it has been generated in
+    full; timeouts, errors and the mock fallback leave the stored advice alone.
+    Existing advice is replayed as a single event unless `regenerate` is set.
+    """
+    meal = db.query(Meal).filter(Meal.id == meal_id, Meal.user_id == current_user.id).first()
+    if meal is None:
+        raise HTTPException(status_code=404, detail="Meal not found")
+
+    if meal.analysis_text and not regenerate:
+        text = meal.analysis_text
+        async def stored():
+            yield text
+        return sse_response(relay_text(stored()))
+
+    meal_data = advice_inputs(meal)
+
+    def save(text: str):
+        # The request's session may be closed by the time the stream ends
+        with SessionLocal() as session:
+            session.query(Meal).filter(Meal.id == meal_id).update({"analysis_text": text, "analysis_status": "done"})
+            session.commit()
+
+    release_connection(db)
+    chunks = llm_service.stream_dietary_analysis(
+        meal_data, coaching_profile(current_user), fresh=regenerate, on_complete=save, user_id=current_user.id
+    )
+    return sse_response(relay_text(chunks))
+
+@router.get("/{meal_id}/similar", response_model=List[SimilarMeal])
+def get_similar_meals(
+    meal_id: int,
+    limit: int = Query(5, ge=1, le=50),
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_user)
+):
+    if not settings.VISION_EMBEDDINGS_ENABLED:
+        raise HTTPException(status_code=404, detail="Similar meal search is not enabled")
+    meal = db.query(Meal).filter(Meal.id == meal_id, Meal.user_id == current_user.id).first()
+    if meal is None:
+        raise HTTPException(status_code=404, detail="Meal not found")
+
+    vision_service.load()
+    matches = embedding_index.similar(db, meal_id, current_user.id, vision_service.embedding_version, limit)
+    if matches is None:
+        raise HTTPException(status_code=404, detail="No image embedding stored for this meal")
+
+    meals = {m.id: m for m in db.query(Meal).filter(Meal.id.in_([mid for mid, _ in matches])).all()}
+    return [{"meal": meals[mid], "similarity": score} for mid, score in matches if mid in meals]
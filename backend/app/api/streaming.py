@@ -0,0 +1,34 @@
+import json
+from typing import Any, AsyncIterator, Optional
+
+from fastapi.responses import StreamingResponse
+
+# Keep proxies (nginx) from buffering the stream
+SSE_HEADERS = {"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+
+
+def sse_event(data: Any, event: Optional[str] = None) -> str:
+    prefix = f"event: {event}\n" if event else ""
+    return f"{prefix}data: {json.dumps(data)}\n\n"
+
+
+async def relay_text(chunks: AsyncIterator[str]) -> AsyncIterator[str]:
+    """
+    Server-Sent Events for a stream of text chunks: one `{"delta": ...}` event
+    per chunk, then a `done` event with the assembled text. `chunks` is always
+    closed, so a disconnect releases the generation upstream (and its LLM
+    gateway slot) right away.
+    """
+    parts = []
+    try:
+        async for chunk in chunks:
+            parts.append(chunk)
+            yield sse_event({"delta": chunk})
+    finally:
+        if hasattr(chunks, "aclose"):
+            await chunks.aclose()
+    yield sse_event({"text": "".join(parts)}, event="done")
+
+
+def sse_response(events: AsyncIterator[str]) -> StreamingResponse:
+    return StreamingResponse(events, media_type="text/event-stream", headers=SSE_HEADERS)
@@ -12,6 +12,53 @@ class Settings(BaseSettings):
     
     # APIs
     USDA_API_KEY: str | None = None
+    USDA_BASE_URL: str = "https://api.nal.usda.gov/fdc/v1"
+    # Nutrition lookups: "usda" (FoodData Central web API) or "local" (SQLite
+    # database built from the FDC bulk downloads by scripts/import_fdc.py)
+    NUTRITION_BACKEND: str = "usda"
+    FDC_DB_PATH: str = "data/fdc.sqlite"
+    # USDA lookups are cached by normalized food name (in memory, plus a SQLite
+    # file that survives restarts; empty path = memory only). Failures are never cached.
+    NUTRITION_CACHE_MAX_ENTRIES: int = 1024
+    NUTRITION_CACHE_TTL_SECONDS: float = 7 * 24 * 3600.0
+    NUTRITION_CACHE_PATH: str = "data/nutrition_cache.sqlite"
+    # Shared pooled clients for external APIs (see app/services/upstream.py).
+    # Retries only apply to idempotent GETs; the breaker fails fast after
+    # this many consecutive failed requests until the reset period passes.
+    UPSTREAM_HTTP2: bool = True # only if the h2 package is installed
+    UPSTREAM_CONNECT_TIMEOUT_SECONDS: float = 3.0
+    UPSTREAM_BREAKER_FAILURES: int = 5
+    UPSTREAM_BREAKER_RESET_SECONDS: float = 30.0
+    USDA_TIMEOUT_SECONDS: float = 10.0
+    USDA_MAX_CONNECTIONS: int = 20
+    USDA_MAX_CONCURRENCY: int = 10
+    USDA_RETRIES: int = 2
+    # LLM calls go through app/services/llm_gateway.py. "vertex" (Gemini) or
+    # "fake": a deterministic local backend for load tests and CI, no network
+    LLM_BACKEND: str = "vertex"
+    LLM_MODEL: str = "gemini-2.5-pro"
+    # Concurrent LLM calls per process, and per user within that; the rest queue
+    LLM_MAX_CONCURRENCY: int = 16
+    LLM_MAX_CONCURRENCY_PER_USER: int = 2
+    # Deadlines include the wait for a slot. Background jobs and whole streams
+    # get LLM_TIMEOUT_SECONDS; requests a user waits on (chat replies, inline
+    # advice, a stream's first chunk) fall back to a "try again" message sooner
+    LLM_TIMEOUT_SECONDS: float = 60.0
+    LLM_INTERACTIVE_TIMEOUT_SECONDS: float = 20.0
+    # > 0: a non-streaming call still running after this long is duplicated if
+    # there is spare capacity, and the first answer wins (0 = no hedging)
+    LLM_HEDGE_AFTER_SECONDS: float = 0.0
+    # Fake backend: first-token latency drawn from fixed, uniform, lognormal or
+    # exponential around LLM_FAKE_LATENCY_MS (spread = relative width / sigma)
+    LLM_FAKE_LATENCY_MS: float = 800.0
+    LLM_FAKE_LATENCY_DISTRIBUTION: str = "lognormal"
+    LLM_FAKE_LATENCY_SPREAD: float = 0.5
+    LLM_FAKE_TOKEN_MS: float = 20.0
+    LLM_FAKE_TOKENS: int = 60
+    LLM_FAKE_ERROR_RATE: float = 0.0
+    LLM_FAKE_SEED: int = 0
+    # Google token checks have no timeout of their own
+    GOOGLE_AUTH_TIMEOUT_SECONDS: float = 5.0
     OPENAI_API_KEY: str | None = None
     GEMINI_API_KEY: str | None = None
     
@@ -23,6 +70,91 @@ class Settings(BaseSettings):
     # Model Paths
     MODEL_PATH: str = "models/food_classifier.pth"
 
+    # Vision inference backend: "fp32" (fine-tuned ResNet50), "int8" (quantized, CPU only)
+    # or "student" (compact classifier distilled from the ResNet50, see scripts/distill_model.py)
+    VISION_BACKEND: str = "fp32"
+    # .safetensors is preferred; a legacy .pth with the same stem is used if that's all there is
+    VISION_MODEL_PATH: str = "app/models/food_classifier_finetuned.safetensors"
+    VISION_INT8_MODEL_PATH: str = "app/models/food_classifier_int8.pt"
+    VISION_STUDENT_MODEL_PATH: str = "app/models/food_classifier_student.safetensors"
+    VISION_QUANT_ENGINE: str = "fbgemm" # "qnnpack" on ARM nodes
+
+    # Per-class display name, USDA match, per-100g macros and portion, indexed by
+    # classifier output (built by scripts/build_class_table.py); used instead of
+    # runtime text matching when present
+    CLASS_TABLE_PATH: str = "app/models/food_class_table.json"
+
+    # Food/non-food gate head on the classifier's pooled features (see scripts/train_gate.py)
+    VISION_GATE_PATH: str = "app/models/food_gate_head.safetensors"
+    VISION_GATE_THRESHOLD: float = 0.5
+
+    # Confidence-gated cascade: a small model answers first, the full model only
+    # sees images whose top-1 confidence or top-1/top-2 margin falls below these
+    VISION_CASCADE_ENABLED: bool = False
+    VISION_CASCADE_MODEL_PATH: str = "app/models/food_classifier_resnet18.safetensors"
+    VISION_CASCADE_MIN_CONFIDENCE: float = 0.8
+    VISION_CASCADE_MIN_MARGIN: float = 0.3
+
+    # Store a unit-length backbone embedding per upload and serve GET /meals/{id}/similar
+    VISION_EMBEDDINGS_ENABLED: bool = False
+    # Dimensions of the random projection used for candidate search (exact rerank follows)
+    EMBEDDING_INDEX_DIM: int = 128
+
+    # Dummy forwards per batch shape during startup warm-up
+    VISION_WARMUP_ITERATIONS: int = 2
+
+    # Vision inference micro-batching
+    VISION_BATCHING_ENABLED: bool = True
+    VISION_BATCH_MAX_SIZE: int = 8
+    VISION_BATCH_WAIT_MS: float = 10.0
+    VISION_BATCH_QUEUE_DEPTH: int = 64
+
+    # Vision inference executor: decode workers plus one forward thread (0 threads =
+    # the forward thread gets this process's share of the cores, decode workers split it)
+    VISION_EXECUTOR_WORKERS: int = 2
+    VISION_EXECUTOR_QUEUE_DEPTH: int = 32
+    VISION_TORCH_THREADS: int = 0
+
+    # Meal advice is generated by background workers after upload returns (see
+    # app/services/analysis_worker.py); False = generate it inside the upload request
+    ANALYSIS_ASYNC_ENABLED: bool = True
+    ANALYSIS_WORKERS: int = 4 # concurrent Gemini calls per process
+    ANALYSIS_MAX_ATTEMPTS: int = 3
+    ANALYSIS_RETRY_BASE_SECONDS: float = 5.0
+    # A claimed job unfinished after this long is assumed orphaned by a crash and requeued
+    ANALYSIS_JOB_LEASE_SECONDS: float = 300.0
+    ANALYSIS_SWEEP_SECONDS: float = 30.0
+
+    # Generated advice is cached by normalized prompt inputs (food, portion,
+    # calories rounded to ADVICE_CALORIE_BUCKET, likely alternative foods, goal,
+    # language). Each key holds up to ADVICE_CACHE_VARIANTS answers, generated
+    # on the first requests and then picked at random, so repeats vary.
+    ADVICE_CACHE_ENABLED: bool = True
+    ADVICE_CACHE_VARIANTS: int = 3
+    ADVICE_CACHE_MAX_ENTRIES: int = 5000
+    ADVICE_CACHE_TTL_SECONDS: float = 7 * 24 * 3600.0
+    ADVICE_CACHE_PATH: str = "data/advice_cache.sqlite" # empty = memory only
+    ADVICE_CALORIE_BUCKET: int = 50
+    # Runner-up predictions below this confidence don't change the cache key
+    ADVICE_CANDIDATE_MIN_CONFIDENCE: float = 0.2
+
+    # Chat sessions (see app/services/chat_history.py): prompts carry the newest
+    # turns that fit in the token budget (estimated at ~4 chars/token), plus a
+    # running summary of older turns refreshed at most once per N turns
+    CHAT_HISTORY_TOKEN_BUDGET: int = 2000
+    CHAT_HISTORY_MAX_MESSAGES: int = 50
+    CHAT_SUMMARY_EVERY_TURNS: int = 6
+    CHAT_SUMMARY_MAX_TOKENS: int = 300
+
+    # Number of server worker processes (also read by gunicorn.conf.py)
+    WEB_CONCURRENCY: int = 1
+
+    # Content-addressed cache of vision + nutrition results per uploaded image
+    PREDICTION_CACHE_ENABLED: bool = True
+    PREDICTION_CACHE_MAX_ENTRIES: int = 2048
+    PREDICTION_CACHE_TTL_SECONDS: float = 3600.0
+    PREDICTION_CACHE_MAX_MB: int = 32
+
     GOOGLE_CLIENT_ID: str | None = Field(default=None, alias="vite_google_client_id")
 
     GCP_PROJECT_ID: str | None = Field(default="plated-complex-480003-d6", alias="GCP_PROJECT_ID")
@@ -1,4 +1,4 @@
-from sqlalchemy import create_engine
+from sqlalchemy import create_engine, inspect, text
 from sqlalchemy.orm import sessionmaker, declarative_base
 from app.core.config import settings
 
@@ -18,3 +18,31 @@ def get_db():
         yield db
     finally:
         db.close()
+
+def release_connection(db):
+    """
+    Ends the session's transaction so its pooled connection is returned before
+    a long wait (an LLM call or stream); the session reconnects if used again.
+    Otherwise requests queued on the LLM gateway can exhaust the pool. Loaded
+    objects are not expired, so reading them afterwards doesn't reconnect.
+    """
+    expire_on_commit = db.expire_on_commit
+    db.expire_on_commit = False
+    try:
+        db.commit()
+    finally:
+        db.expire_on_commit = expire_on_commit
+
+def ensure_columns(table):
+    """
+    Adds columns of a mapped Table that are missing from the existing database
+    table (create_all only creates new tables). Added columns are nullable,
+    with no server default.
+    """
+    existing = {c["name"] for c in inspect(engine).get_columns(table.name)}
+    missing = [c for c in table.columns if c.name not in existing]
+    with engine.begin() as conn:
+        for column in missing:
+            column_type = column.type.compile(dialect=engine.dialect)
+            conn.execute(text(f'ALTER TABLE {table.name} ADD COLUMN "{column.name}" {column_type}'))
+            print(f"Added column {table.name}.{column.name}")
@@ -1,17 +1,46 @@
 import os
+import asyncio
+from contextlib import asynccontextmanager
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import JSONResponse
 
 from app.api.api import api_router
-from app.db.base import Base, engine
+from app.db.base import Base, engine, ensure_columns
 from app.models.user import User
 from app.models.meal import Meal
-# from app.models.chat import ChatMessager
+from app.services.vision_service import vision_service
+from app.services.prediction_cache import prediction_cache
+from app.services.nutrition_service import nutrition_service
+from app.services import usda_client
+from app.services.upstream import upstream_clients
+from app.services.class_table import class_table
+from app.services.analysis_worker import analysis_worker
+from app.services.advice_cache import advice_cache
+from app.services.embedding_index import embedding_index
+from app.services.chat_history import chat_history
+from app.services.llm_gateway import llm_gateway
+from app.models.chat import ChatSession, ChatMessage
 
-# Create tables
-Base.metadata.create_all(bind=engine)
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # Create tables
+    Base.metadata.create_all(bind=engine)
+    ensure_columns(Meal.__table__)
 
-app = FastAPI(title="NutriVision API", version="0.1.0")
+    # Warm up in the background so /health answers immediately; /ready flips once done
+    warmup_task = asyncio.create_task(vision_service.warm_up())
+    # Pooled keep-alive connections to external APIs, shared by all requests
+    await upstream_clients.start()
+    # Background advice generation; the first sweep also resumes jobs left by a restart
+    await analysis_worker.start()
+    yield
+    warmup_task.cancel()
+    await analysis_worker.stop()
+    await upstream_clients.close()
+    vision_service.executor.shutdown()
+
+app = FastAPI(title="NutriVision API", version="0.1.0", lifespan=lifespan)
 
 from app.core.config import settings
 
@@ -33,3 +62,27 @@ async def root():
 @app.get("/health")
 async def health_check():
     return {"status": "healthy"}
+
+@app.get("/ready")
+async def readiness_check():
+    if vision_service.ready:
+        return {"status": "ready"}
+    if vision_service.warmup_error:
+        return JSONResponse(status_code=503, content={"status": "error", "detail": vision_service.warmup_error})
+    return JSONResponse(status_code=503, content={"status": "warming_up"})
+
+@app.get("/metrics")
+async def metrics():
+    return {
+        "vision": vision_service.stats(),
+        "prediction_cache": prediction_cache.stats(),
+        "nutrition": nutrition_service.stats(),
+        "class_table": class_table.stats(),
+        "analysis_jobs": analysis_worker.stats(),
+        "advice_cache": advice_cache.stats(),
+        "chat": chat_history.stats(),
+        "llm": llm_gateway.stats(),
+        "usda_client": usda_client.stats(),
+        "upstream": upstream_clients.stats(),
+        "embedding_index": embedding_index.stats(),
+    }
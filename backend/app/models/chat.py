@@ -0,0 +1,31 @@
+from sqlalchemy import Column, Integer, String, DateTime, ForeignKey, Text
+from datetime import datetime
+from app.db.base import Base
+
+class ChatSession(Base):
+    """A coach conversation kept server-side; clients only send the new message."""
+    __tablename__ = "chat_sessions"
+
+    id = Column(Integer, primary_key=True, index=True)
+    user_id = Column(Integer, index=True)
+    title = Column(String, nullable=True)
+    turns = Column(Integer, default=0) # Completed user/coach exchanges
+
+    # Running summary of the turns older than the prompt's history window
+    summary = Column(Text, nullable=True)
+    summarized_message_id = Column(Integer, default=0) # Messages up to this id are in the summary
+    summary_turn = Column(Integer, default=0) # `turns` when the summary was last updated
+
+    created_at = Column(DateTime, default=datetime.utcnow)
+    updated_at = Column(DateTime, default=datetime.utcnow)
+
+
+class ChatMessage(Base):
+    __tablename__ = "chat_messages"
+
+    id = Column(Integer, primary_key=True, index=True)
+    session_id = Column(Integer, ForeignKey("chat_sessions.id"), index=True)
+    role = Column(String) # "user" or "assistant"
+    text = Column(Text)
+    tokens = Column(Integer) # Estimated prompt tokens, so windows are sized without re-reading text
+    created_at = Column(DateTime, default=datetime.utcnow)
@@ -1,9 +1,12 @@
+import json
+import torch
 import torch.nn as nn
 import torchvision.models as models
 from torchvision import transforms
+from app.models.weights import load_state_dict_file
 
 class FoodClassifier(nn.Module):
-    def __init__(self, num_classes: int = 101, pretrained: bool = True):
+    def __init__(self, num_classes: int = 101, pretrained: bool = True, with_gate: bool = False):
         super(FoodClassifier, self).__init__()
         # Use ResNet50 as suggested
         weights = models.ResNet50_Weights.DEFAULT if pretrained else None
@@ -12,10 +15,76 @@ class FoodClassifier(nn.Module):
         # Replace the final fully connected layer
         in_features = self.backbone.fc.in_features
         self.backbone.fc = nn.Linear(in_features, num_classes)
+
+        # Optional food/non-food head on the same pooled features (0=Non-Food, 1=Food),
+        # so the gate decision costs no extra backbone forward
+        self.gate = nn.Linear(in_features, 2) if with_gate else None
         
     def forward(self, x):
         return self.backbone(x)
 
+    def extract_features(self, x):
+        """Pooled 2048-d backbone features (everything before the fc layer)."""
+        b = self.backbone
+        x = b.maxpool(b.relu(b.bn1(b.conv1(x))))
+        x = b.layer4(b.layer3(b.layer2(b.layer1(x))))
+        return torch.flatten(b.avgpool(x), 1)
+
+    def forward_with_gate(self, x):
+        """Returns (class logits, gate logits or None) from a single backbone pass."""
+        logits, gate_logits, _ = self.forward_with_features(x)
+        return logits, gate_logits
+
+    def forward_with_features(self, x):
+        """Returns (class logits, gate logits or None, pooled features) from a single backbone pass."""
+        features = self.extract_features(x)
+        logits = self.backbone.fc(features)
+        gate_logits = self.gate(features) if self.gate is not None else None
+        return logits, gate_logits, features
+
+# Smaller torchvision backbones for the cascade's first stage and distilled students
+COMPACT_ARCHS = {
+    "resnet18": (models.resnet18, models.ResNet18_Weights.DEFAULT),
+    "mobilenet_v3_large": (models.mobilenet_v3_large, models.MobileNet_V3_Large_Weights.DEFAULT),
+    "mobilenet_v3_small": (models.mobilenet_v3_small, models.MobileNet_V3_Small_Weights.DEFAULT),
+    "efficientnet_b0": (models.efficientnet_b0, models.EfficientNet_B0_Weights.DEFAULT),
+}
+
+class CompactFoodClassifier(nn.Module):
+    def __init__(self, arch: str = "resnet18", num_classes: int = 101, pretrained: bool = True):
+        super(CompactFoodClassifier, self).__init__()
+        factory, weights = COMPACT_ARCHS[arch]
+        self.arch = arch
+        self.backbone = factory(weights=weights if pretrained else None)
+
+        # Replace the final fully connected layer (ResNets: fc, MobileNet/EfficientNet: classifier[-1])
+        if hasattr(self.backbone, "fc"):
+            self.backbone.fc = nn.Linear(self.backbone.fc.in_features, num_classes)
+        else:
+            head = self.backbone.classifier[-1]
+            self.backbone.classifier[-1] = nn.Linear(head.in_features, num_classes)
+
+    def forward(self, x):
+        return self.backbone(x)
+
+def build_classifier(arch: str = "resnet50", num_classes: int = 101, pretrained: bool = True) -> nn.Module:
+    if arch == "resnet50":
+        return FoodClassifier(num_classes=num_classes, pretrained=pretrained)
+    return CompactFoodClassifier(arch=arch, num_classes=num_classes, pretrained=pretrained)
+
+def load_classifier(path) -> tuple:
+    """
+    Builds the architecture recorded in a weights file's metadata (default resnet50)
+    and assigns the memory-mapped weights. Returns (model in eval mode, metadata).
+    """
+    state_dict, metadata = load_state_dict_file(path)
+    num_classes = len(json.loads(metadata["classes"])) if "classes" in metadata else 101
+    with torch.device("meta"):
+        model = build_classifier(metadata.get("arch", "resnet50"), num_classes=num_classes, pretrained=False)
+    model.load_state_dict(state_dict, assign=True)
+    model.eval()
+    return model, metadata
+
 def get_transforms(is_training: bool = False):
     if is_training:
         return transforms.Compose([
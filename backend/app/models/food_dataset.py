@@ -0,0 +1,109 @@
+import json
+import random
+from pathlib import Path
+from typing import Callable, List, Tuple
+
+import numpy as np
+import torch
+from PIL import Image
+from torch.utils.data import Dataset
+from torchvision import transforms
+from torchvision.transforms import functional as TF
+
+from app.models.preprocessing import CROP_SIZE, normalize_uint8
+
+DATA_ROOT = Path("data/food-101")
+CACHE_ROOT = Path("data/food-101-cache")
+
+
+def list_food101_split(data_root: Path, split: str, classes: List[str]) -> List[Tuple[str, int]]:
+    """
+    Returns (image path, class index) pairs for a Food-101 split ("train" or "test").
+
+    Uses the official meta/{split}.txt lists when present; otherwise falls back to
+    a seeded 80/20 split of the class folders under images/.
+    """
+    class_to_idx = {name: i for i, name in enumerate(classes)}
+    images_dir = data_root / "images"
+    meta_file = data_root / "meta" / f"{split}.txt"
+
+    if meta_file.exists():
+        samples = []
+        with open(meta_file) as f:
+            for line in f:
+                rel = line.strip()
+                if not rel:
+                    continue
+                class_name = rel.split("/")[0]
+                samples.append((str(images_dir / f"{rel}.jpg"), class_to_idx[class_name]))
+        return samples
+
+    samples = [
+        (str(img_file), class_to_idx[class_dir.name])
+        for class_dir in sorted(images_dir.iterdir())
+        if class_dir.is_dir() and class_dir.name in class_to_idx
+        for img_file in sorted(class_dir.glob("*.jpg"))
+    ]
+    random.Random(42).shuffle(samples)
+    split_idx = int(len(samples) * 0.8)
+    return samples[:split_idx] if split == "train" else samples[split_idx:]
+
+
+class ImageListDataset(Dataset):
+    """Decodes images from a list of (path, label) pairs and applies `transform`."""
+
+    def __init__(self, samples: List[Tuple[str, int]], transform: Callable):
+        self.samples = samples
+        self.transform = transform
+
+    def __len__(self):
+        return len(self.samples)
+
+    def __getitem__(self, index):
+        path, label = self.samples[index]
+        image = Image.open(path).convert("RGB")
+        return self.transform(image), label
+
+
+class MemmapFoodDataset(Dataset):
+    """
+    Serves a split from the pre-decoded uint8 cache written by
+    scripts/build_training_cache.py: meta.json plus {split}_NNN.npy shards of
+    (count, size, size, 3) images and {split}_labels.npy.
+
+    Training samples get RandomResizedCrop + horizontal flip (the same
+    augmentation as get_transforms(is_training=True)); evaluation samples are
+    center-cropped. No JPEG is decoded, and shards are memory-mapped lazily so
+    each DataLoader worker maps them after fork.
+    """
+
+    def __init__(self, cache_dir: Path, split: str, train: bool = True, crop_size: int = CROP_SIZE):
+        self.cache_dir = Path(cache_dir)
+        with open(self.cache_dir / "meta.json") as f:
+            self.meta = json.load(f)
+        self.classes = self.meta["classes"]
+        self.shard_files = self.meta["splits"][split]["shards"]
+        self.shard_size = self.meta["shard_size"]
+        self.labels = np.load(self.cache_dir / f"{split}_labels.npy")
+        self.train = train
+        self.crop_size = crop_size
+        self._shards = None
+
+    def __len__(self):
+        return len(self.labels)
+
+    def _shard(self, index: int) -> np.ndarray:
+        if self._shards is None:
+            self._shards = [np.load(self.cache_dir / name, mmap_mode="r") for name in self.shard_files]
+        return self._shards[index // self.shard_size][index % self.shard_size]
+
+    def __getitem__(self, index):
+        image = torch.from_numpy(np.array(self._shard(index))).permute(2, 0, 1)
+        if self.train:
+            top, left, h, w = transforms.RandomResizedCrop.get_params(image, scale=(0.08, 1.0), ratio=(3 / 4, 4 / 3))
+            image = TF.resized_crop(image, top, left, h, w, [self.crop_size, self.crop_size], antialias=True)
+            if torch.rand(1).item() < 0.5:
+                image = image.flip(-1)
+        else:
+            image = TF.center_crop(image, [self.crop_size, self.crop_size])
+        return normalize_uint8(image), int(self.labels[index])
@@ -1,9 +1,13 @@
 import torch
 import torch.nn as nn
-from torchvision import models, transforms
+from torchvision import models
 from PIL import Image
+from app.models.preprocessing import preprocess_image
+from app.models.weights import load_state_dict_file, resolve_weights_path
 
 class Gatekeeper(nn.Module):
+    # Standalone ResNet18 gate. VisionService uses FoodClassifier's gate head instead,
+    # which shares the ResNet50 backbone forward (see scripts/train_gate.py).
     def __init__(self, model_path: str = None, device: str = "cpu"):
         super(Gatekeeper, self).__init__()
         self.device = device
@@ -19,17 +23,14 @@ class Gatekeeper(nn.Module):
         if model_path:
             self._load_weights(model_path)
             
-        self.transform = transforms.Compose([
-            transforms.Resize(256),
-            transforms.CenterCrop(224),
-            transforms.ToTensor(),
-            transforms.Normalize(mean=[0.485, 0.456, 0.406],
-                                 std=[0.229, 0.224, 0.225])
-        ])
+        # Same decode/preprocess pipeline as VisionService
+        self.transform = preprocess_image
 
     def _load_weights(self, path: str):
         try:
-            self.model.load_state_dict(torch.load(path, map_location=self.device))
+            path = resolve_weights_path(path)
+            state_dict, _ = load_state_dict_file(path)
+            self.model.load_state_dict(state_dict)
             print(f"Gatekeeper loaded from {path}")
         except FileNotFoundError:
             print(f"Gatekeeper weights not found at {path}. Using random/pretrained weights (WARNING: unreliable for classification).")
@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, String, Float, DateTime, ForeignKey, JSON
+from sqlalchemy import Column, Integer, String, Float, DateTime, ForeignKey, JSON, LargeBinary
 from sqlalchemy.orm import relationship
 from datetime import datetime
 from app.db.base import Base
@@ -19,6 +19,36 @@ class Meal(Base):
     fats = Column(Float, default=0.0)
     
     confidence = Column(Float)
+    candidates = Column(JSON, nullable=True) # Vision top-3, an input of the advice prompt
     analysis_text = Column(String) # LLM generated advice
+    # "pending"/"running" while an AnalysisJob generates the advice, then "done" or
+    # "failed"; "deferred" when the client streams it from /meals/{id}/advice/stream
+    analysis_status = Column(String, default="done")
     
     created_at = Column(DateTime, default=datetime.utcnow)
+
+
+class MealEmbedding(Base):
+    __tablename__ = "meal_embeddings"
+
+    meal_id = Column(Integer, ForeignKey("meals.id"), primary_key=True)
+    user_id = Column(Integer, index=True)
+    model_version = Column(String, index=True) # Backbone weights the vector came from
+    vector = Column(LargeBinary) # Unit-length float16 pooled ResNet50 features (2048 x 2 bytes)
+
+
+class AnalysisJob(Base):
+    """Persistent queue entry for generating a meal's advice in the background (see analysis_worker)."""
+    __tablename__ = "analysis_jobs"
+
+    id = Column(Integer, primary_key=True, index=True)
+    meal_id = Column(Integer, ForeignKey("meals.id"), index=True)
+    user_id = Column(Integer, index=True)
+    status = Column(String, default="pending", index=True) # pending, running, done, failed
+    payload = Column(JSON) # Prompt inputs (meal data incl. vision candidates, user profile)
+    attempts = Column(Integer, default=0)
+    last_error = Column(String, nullable=True)
+    next_attempt_at = Column(DateTime, default=datetime.utcnow)
+    locked_at = Column(DateTime, nullable=True) # When a worker claimed it; stale claims are recovered
+    created_at = Column(DateTime, default=datetime.utcnow)
+    finished_at = Column(DateTime, nullable=True)
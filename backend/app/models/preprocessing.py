@@ -0,0 +1,60 @@
+import io
+
+import numpy as np
+import torch
+from PIL import Image
+
+IMAGENET_MEAN = (0.485, 0.456, 0.406)
+IMAGENET_STD = (0.229, 0.224, 0.225)
+RESIZE_SIZE = 256
+CROP_SIZE = 224
+
+# Normalize((x / 255 - mean) / std) folded into one multiply-add on uint8 input
+_SCALE = torch.tensor([1.0 / (255.0 * s) for s in IMAGENET_STD]).view(3, 1, 1)
+_NEG_BIAS = torch.tensor([-m / s for m, s in zip(IMAGENET_MEAN, IMAGENET_STD)]).view(3, 1, 1)
+
+
+def decode_image(image_bytes: bytes, min_side: int = RESIZE_SIZE) -> Image.Image:
+    """
+    Decodes an upload to RGB. JPEGs use libjpeg's DCT scaling (draft mode) to
+    decode at 1/2, 1/4 or 1/8 size while keeping the short side >= `min_side`,
+    so a 12 MP phone photo is never fully materialized just to be downscaled.
+    """
+    image = Image.open(io.BytesIO(image_bytes))
+    if image.format == "JPEG":
+        width, height = image.size
+        scale = min_side / min(width, height)
+        if scale < 1:
+            image.draft("RGB", (int(width * scale + 0.5), int(height * scale + 0.5)))
+    return image.convert("RGB")
+
+
+def normalize_uint8(tensor: torch.Tensor) -> torch.Tensor:
+    """CHW uint8 -> ImageNet-normalized float32 in a single fused pass."""
+    return torch.addcmul(_NEG_BIAS, tensor.to(torch.float32), _SCALE)
+
+
+def preprocess_image(image: Image.Image) -> torch.Tensor:
+    """
+    Equivalent of Resize(256) + CenterCrop(224) + ToTensor + Normalize.
+    Only the crop window is resampled, straight to 224x224.
+    """
+    width, height = image.size
+    scale = RESIZE_SIZE / min(width, height)
+    crop_w = CROP_SIZE / scale
+    crop_h = CROP_SIZE / scale
+    left = (width - crop_w) / 2
+    top = (height - crop_h) / 2
+
+    image = image.resize(
+        (CROP_SIZE, CROP_SIZE),
+        Image.BILINEAR,
+        box=(left, top, left + crop_w, top + crop_h),
+    )
+    tensor = torch.from_numpy(np.array(image, dtype=np.uint8)).permute(2, 0, 1)
+    return normalize_uint8(tensor)
+
+
+def load_image_tensor(image_bytes: bytes) -> torch.Tensor:
+    """Upload bytes -> normalized 3x224x224 tensor ready for batching."""
+    return preprocess_image(decode_image(image_bytes))
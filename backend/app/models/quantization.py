@@ -0,0 +1,52 @@
+from typing import Dict, Iterable
+
+import torch
+import torch.nn as nn
+from torchvision.models import quantization as quantized_models
+
+
+def build_quantizable_classifier(state_dict: Dict[str, torch.Tensor], num_classes: int = 101) -> nn.Module:
+    """
+    Rebuilds the fine-tuned FoodClassifier as torchvision's quantizable ResNet50
+    (QuantStub/DeQuantStub + fusable blocks) and loads the fp32 weights into it.
+    """
+    model = quantized_models.resnet50(weights=None, quantize=False)
+    model.fc = nn.Linear(model.fc.in_features, num_classes)
+
+    # FoodClassifier nests the ResNet under `backbone.`
+    model.load_state_dict({k.removeprefix("backbone."): v for k, v in state_dict.items()})
+    model.eval()
+    model.fuse_model(is_qat=False)
+    return model
+
+
+def quantize_static(model: nn.Module, calibration_batches: Iterable[torch.Tensor], engine: str = "fbgemm") -> nn.Module:
+    """
+    Post-training static INT8 quantization: observers are inserted, activation
+    ranges are calibrated on representative images, then modules are converted.
+    """
+    torch.backends.quantized.engine = engine
+    model.qconfig = torch.ao.quantization.get_default_qconfig(engine)
+    torch.ao.quantization.prepare(model, inplace=True)
+
+    with torch.no_grad():
+        for batch in calibration_batches:
+            model(batch)
+
+    torch.ao.quantization.convert(model, inplace=True)
+    return model
+
+
+def save_quantized_model(model: nn.Module, path: str):
+    # TorchScript keeps the quantized graph loadable without rebuilding the module tree
+    example = torch.randn(1, 3, 224, 224)
+    with torch.no_grad():
+        traced = torch.jit.trace(model, example)
+    torch.jit.save(traced, path)
+
+
+def load_quantized_model(path: str, engine: str = "fbgemm") -> torch.jit.ScriptModule:
+    torch.backends.quantized.engine = engine
+    model = torch.jit.load(path, map_location="cpu")
+    model.eval()
+    return model
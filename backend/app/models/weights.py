@@ -0,0 +1,112 @@
+import json
+import os
+import struct
+from pathlib import Path
+from typing import Dict, Optional, Tuple
+
+import torch
+
+# Weight files use the safetensors layout: an 8-byte little-endian header length,
+# a JSON header (tensor name -> dtype/shape/byte range, plus string __metadata__),
+# then the raw tensor bytes. No pickle is involved, and the data section can be
+# memory-mapped straight into tensors.
+_DTYPES = {
+    "F64": torch.float64,
+    "F32": torch.float32,
+    "F16": torch.float16,
+    "BF16": torch.bfloat16,
+    "I64": torch.int64,
+    "I32": torch.int32,
+    "I16": torch.int16,
+    "I8": torch.int8,
+    "U8": torch.uint8,
+    "BOOL": torch.bool,
+}
+_DTYPE_NAMES = {dtype: name for name, dtype in _DTYPES.items()}
+
+
+def save_weights(state_dict: Dict[str, torch.Tensor], path, metadata: Optional[Dict[str, str]] = None):
+    """Writes `state_dict` (and string metadata) as a .safetensors file, atomically."""
+    tensors = {name: t.detach().cpu().contiguous() for name, t in state_dict.items()}
+
+    # Largest element size first, so every tensor starts aligned to its own dtype
+    # without padding between tensors (which the format does not allow)
+    order = sorted(tensors, key=lambda name: -tensors[name].element_size())
+
+    header = {}
+    offset = 0
+    for name in order:
+        tensor = tensors[name]
+        nbytes = tensor.numel() * tensor.element_size()
+        header[name] = {
+            "dtype": _DTYPE_NAMES[tensor.dtype],
+            "shape": list(tensor.shape),
+            "data_offsets": [offset, offset + nbytes],
+        }
+        offset += nbytes
+    if metadata:
+        header["__metadata__"] = {key: str(value) for key, value in metadata.items()}
+
+    header_bytes = json.dumps(header, separators=(",", ":")).encode("utf-8")
+    header_bytes += b" " * (-len(header_bytes) % 8)
+
+    path = Path(path)
+    tmp_path = path.with_name(path.name + ".tmp")
+    with open(tmp_path, "wb") as f:
+        f.write(struct.pack("<Q", len(header_bytes)))
+        f.write(header_bytes)
+        for name in order:
+            tensor = tensors[name]
+            if tensor.numel():
+                f.write(tensor.reshape(-1).view(torch.uint8).numpy().tobytes())
+    os.replace(tmp_path, path)
+
+
+def load_weights(path) -> Tuple[Dict[str, torch.Tensor], Dict[str, str]]:
+    """
+    Memory-maps a .safetensors file and returns (state_dict, metadata).
+
+    Tensors are zero-copy views of a private file mapping: loading only reads the
+    header, pages are faulted in from the OS page cache on first use and are
+    shared by every process that maps the same file.
+    """
+    path = str(path)
+    with open(path, "rb") as f:
+        (header_len,) = struct.unpack("<Q", f.read(8))
+        header = json.loads(f.read(header_len))
+    metadata = header.pop("__metadata__", {})
+    data_start = 8 + header_len
+
+    storage = torch.UntypedStorage.from_file(path, shared=False, nbytes=os.path.getsize(path))
+    buffer = torch.empty(0, dtype=torch.uint8).set_(storage)
+
+    state_dict = {}
+    for name, info in header.items():
+        dtype = _DTYPES[info["dtype"]]
+        begin, end = info["data_offsets"]
+        raw = buffer[data_start + begin:data_start + end]
+        if (data_start + begin) % dtype.itemsize:
+            # Misaligned (written by another tool); fall back to a copy
+            raw = raw.clone()
+        state_dict[name] = raw.view(dtype).reshape(info["shape"])
+    return state_dict, metadata
+
+
+def resolve_weights_path(path) -> Path:
+    """
+    Prefers a .safetensors file next to `path`, falling back to the legacy .pth,
+    so existing deployments keep working until their weights are converted.
+    """
+    path = Path(path)
+    for candidate in (path.with_suffix(".safetensors"), path, path.with_suffix(".pth")):
+        if candidate.exists():
+            return candidate
+    return path
+
+
+def load_state_dict_file(path) -> Tuple[Dict[str, torch.Tensor], Dict[str, str]]:
+    """Loads either weight format as (state_dict, metadata); .pth files carry no metadata."""
+    path = Path(path)
+    if path.suffix == ".safetensors":
+        return load_weights(path)
+    return torch.load(path, map_location="cpu", mmap=True, weights_only=True), {}
@@ -0,0 +1,32 @@
+from pydantic import BaseModel
+from typing import List, Optional
+from datetime import datetime
+
+class ChatSessionCreate(BaseModel):
+    title: Optional[str] = None
+
+class ChatSession(BaseModel):
+    id: int
+    title: Optional[str] = None
+    turns: int
+    created_at: datetime
+    updated_at: datetime
+
+    class Config:
+        orm_mode = True
+
+class ChatMessage(BaseModel):
+    id: int
+    role: str
+    text: str
+    created_at: datetime
+
+    class Config:
+        orm_mode = True
+
+class ChatSessionDetail(BaseModel):
+    session: ChatSession
+    messages: List[ChatMessage] = []
+
+class SessionMessageRequest(BaseModel):
+    message: str
@@ -10,6 +10,7 @@ class MealBase(BaseModel):
     carbs: float
     fats: float
     analysis_text: Optional[str] = None
+    analysis_status: Optional[str] = None
 
 class MealCreate(MealBase):
     image_path: Optional[str] = None
@@ -29,3 +30,16 @@ class AnalysisResponse(BaseModel):
     meal: Optional[Meal] = None
     advice: str
     is_food: bool = True
+    model_stage: Optional[str] = None # "fast" (cascade first stage) or "full"
+    analysis_status: str = "done" # "pending" until the background job has written the advice
+
+class MealAnalysis(BaseModel):
+    meal_id: int
+    status: str # pending, running, done, failed or deferred
+    analysis_text: Optional[str] = None
+    attempts: int = 0
+    error: Optional[str] = None
+
+class SimilarMeal(BaseModel):
+    meal: Meal
+    similarity: float # Cosine similarity of the image embeddings, 1.0 = identical
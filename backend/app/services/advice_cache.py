@@ -0,0 +1,131 @@
+import asyncio
+import json
+import random
+from typing import Any, Awaitable, Callable, Dict, List, Optional
+
+from app.core.config import settings
+from app.services.cache import AsyncTTLCache, SQLiteCacheStore, _MISSING
+
+
+def _norm(value: Any) -> str:
+    return " ".join(str(value or "").lower().split())
+
+
+def advice_key(meal_data: Dict[str, Any], user_profile: Dict[str, Any]) -> str:
+    """
+    Normalized form of the prompt inputs of LLMService._construct_prompt.
+    Calories are bucketed, and only runner-up candidates likely enough to be
+    worth a mention are kept, so near-identical uploads share advice.
+    """
+    calories = meal_data.get("calories")
+    bucket = settings.ADVICE_CALORIE_BUCKET
+    calorie_bucket = int(round(float(calories) / bucket) * bucket) if isinstance(calories, (int, float)) else None
+    candidates = meal_data.get("candidates") or []
+    alternatives = [
+        _norm(c["food"]) for c in candidates[1:]
+        if c.get("confidence", 0.0) >= settings.ADVICE_CANDIDATE_MIN_CONFIDENCE
+    ] if len(candidates) > 1 else []
+    return json.dumps([
+        _norm(meal_data.get("food_name")),
+        _norm(meal_data.get("portion_size")),
+        calorie_bucket,
+        alternatives,
+        _norm(user_profile.get("goal")),
+        _norm(user_profile.get("preferences")),
+        _norm(user_profile.get("language", "en")),
+    ], ensure_ascii=False)
+
+
+class AdviceCache:
+    """
+    Generated advice per normalized prompt, as a pool of up to `variants`
+    different answers: until the pool is full every request generates (and
+    adds) a new one, afterwards requests get a random pick. Memory LRU with a
+    persistent SQLite tier (read and written from a worker thread); both
+    expire entries after the TTL and are bounded to max_entries keys.
+    """
+
+    def __init__(self, variants: int, max_entries: int, ttl_seconds: float, path: Optional[str]):
+        self.variants = max(1, variants)
+        store = SQLiteCacheStore(path, table="advice", max_entries=max_entries) if path else None
+        self.cache = AsyncTTLCache("advice", max_entries=max_entries, ttl_seconds=ttl_seconds, store=store)
+        self._inflight: Dict[str, asyncio.Future] = {}
+
+        self.hits = 0
+        self.misses = 0
+        self.coalesced = 0
+
+    async def _pool(self, key: str) -> List[str]:
+        pool = self.cache.get(key, _MISSING)
+        if pool is _MISSING and self.cache.store is not None:
+            pool, remaining = await asyncio.to_thread(self.cache.store.get, key)
+            if pool is not _MISSING:
+                self.cache.set(key, pool, ttl_seconds=remaining)
+        return [] if pool is _MISSING else pool
+
+    async def lookup(self, key: str) -> Optional[str]:
+        """A cached variant once the key's pool is full; None means generate a new one."""
+        pool = await self._pool(key)
+        if len(pool) >= self.variants:
+            self.hits += 1
+            return random.choice(pool)
+        self.misses += 1
+        return None
+
+    async def add(self, key: str, text: str):
+        pool = await self._pool(key)
+        if text in pool or len(pool) >= self.variants:
+            return
+        # New variants keep the pool's expiry, so even a popular key is regenerated after the TTL
+        ttl = self.cache.ttl_remaining(key) if pool else None
+        if ttl is None:
+            ttl = self.cache.ttl_seconds
+        pool = pool + [text]
+        self.cache.set(key, pool, ttl_seconds=ttl)
+        if self.cache.store is not None:
+            await asyncio.to_thread(self.cache.store.set, key, pool, ttl)
+
+    async def get_or_generate(self, key: str, generate: Callable[[], Awaitable[str]]) -> str:
+        """
+        Cached variant, or the result of `generate` (added to the pool). Concurrent
+        misses for one key share a single generation; errors are not cached.
+        """
+        text = await self.lookup(key)
+        if text is not None:
+            return text
+
+        task = self._inflight.get(key)
+        if task is not None:
+            self.coalesced += 1
+            return await asyncio.shield(task)
+
+        task = asyncio.ensure_future(self._generate(key, generate))
+        self._inflight[key] = task
+        task.add_done_callback(lambda _: self._inflight.pop(key, None))
+        return await asyncio.shield(task)
+
+    async def _generate(self, key: str, generate: Callable[[], Awaitable[str]]) -> str:
+        text = await generate()
+        await self.add(key, text)
+        return text
+
+    def stats(self) -> Dict[str, Any]:
+        lookups = self.hits + self.misses
+        return {
+            "keys": len(self.cache),
+            "variants": self.variants,
+            "hits": self.hits,
+            "misses": self.misses,
+            "coalesced": self.coalesced,
+            "hit_rate": self.hits / lookups if lookups else 0.0,
+            "evictions": self.cache.evictions,
+            "store": self.cache.store.path if self.cache.store is not None else None,
+        }
+
+
+advice_cache = AdviceCache(
+    variants=settings.ADVICE_CACHE_VARIANTS,
+    max_entries=settings.ADVICE_CACHE_MAX_ENTRIES,
+    ttl_seconds=settings.ADVICE_CACHE_TTL_SECONDS,
+    path=settings.ADVICE_CACHE_PATH or None,
+)
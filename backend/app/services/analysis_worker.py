@@ -0,0 +1,242 @@
+import asyncio
+import random
+import time
+from datetime import datetime, timedelta
+from typing import Any, Dict, List, Optional, Set, Tuple
+
+from app.core.config import settings
+from app.db.base import SessionLocal
+from app.models.meal import AnalysisJob, Meal
+from app.services.llm_service import advice_inputs, llm_service
+
+
+def job_payload(meal_data: Dict[str, Any], profile: Dict[str, Any]) -> Dict[str, Any]:
+    """What an AnalysisJob needs to rebuild the upload's prompt, even after a restart."""
+    return {"meal": advice_inputs(meal_data), "profile": profile}
+
+
+class AnalysisWorker:
+    """
+    In-process pool that generates meal advice from the analysis_jobs table.
+
+    Jobs are claimed with a conditional UPDATE, so duplicate queue entries and
+    several server processes never run one job twice. Failed attempts are
+    retried with jittered exponential backoff up to ANALYSIS_MAX_ATTEMPTS. A
+    periodic sweep picks up jobs that are due but not queued in this process
+    (inserted elsewhere, or left over from a restart) and requeues claims whose
+    lease expired because their process died. Database work runs in a thread,
+    off the event loop.
+    """
+
+    def __init__(
+        self,
+        workers: int = 4,
+        max_attempts: int = 3,
+        retry_base_seconds: float = 5.0,
+        lease_seconds: float = 300.0,
+        sweep_seconds: float = 30.0,
+    ):
+        self.workers = workers
+        self.max_attempts = max_attempts
+        self.retry_base_seconds = retry_base_seconds
+        self.lease_seconds = lease_seconds
+        self.sweep_seconds = sweep_seconds
+
+        self._queue: Optional[asyncio.Queue] = None
+        self._queued: Set[int] = set()
+        self._active: Set[int] = set()
+        self._tasks = []
+
+        self.completed = 0
+        self.failed = 0
+        self.retried = 0
+        self.recovered = 0
+        self.total_seconds = 0.0
+
+    @property
+    def running(self) -> bool:
+        return self._queue is not None
+
+    async def start(self):
+        self._queue = asyncio.Queue()
+        self._tasks = [asyncio.create_task(self._work()) for _ in range(self.workers)]
+        self._tasks.append(asyncio.create_task(self._sweep_loop()))
+
+    async def stop(self):
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+        self._queue = None
+        self._queued.clear()
+        if self._active:
+            # Hand interrupted jobs straight back instead of waiting out their lease
+            await asyncio.to_thread(self._release, set(self._active))
+            self._active.clear()
+
+    def _release(self, job_ids: Set[int]):
+        with SessionLocal() as db:
+            db.query(AnalysisJob).filter(AnalysisJob.id.in_(job_ids), AnalysisJob.status == "running").update(
+                {"status": "pending", "locked_at": None}, synchronize_session=False
+            )
+            db.commit()
+
+    def enqueue(self, job_id: int, delay: float = 0.0):
+        """Queues a committed job. Without a running pool the next sweep (e.g. at startup) finds it."""
+        if self._queue is None:
+            return
+        if delay > 0:
+            # Not deduplicated until it is due: an entry queued meanwhile (e.g. by a
+            # sweep) is dropped as not due yet when a worker gets to it first
+            asyncio.get_running_loop().call_later(delay, self.enqueue, job_id)
+            return
+        if job_id in self._queued:
+            return
+        self._queued.add(job_id)
+        self._queue.put_nowait(job_id)
+
+    async def sweep(self) -> int:
+        """Requeues expired claims and queues due pending jobs; returns how many were queued."""
+        recovered, due = await asyncio.to_thread(self._recover_and_list_due)
+        self.recovered += recovered
+        for job_id in due:
+            self.enqueue(job_id)
+        return len(due)
+
+    def _recover_and_list_due(self) -> Tuple[int, List[int]]:
+        now = datetime.utcnow()
+        with SessionLocal() as db:
+            recovered = db.query(AnalysisJob).filter(
+                AnalysisJob.status == "running",
+                AnalysisJob.locked_at < now - timedelta(seconds=self.lease_seconds),
+            ).update({"status": "pending", "locked_at": None}, synchronize_session=False)
+            db.commit()
+            due = db.query(AnalysisJob.id).filter(
+                AnalysisJob.status == "pending", AnalysisJob.next_attempt_at <= now
+            ).order_by(AnalysisJob.id).all()
+        return recovered, [job_id for (job_id,) in due]
+
+    async def _sweep_loop(self):
+        while True:
+            try:
+                await self.sweep()
+            except Exception as e:
+                print(f"Analysis job sweep failed: {e}")
+            await asyncio.sleep(self.sweep_seconds)
+
+    async def _work(self):
+        while True:
+            job_id = await self._queue.get()
+            self._queued.discard(job_id)
+            try:
+                await self._process(job_id)
+            except Exception as e:
+                print(f"Analysis job {job_id} crashed: {e}")
+
+    def _claim(self, job_id: int) -> Optional[Dict[str, Any]]:
+        """Marks a due pending job as running; None if someone else has it, it's done, or not due yet."""
+        now = datetime.utcnow()
+        with SessionLocal() as db:
+            claimed = db.query(AnalysisJob).filter(
+                AnalysisJob.id == job_id,
+                AnalysisJob.status == "pending",
+                AnalysisJob.next_attempt_at <= now,
+            ).update(
+                {"status": "running", "locked_at": now, "attempts": AnalysisJob.attempts + 1},
+                synchronize_session=False,
+            )
+            if not claimed:
+                db.commit()
+                return None
+            job = db.get(AnalysisJob, job_id)
+            db.query(Meal).filter(Meal.id == job.meal_id).update({"analysis_status": "running"})
+            db.commit()
+            return {"meal_id": job.meal_id, "user_id": job.user_id, "attempts": job.attempts, "payload": job.payload}
+
+    async def _process(self, job_id: int):
+        # Active from before the claim until the outcome is stored, so a job whose task is
+        # cancelled at any await in between (e.g. by stop()) is handed back by stop()
+        self._active.add(job_id)
+        try:
+            await self._attempt(job_id)
+        except asyncio.CancelledError:
+            raise
+        except Exception:
+            self._active.discard(job_id)
+            raise
+        self._active.discard(job_id)
+
+    async def _attempt(self, job_id: int):
+        job = await asyncio.to_thread(self._claim, job_id)
+        if job is None:
+            return
+
+        started = time.perf_counter()
+        try:
+            payload = job["payload"]
+            advice = await llm_service.generate_dietary_analysis(
+                payload["meal"], payload["profile"], strict=True, user_id=job["user_id"]
+            )
+        except Exception as e:
+            await self._finish_failed(job_id, job, str(e) or type(e).__name__)
+            return
+
+        await asyncio.to_thread(self._store_advice, job_id, job["meal_id"], advice)
+        self.completed += 1
+        self.total_seconds += time.perf_counter() - started
+
+    def _store_advice(self, job_id: int, meal_id: int, advice: str):
+        with SessionLocal() as db:
+            db.query(AnalysisJob).filter(AnalysisJob.id == job_id).update(
+                {"status": "done", "locked_at": None, "finished_at": datetime.utcnow(), "last_error": None}
+            )
+            db.query(Meal).filter(Meal.id == meal_id).update({"analysis_text": advice, "analysis_status": "done"})
+            db.commit()
+
+    async def _finish_failed(self, job_id: int, job: Dict[str, Any], error: str):
+        retry = job["attempts"] < self.max_attempts
+        delay = self.retry_base_seconds * 2 ** (job["attempts"] - 1) * random.uniform(0.5, 1.5)
+        await asyncio.to_thread(self._store_failure, job_id, job["meal_id"], error, retry, delay)
+
+        if retry:
+            print(f"Analysis job {job_id} attempt {job['attempts']} failed ({error}); retrying in {delay:.1f}s")
+            self.retried += 1
+            self.enqueue(job_id, delay)
+        else:
+            print(f"Analysis job {job_id} failed after {job['attempts']} attempts: {error}")
+            self.failed += 1
+
+    def _store_failure(self, job_id: int, meal_id: int, error: str, retry: bool, delay: float):
+        with SessionLocal() as db:
+            if retry:
+                job_update = {"status": "pending", "locked_at": None, "last_error": error,
+                              "next_attempt_at": datetime.utcnow() + timedelta(seconds=delay)}
+            else:
+                job_update = {"status": "failed", "locked_at": None, "last_error": error,
+                              "finished_at": datetime.utcnow()}
+            db.query(AnalysisJob).filter(AnalysisJob.id == job_id).update(job_update)
+            db.query(Meal).filter(Meal.id == meal_id).update(
+                {"analysis_status": "pending" if retry else "failed"}
+            )
+            db.commit()
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "workers": self.workers if self.running else 0,
+            "queued": len(self._queued),
+            "active": len(self._active),
+            "completed": self.completed,
+            "failed": self.failed,
+            "retried": self.retried,
+            "recovered": self.recovered,
+            "mean_seconds": self.total_seconds / self.completed if self.completed else 0.0,
+        }
+
+
+analysis_worker = AnalysisWorker(
+    workers=settings.ANALYSIS_WORKERS,
+    max_attempts=settings.ANALYSIS_MAX_ATTEMPTS,
+    retry_base_seconds=settings.ANALYSIS_RETRY_BASE_SECONDS,
+    lease_seconds=settings.ANALYSIS_JOB_LEASE_SECONDS,
+    sweep_seconds=settings.ANALYSIS_SWEEP_SECONDS,
+)
@@ -0,0 +1,221 @@
+import asyncio
+import json
+import os
+import pickle
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Awaitable, Callable, Dict, Hashable, Optional, Tuple
+
+_MISSING = object()
+
+
+def estimate_size(value: Any) -> int:
+    """Approximate in-memory footprint of a cached value, in bytes."""
+    try:
+        return len(pickle.dumps(value, protocol=pickle.HIGHEST_PROTOCOL))
+    except Exception:
+        return 1024
+
+
+class SQLiteCacheStore:
+    """
+    Persistent tier for AsyncTTLCache: JSON-serializable values under string
+    keys in a SQLite file, so entries survive restarts and are shared by all
+    worker processes. Best effort: errors are logged and treated as misses.
+    """
+
+    def __init__(self, path: str, table: str = "cache", max_entries: Optional[int] = None):
+        self.path = path
+        self.table = table
+        self.max_entries = max_entries
+        self._conn: Optional[sqlite3.Connection] = None
+        self._writes = 0
+        # get/set run in worker threads (asyncio.to_thread); they share one connection
+        self._lock = threading.Lock()
+
+    def _connection(self) -> sqlite3.Connection:
+        if self._conn is None:
+            os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+            conn = sqlite3.connect(self.path, timeout=1.0, isolation_level=None, check_same_thread=False)
+            conn.execute("PRAGMA journal_mode = WAL")
+            conn.execute(
+                f"CREATE TABLE IF NOT EXISTS {self.table} "
+                "(key TEXT PRIMARY KEY, value TEXT NOT NULL, expires_at REAL NOT NULL)"
+            )
+            self._conn = conn
+        return self._conn
+
+    def get(self, key: str) -> Tuple[Any, float]:
+        """(value, remaining ttl in seconds), or (_MISSING, 0) if absent or expired."""
+        try:
+            with self._lock:
+                row = self._connection().execute(
+                    f"SELECT value, expires_at FROM {self.table} WHERE key = ?", (key,)
+                ).fetchone()
+        except (sqlite3.Error, OSError) as e:
+            print(f"Cache store error ({self.path}): {e}")
+            return _MISSING, 0.0
+        if row is None or row[1] < time.time():
+            return _MISSING, 0.0
+        return json.loads(row[0]), row[1] - time.time()
+
+    def set(self, key: str, value: Any, ttl_seconds: float):
+        try:
+            with self._lock:
+                self._connection().execute(
+                    f"INSERT OR REPLACE INTO {self.table} VALUES (?, ?, ?)",
+                    (key, json.dumps(value), time.time() + ttl_seconds),
+                )
+                self._writes += 1
+                if self.max_entries and self._writes % 64 == 0:
+                    self._prune()
+        except (sqlite3.Error, OSError, TypeError, ValueError) as e:
+            print(f"Cache store error ({self.path}): {e}")
+
+    def _prune(self):
+        """Drops expired rows, then the soonest-expiring ones beyond max_entries."""
+        conn = self._connection()
+        conn.execute(f"DELETE FROM {self.table} WHERE expires_at < ?", (time.time(),))
+        conn.execute(
+            f"DELETE FROM {self.table} WHERE key IN (SELECT key FROM {self.table} ORDER BY expires_at "
+            f"LIMIT MAX(0, (SELECT COUNT(*) FROM {self.table}) - ?))",
+            (self.max_entries,),
+        )
+
+
+class AsyncTTLCache:
+    """
+    In-process LRU cache with TTL expiry, an optional byte budget and
+    single-flight coalescing.
+
+    `get_or_compute` runs `compute` at most once per key at a time: concurrent
+    callers for a key that is already being computed await the same task.
+    Exceptions are propagated to every waiter and never cached.
+
+    With a `store`, misses fall through to the persistent tier before
+    computing, and computed values are written to both tiers. Store reads
+    and writes run in a worker thread, inside the shared task.
+    """
+
+    def __init__(
+        self,
+        name: str,
+        max_entries: int = 1024,
+        ttl_seconds: float = 3600.0,
+        max_bytes: Optional[int] = None,
+        size_fn: Callable[[Any], int] = estimate_size,
+        store: Optional[SQLiteCacheStore] = None,
+    ):
+        self.name = name
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self.max_bytes = max_bytes
+        self.size_fn = size_fn
+        self.store = store
+
+        # key -> (expires_at, size, value), least recently used first
+        self._entries: "OrderedDict[Hashable, tuple]" = OrderedDict()
+        self._inflight: Dict[Hashable, asyncio.Future] = {}
+        self._bytes = 0
+
+        self.hits = 0
+        self.store_hits = 0
+        self.misses = 0
+        self.coalesced = 0
+        self.evictions = 0
+
+    def get(self, key: Hashable, default: Any = None) -> Any:
+        entry = self._entries.get(key)
+        if entry is None:
+            return default
+        expires_at, size, value = entry
+        if expires_at < time.monotonic():
+            self._remove(key)
+            return default
+        self._entries.move_to_end(key)
+        return value
+
+    def set(self, key: Hashable, value: Any, ttl_seconds: Optional[float] = None):
+        size = self.size_fn(value) if self.max_bytes else 0
+        if self.max_bytes and size > self.max_bytes:
+            return
+
+        if key in self._entries:
+            self._remove(key)
+        ttl = self.ttl_seconds if ttl_seconds is None else min(ttl_seconds, self.ttl_seconds)
+        self._entries[key] = (time.monotonic() + ttl, size, value)
+        self._bytes += size
+
+        while len(self._entries) > self.max_entries or (self.max_bytes and self._bytes > self.max_bytes):
+            oldest = next(iter(self._entries))
+            self._remove(oldest)
+            self.evictions += 1
+
+    def ttl_remaining(self, key: Hashable) -> Optional[float]:
+        """Seconds until `key` expires; None if it is absent or expired. Doesn't count as a use."""
+        entry = self._entries.get(key)
+        if entry is None or entry[0] < time.monotonic():
+            return None
+        return entry[0] - time.monotonic()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def _remove(self, key: Hashable):
+        _, size, _ = self._entries.pop(key)
+        self._bytes -= size
+
+    def clear(self):
+        self._entries.clear()
+        self._bytes = 0
+
+    async def get_or_compute(self, key: Hashable, compute: Callable[[], Awaitable[Any]]) -> Any:
+        value = self.get(key, _MISSING)
+        if value is not _MISSING:
+            self.hits += 1
+            return value
+
+        task = self._inflight.get(key)
+        if task is not None:
+            self.coalesced += 1
+            return await asyncio.shield(task)
+
+        task = asyncio.ensure_future(self._load_or_compute(key, compute))
+        self._inflight[key] = task
+        task.add_done_callback(lambda _: self._inflight.pop(key, None))
+        # Shielded so one caller disconnecting doesn't cancel the shared computation
+        return await asyncio.shield(task)
+
+    async def _load_or_compute(self, key: Hashable, compute: Callable[[], Awaitable[Any]]) -> Any:
+        # The store is a blocking SQLite file, so it is only touched from a worker thread
+        if self.store is not None:
+            value, remaining = await asyncio.to_thread(self.store.get, key)
+            if value is not _MISSING:
+                self.store_hits += 1
+                self.set(key, value, ttl_seconds=remaining)
+                return value
+
+        self.misses += 1
+        value = await compute()
+        self.set(key, value)
+        if self.store is not None:
+            await asyncio.to_thread(self.store.set, key, value, self.ttl_seconds)
+        return value
+
+    def stats(self) -> Dict[str, Any]:
+        lookups = self.hits + self.store_hits + self.misses + self.coalesced
+        stats = {
+            "entries": len(self),
+            "bytes": self._bytes,
+            "hits": self.hits,
+            "misses": self.misses,
+            "coalesced": self.coalesced,
+            "evictions": self.evictions,
+            "hit_rate": (self.hits + self.store_hits + self.coalesced) / lookups if lookups else 0.0,
+        }
+        if self.store is not None:
+            stats["store"] = self.store.path
+            stats["store_hits"] = self.store_hits
+        return stats
@@ -0,0 +1,175 @@
+import asyncio
+from datetime import datetime
+from typing import Any, Dict, List, Optional, Set
+
+from sqlalchemy.orm import Session
+
+from app.core.config import settings
+from app.db.base import SessionLocal
+from app.models.chat import ChatMessage, ChatSession
+from app.services.llm_service import llm_service
+
+
+def estimate_tokens(text: str) -> int:
+    # Roughly 4 characters per token for Gemini on English text; only used for budgeting
+    return len(text or "") // 4 + 1
+
+
+def trim_history(messages: List[Dict[str, Any]], budget: int) -> List[Dict[str, Any]]:
+    """
+    The most recent messages whose estimated tokens fit in `budget`, oldest
+    first and starting with a user turn. Messages may carry precomputed "tokens".
+    """
+    kept = []
+    used = 0
+    for msg in reversed(messages):
+        tokens = msg.get("tokens") or estimate_tokens(msg["text"])
+        if used + tokens > budget:
+            break
+        used += tokens
+        kept.append(msg)
+    kept.reverse()
+    while kept and kept[0]["role"] != "user":
+        kept.pop(0)
+    return kept
+
+
+class ChatHistoryService:
+    """
+    Server-side chat sessions. Each prompt gets the newest turns that fit in
+    CHAT_HISTORY_TOKEN_BUDGET plus a running summary of the older ones, so its
+    size stays bounded however long the conversation gets. The summary is
+    refreshed in the background, at most once every CHAT_SUMMARY_EVERY_TURNS
+    turns; turns that fall out of the window in between are only in the
+    summary once it next runs.
+    """
+
+    def __init__(self, token_budget: int, max_messages: int, summary_every_turns: int, summary_max_tokens: int):
+        self.token_budget = token_budget
+        self.max_messages = max_messages
+        self.summary_every_turns = max(1, summary_every_turns)
+        self.summary_max_tokens = summary_max_tokens
+
+        self._summarizing: Set[int] = set()
+        self._tasks: Set[asyncio.Task] = set()
+
+        self.prompts = 0
+        self.history_tokens = 0
+        self.max_history_tokens = 0
+        self.summaries = 0
+        self.summary_failures = 0
+
+    def create_session(self, db: Session, user_id: int, title: Optional[str] = None) -> ChatSession:
+        session = ChatSession(user_id=user_id, title=title)
+        db.add(session)
+        db.commit()
+        db.refresh(session)
+        return session
+
+    def get_session(self, db: Session, session_id: int, user_id: int) -> Optional[ChatSession]:
+        return db.query(ChatSession).filter(ChatSession.id == session_id, ChatSession.user_id == user_id).first()
+
+    def _unsummarized(self, db: Session, session: ChatSession, limit: Optional[int] = None) -> List[Dict[str, Any]]:
+        """Messages not yet folded into the summary (the newest `limit` of them), oldest first."""
+        rows = db.query(ChatMessage.id, ChatMessage.role, ChatMessage.text, ChatMessage.tokens).filter(
+            ChatMessage.session_id == session.id,
+            ChatMessage.id > (session.summarized_message_id or 0),
+        ).order_by(ChatMessage.id.desc()).limit(limit).all()
+        return [{"id": r.id, "role": r.role, "text": r.text, "tokens": r.tokens} for r in reversed(rows)]
+
+    def window(self, db: Session, session: ChatSession) -> List[Dict[str, str]]:
+        """History for the next prompt: recent turns within the token budget."""
+        kept = trim_history(self._unsummarized(db, session, self.max_messages), self.token_budget)
+        self.record_prompt(kept)
+        return [{"role": m["role"], "text": m["text"]} for m in kept]
+
+    def record_prompt(self, history: List[Dict[str, Any]]):
+        tokens = sum(m.get("tokens") or estimate_tokens(m["text"]) for m in history)
+        self.prompts += 1
+        self.history_tokens += tokens
+        self.max_history_tokens = max(self.max_history_tokens, tokens)
+
+    def context(self, session: ChatSession) -> str:
+        if not session.summary:
+            return ""
+        return f"\n\nSummary of the earlier conversation: {session.summary}"
+
+    def record_exchange(self, db: Session, session: ChatSession, message: str, reply: str):
+        """Stores a completed exchange and schedules a summary update when one is due."""
+        now = datetime.utcnow()
+        db.add_all([
+            ChatMessage(session_id=session.id, role="user", text=message, tokens=estimate_tokens(message), created_at=now),
+            ChatMessage(session_id=session.id, role="assistant", text=reply, tokens=estimate_tokens(reply), created_at=now),
+        ])
+        session.turns = (session.turns or 0) + 1
+        session.updated_at = now
+        if not session.title:
+            session.title = message[:60]
+        db.commit()
+
+        if session.turns - (session.summary_turn or 0) >= self.summary_every_turns:
+            self.schedule_summary(session.id)
+
+    def schedule_summary(self, session_id: int):
+        if session_id in self._summarizing:
+            return
+        self._summarizing.add(session_id)
+        task = asyncio.create_task(self.summarize(session_id))
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+
+    async def summarize(self, session_id: int):
+        """Folds the turns older than the history window into the session's summary."""
+        try:
+            with SessionLocal() as db:
+                session = db.get(ChatSession, session_id)
+                if session is None:
+                    return
+                messages = self._unsummarized(db, session)
+                recent = trim_history(messages, self.token_budget)
+                older = messages[:len(messages) - len(recent)]
+                if not older:
+                    return # Everything still fits; check again next turn
+                previous, turns, user_id = session.summary, session.turns, session.user_id
+
+            try:
+                summary = await llm_service.summarize_conversation(
+                    previous, [{"role": m["role"], "text": m["text"]} for m in older], self.summary_max_tokens,
+                    user_id=user_id,
+                )
+            except Exception as e:
+                # Keep the old summary and wait another N turns rather than retrying every turn
+                print(f"Chat summary for session {session_id} failed: {e}")
+                self.summary_failures += 1
+                update = {"summary_turn": turns}
+            else:
+                self.summaries += 1
+                update = {
+                    "summary": summary[:self.summary_max_tokens * 4],
+                    "summarized_message_id": older[-1]["id"],
+                    "summary_turn": turns,
+                }
+
+            with SessionLocal() as db:
+                db.query(ChatSession).filter(ChatSession.id == session_id).update(update)
+                db.commit()
+        finally:
+            self._summarizing.discard(session_id)
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "prompts": self.prompts,
+            "mean_history_tokens": self.history_tokens / self.prompts if self.prompts else 0.0,
+            "max_history_tokens": self.max_history_tokens,
+            "summaries": self.summaries,
+            "summary_failures": self.summary_failures,
+            "summarizing": len(self._summarizing),
+        }
+
+
+chat_history = ChatHistoryService(
+    token_budget=settings.CHAT_HISTORY_TOKEN_BUDGET,
+    max_messages=settings.CHAT_HISTORY_MAX_MESSAGES,
+    summary_every_turns=settings.CHAT_SUMMARY_EVERY_TURNS,
+    summary_max_tokens=settings.CHAT_SUMMARY_MAX_TOKENS,
+)
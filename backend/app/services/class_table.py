@@ -0,0 +1,71 @@
+import json
+import os
+import threading
+from typing import Any, Dict, List, Optional
+
+from app.core.config import settings
+
+MACROS = ("calories", "protein", "carbs", "fats")
+
+
+class ClassTable:
+    """
+    Per-class knowledge precomputed by scripts/build_class_table.py: display
+    name, matched USDA food, per-100g macros and typical portion, in a list
+    indexed by classifier output index. Loaded lazily on first lookup.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self.entries: List[Dict[str, Any]] = []
+        self.meta: Dict[str, Any] = {}
+        self.loaded = False
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def load(self):
+        if self.loaded:
+            return
+        with self._lock:
+            if self.loaded:
+                return
+            if os.path.exists(self.path):
+                with open(self.path) as f:
+                    table = json.load(f)
+                self.entries = table["classes"]
+                self.meta = table.get("meta", {})
+                print(f"Loaded class table for {len(self.entries)} classes from {self.path}")
+            self.loaded = True
+
+    def get(self, class_id: Optional[int], class_name: Optional[str] = None) -> Optional[Dict[str, Any]]:
+        """
+        Entry for a classifier output index, or None. With `class_name`, an entry
+        built for a different label set (stale table vs newer weights) is ignored.
+        """
+        self.load()
+        entry = self.entries[class_id] if class_id is not None and 0 <= class_id < len(self.entries) else None
+        if entry is None or (class_name is not None and entry["class"] != class_name):
+            self.misses += 1
+            return None
+        self.hits += 1
+        return entry
+
+    def nutrition(self, entry: Dict[str, Any]) -> Optional[Dict[str, float]]:
+        """Per-100g macros in NutritionService's format; None if the build found no match."""
+        if entry.get("calories") is None:
+            return None
+        return {key: entry[key] for key in MACROS}
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "path": self.path,
+            "classes": len(self.entries),
+            "built_at": self.meta.get("built_at"),
+            "source": self.meta.get("source"),
+            "hits": self.hits,
+            "misses": self.misses,
+        }
+
+
+class_table = ClassTable(settings.CLASS_TABLE_PATH)
@@ -0,0 +1,149 @@
+import threading
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+from sqlalchemy.orm import Session
+
+from app.core.config import settings
+from app.models.meal import MealEmbedding
+
+EMBEDDING_DIM = 2048
+
+
+class EmbeddingIndex:
+    """
+    In-process nearest-neighbour search over the meal_embeddings table.
+
+    Every stored vector is kept here only as a random orthogonal projection down
+    to EMBEDDING_INDEX_DIM float32 values (512 bytes per meal at 128-d instead
+    of 4 KB), in one contiguous block per user, so a query costs time
+    proportional to that user's history rather than the whole table. The block is scored in the
+    projected space, then the best `rerank_factor * limit` candidates are
+    reranked with their exact 2048-d vectors read back from the database.
+
+    The table is the source of truth. sync() picks up rows written by any
+    worker process since the last call, so each process builds its index
+    lazily and keeps it current without coordination. New rows are found by
+    meal id, and ids are not committed in order across processes, so each sync
+    also re-reads the last `rescan_window` ids below the highest indexed one;
+    a row committed later than that many newer meals is only picked up when
+    the index is rebuilt (restart or model change).
+    """
+
+    def __init__(self, dim: int = EMBEDDING_DIM, reduced_dim: int = settings.EMBEDDING_INDEX_DIM,
+                 rerank_factor: int = 8, rescan_window: int = 256, seed: int = 0):
+        rng = np.random.default_rng(seed)
+        projection, _ = np.linalg.qr(rng.standard_normal((dim, reduced_dim)))
+        self._projection = projection.astype(np.float32)
+        self.rerank_factor = rerank_factor
+        self.rescan_window = rescan_window
+        self._lock = threading.Lock()
+        self._reset(None)
+
+    def _reset(self, version: Optional[str]):
+        self._version = version
+        # user id -> (projected vectors, meal ids, row count); arrays grow by doubling.
+        # float32 on purpose: converting float16 at query time costs more than the matmul
+        self._users: Dict[int, Tuple[np.ndarray, np.ndarray, int]] = {}
+        self._count = 0
+        self._last_meal_id = 0
+        self._recent = set() # Indexed meal ids within the rescan window
+
+    def _project(self, vectors: np.ndarray) -> np.ndarray:
+        reduced = vectors.astype(np.float32) @ self._projection
+        reduced /= np.linalg.norm(reduced, axis=1, keepdims=True) + 1e-12
+        return reduced
+
+    def _append(self, meal_ids: List[int], user_ids: List[int], vectors: List[bytes]):
+        reduced = self._project(np.stack([np.frombuffer(v, dtype=np.float16) for v in vectors]))
+        for meal_id, user_id, vector in zip(meal_ids, user_ids, reduced):
+            block, ids, count = self._users.get(user_id) or (
+                np.empty((16, reduced.shape[1]), dtype=np.float32), np.empty(16, dtype=np.int64), 0)
+            if count == len(ids):
+                block = np.resize(block, (2 * count, block.shape[1]))
+                ids = np.resize(ids, 2 * count)
+            block[count] = vector
+            ids[count] = meal_id
+            self._users[user_id] = (block, ids, count + 1)
+        self._count += len(meal_ids)
+        self._last_meal_id = max(self._last_meal_id, max(meal_ids))
+        floor = self._last_meal_id - self.rescan_window
+        self._recent = {meal_id for meal_id in self._recent if meal_id > floor}
+        self._recent.update(meal_id for meal_id in meal_ids if meal_id > floor)
+
+    def sync(self, db: Session, version: str, chunk_size: int = 4096):
+        """Indexes embeddings for `version` committed since the last sync."""
+        with self._lock:
+            if version != self._version:
+                self._reset(version)
+            query = (
+                db.query(MealEmbedding.meal_id, MealEmbedding.user_id, MealEmbedding.vector)
+                .filter(
+                    MealEmbedding.model_version == version,
+                    MealEmbedding.meal_id > self._last_meal_id - self.rescan_window,
+                )
+                .order_by(MealEmbedding.meal_id)
+                .yield_per(chunk_size)
+            )
+            batch = []
+            for row in query:
+                if row.meal_id in self._recent:
+                    continue
+                batch.append(row)
+                if len(batch) == chunk_size:
+                    self._append(*zip(*batch))
+                    batch = []
+            if batch:
+                self._append(*zip(*batch))
+
+    @staticmethod
+    def store(db: Session, meal_id: int, user_id: int, version: str, vector: np.ndarray):
+        """Adds the embedding row to the session; commit it together with its Meal."""
+        db.add(MealEmbedding(
+            meal_id=meal_id,
+            user_id=user_id,
+            model_version=version,
+            vector=np.asarray(vector, dtype=np.float16).tobytes(),
+        ))
+
+    def similar(self, db: Session, meal_id: int, user_id: int, version: str, limit: int = 5) -> Optional[List[Tuple[int, float]]]:
+        """
+        (meal id, cosine similarity) for the user's `limit` meals most similar to `meal_id`,
+        best first. None when the meal has no embedding from the current model.
+        """
+        target = db.query(MealEmbedding).filter(
+            MealEmbedding.meal_id == meal_id, MealEmbedding.model_version == version
+        ).first()
+        if target is None:
+            return None
+        query = np.frombuffer(target.vector, dtype=np.float16).astype(np.float32)
+
+        self.sync(db, version)
+        with self._lock:
+            block, ids, count = self._users.get(user_id, (None, None, 0))
+            if count == 0:
+                return []
+            candidates = ids[:count].copy()
+            scores = block[:count] @ self._project(query[None, :])[0]
+
+        keep = candidates != meal_id
+        candidates, scores = candidates[keep], scores[keep]
+        shortlist = min(len(candidates), limit * self.rerank_factor)
+        if shortlist == 0:
+            return []
+        top = np.argpartition(-scores, shortlist - 1)[:shortlist]
+        shortlisted = [int(m) for m in candidates[top]]
+
+        # Exact rerank on the stored full vectors
+        exact = db.query(MealEmbedding.meal_id, MealEmbedding.vector).filter(MealEmbedding.meal_id.in_(shortlisted)).all()
+        ranked = sorted(
+            ((mid, float(np.frombuffer(vec, dtype=np.float16).astype(np.float32) @ query)) for mid, vec in exact),
+            key=lambda item: -item[1],
+        )
+        return ranked[:limit]
+
+    def stats(self):
+        return {"version": self._version, "indexed": self._count, "users": len(self._users)}
+
+
+embedding_index = EmbeddingIndex()
@@ -0,0 +1,89 @@
+import os
+import re
+import sqlite3
+import threading
+from typing import Any, Dict, List, Optional
+
+# Built by scripts/import_fdc.py
+SCHEMA = """
+CREATE TABLE foods (
+    fdc_id INTEGER PRIMARY KEY,
+    data_type TEXT NOT NULL,
+    description TEXT NOT NULL,
+    calories REAL NOT NULL, -- all macros per 100 g
+    protein REAL NOT NULL,
+    carbs REAL NOT NULL,
+    fats REAL NOT NULL
+);
+CREATE VIRTUAL TABLE foods_fts USING fts5(
+    description, content='foods', content_rowid='fdc_id', tokenize='porter unicode61'
+);
+CREATE TABLE meta (key TEXT PRIMARY KEY, value TEXT);
+"""
+
+# Generic/reference foods describe a dish better than a single manufacturer's product
+_DATA_TYPE_PENALTY = "CASE f.data_type WHEN 'branded_food' THEN 3.0 ELSE 0.0 END"
+
+_SEARCH_SQL = f"""
+SELECT f.fdc_id, f.description, f.data_type, f.calories, f.protein, f.carbs, f.fats
+FROM foods_fts JOIN foods f ON f.fdc_id = foods_fts.rowid
+WHERE foods_fts MATCH ?
+ORDER BY bm25(foods_fts) + {_DATA_TYPE_PENALTY}
+LIMIT ?
+"""
+
+
+def fts_terms(query: str) -> List[str]:
+    """Lowercase word tokens, quoted so FTS5 never parses user text as query syntax."""
+    return [f'"{token}"' for token in re.findall(r"[a-z0-9]+", query.lower())]
+
+
+class LocalFoodDatabase:
+    """
+    Read-only FoodData Central lookups against the SQLite file built by
+    scripts/import_fdc.py. Each thread gets its own connection.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self._local = threading.local()
+
+    @property
+    def available(self) -> bool:
+        return os.path.exists(self.path)
+
+    def _connection(self) -> sqlite3.Connection:
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(f"file:{self.path}?mode=ro", uri=True, check_same_thread=False)
+            conn.row_factory = sqlite3.Row
+            self._local.conn = conn
+        return conn
+
+    def search(self, query: str, limit: int = 5, require_all: bool = False) -> List[Dict[str, Any]]:
+        """
+        Best matches for `query`, most relevant first. Every word must match;
+        if nothing does, any word may (so "Pho" or "Takoyaki" still find something)
+        unless `require_all` is set.
+        """
+        terms = fts_terms(query)
+        if not terms:
+            return []
+        conn = self._connection()
+        rows = conn.execute(_SEARCH_SQL, (" AND ".join(terms), limit)).fetchall()
+        if not rows and len(terms) > 1 and not require_all:
+            rows = conn.execute(_SEARCH_SQL, (" OR ".join(terms), limit)).fetchall()
+        return [dict(row) for row in rows]
+
+    def lookup(self, query: str) -> Optional[Dict[str, float]]:
+        """Per-100g macros of the best match, in NutritionService's format; None if nothing matches."""
+        matches = self.search(query, limit=1)
+        if not matches:
+            return None
+        best = matches[0]
+        return {
+            "calories": best["calories"],
+            "protein": best["protein"],
+            "carbs": best["carbs"],
+            "fats": best["fats"],
+        }
@@ -0,0 +1,141 @@
+import asyncio
+import time
+from collections import Counter, deque
+from dataclasses import dataclass, field
+from typing import Any, Awaitable, Callable, Dict, List
+
+
+class InferenceQueueFull(RuntimeError):
+    """Raised when the inference queue is at capacity and cannot accept more work."""
+
+
+@dataclass
+class _PendingItem:
+    payload: Any
+    future: asyncio.Future
+    enqueued_at: float
+
+
+@dataclass
+class BatcherStats:
+    batches: int = 0
+    items: int = 0
+    rejected: int = 0
+    errors: int = 0
+    batch_sizes: Counter = field(default_factory=Counter)
+    queue_ms: deque = field(default_factory=lambda: deque(maxlen=1024))
+
+    def snapshot(self) -> Dict[str, Any]:
+        recent = sorted(self.queue_ms)
+        p95 = recent[int(0.95 * (len(recent) - 1))] if recent else 0.0
+        return {
+            "batches": self.batches,
+            "items": self.items,
+            "rejected": self.rejected,
+            "errors": self.errors,
+            "avg_batch_size": self.items / self.batches if self.batches else 0.0,
+            "batch_size_histogram": dict(sorted(self.batch_sizes.items())),
+            "avg_queue_ms": sum(recent) / len(recent) if recent else 0.0,
+            "p95_queue_ms": p95,
+        }
+
+
+class InferenceBatcher:
+    """
+    Collects concurrent inference requests into micro-batches.
+
+    Items submitted within `max_wait_ms` of the first queued item (or until
+    `max_batch_size` is reached) are handed to `process_batch` as one list, and
+    each caller receives the result at its own position in the returned list.
+    `process_batch` is a coroutine function so the forward pass can run off
+    the event loop; requests keep queuing into the next batch meanwhile.
+    """
+
+    def __init__(
+        self,
+        process_batch: Callable[[List[Any]], Awaitable[List[Any]]],
+        max_batch_size: int = 8,
+        max_wait_ms: float = 10.0,
+        max_queue_size: int = 64,
+    ):
+        self.process_batch = process_batch
+        self.max_batch_size = max(1, max_batch_size)
+        self.max_wait_s = max(0.0, max_wait_ms) / 1000.0
+        self.max_queue_size = max_queue_size
+        self.stats = BatcherStats()
+
+        # Created lazily so they bind to the loop that is actually serving requests
+        self._loop = None
+        self._queue = None
+        self._batch_full = None
+        self._worker = None
+
+    def _ensure_started(self):
+        loop = asyncio.get_running_loop()
+        if self._loop is loop and self._worker and not self._worker.done():
+            return
+        self._loop = loop
+        self._queue = asyncio.Queue(maxsize=self.max_queue_size)
+        self._batch_full = asyncio.Event()
+        self._worker = loop.create_task(self._run())
+
+    async def submit(self, payload: Any) -> Any:
+        self._ensure_started()
+        future = self._loop.create_future()
+        try:
+            self._queue.put_nowait(_PendingItem(payload, future, time.perf_counter()))
+        except asyncio.QueueFull:
+            self.stats.rejected += 1
+            raise InferenceQueueFull(
+                f"Inference queue is full ({self.max_queue_size} pending requests)"
+            )
+
+        # The worker already holds the first item of the batch it is filling
+        if self._queue.qsize() >= self.max_batch_size - 1:
+            self._batch_full.set()
+
+        return await future
+
+    async def _run(self):
+        while True:
+            first = await self._queue.get()
+            batch = [first]
+
+            remaining = self.max_wait_s - (time.perf_counter() - first.enqueued_at)
+            if remaining > 0 and self._queue.qsize() < self.max_batch_size - 1:
+                self._batch_full.clear()
+                try:
+                    await asyncio.wait_for(self._batch_full.wait(), remaining)
+                except asyncio.TimeoutError:
+                    pass
+
+            while len(batch) < self.max_batch_size and not self._queue.empty():
+                batch.append(self._queue.get_nowait())
+
+            await self._dispatch(batch)
+
+    async def _dispatch(self, batch: List[_PendingItem]):
+        # Callers that gave up (client disconnect, timeout) don't need a forward pass
+        batch = [item for item in batch if not item.future.cancelled()]
+        if not batch:
+            return
+
+        started = time.perf_counter()
+        for item in batch:
+            self.stats.queue_ms.append((started - item.enqueued_at) * 1000.0)
+        self.stats.batches += 1
+        self.stats.items += len(batch)
+        self.stats.batch_sizes[len(batch)] += 1
+
+        try:
+            results = await self.process_batch([item.payload for item in batch])
+        except Exception as e:
+            self.stats.errors += 1
+            for item in batch:
+                if not item.future.done():
+                    item.future.set_exception(e)
+            return
+
+        for item, result in zip(batch, results):
+            if not item.future.done():
+                item.future.set_result(result)
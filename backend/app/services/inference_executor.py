@@ -0,0 +1,111 @@
+import asyncio
+import functools
+import os
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Dict
+
+import torch
+
+from app.services.inference_batcher import InferenceQueueFull
+
+
+def resolve_torch_threads(requested: int, workers: int, processes: int = 1) -> int:
+    """
+    Intra-op threads per thread running torch; 0 means split the cores evenly
+    across `workers` such threads in every server process, so N
+    uvicorn/gunicorn workers don't oversubscribe the node.
+    """
+    if requested > 0:
+        return requested
+    return max(1, (os.cpu_count() or 1) // (max(1, workers) * max(1, processes)))
+
+
+class InferenceExecutor:
+    """
+    Dedicated threads for CPU-bound vision work, off the asyncio event loop:
+    `max_workers` threads for decode and transforms, plus one forward thread
+    for model passes (run with `forward=True`). Forwards run one at a time
+    (the batcher dispatches one batch at a time anyway), so the forward
+    thread gets this process's full share of the cores while decode threads
+    split it.
+
+    Applies backpressure: once `max_workers + max_queue` calls are in flight,
+    new admissions fail fast with InferenceQueueFull instead of piling up
+    behind the model.
+    """
+
+    def __init__(self, max_workers: int = 2, max_queue: int = 32, torch_threads: int = 0, processes: int = 1):
+        self.max_workers = max(1, max_workers)
+        self.max_pending = self.max_workers + max(0, max_queue)
+        self.torch_threads = resolve_torch_threads(torch_threads, self.max_workers, processes)
+        self.forward_torch_threads = resolve_torch_threads(torch_threads, 1, processes)
+
+        self._pool = None
+        self._forward_pool = None
+        self._pending = 0
+        self.completed = 0
+        self.failed = 0
+        self.rejected = 0
+
+    def _get_pool(self, forward: bool = False) -> ThreadPoolExecutor:
+        # OpenMP thread counts are per calling thread, so set them in every worker
+        if forward:
+            if self._forward_pool is None:
+                self._forward_pool = ThreadPoolExecutor(
+                    max_workers=1,
+                    thread_name_prefix="inference-forward",
+                    initializer=torch.set_num_threads,
+                    initargs=(self.forward_torch_threads,),
+                )
+            return self._forward_pool
+        if self._pool is None:
+            self._pool = ThreadPoolExecutor(
+                max_workers=self.max_workers,
+                thread_name_prefix="inference",
+                initializer=torch.set_num_threads,
+                initargs=(self.torch_threads,),
+            )
+        return self._pool
+
+    async def run(self, fn: Callable[..., Any], *args, bounded: bool = True, forward: bool = False) -> Any:
+        """
+        Runs `fn(*args)` on a decode thread, or on the forward thread with
+        `forward`. Work that was already admitted upstream (e.g. a batch of
+        preprocessed images) passes `bounded=False` so it is never rejected
+        halfway through a request.
+        """
+        if bounded and self._pending >= self.max_pending:
+            self.rejected += 1
+            raise InferenceQueueFull(
+                f"Inference executor is saturated ({self._pending} calls in flight)"
+            )
+
+        self._pending += 1
+        try:
+            loop = asyncio.get_running_loop()
+            result = await loop.run_in_executor(self._get_pool(forward), functools.partial(fn, *args))
+        except BaseException:
+            self.failed += 1 # Includes callers cancelled while waiting
+            raise
+        finally:
+            self._pending -= 1
+        self.completed += 1
+        return result
+
+    def shutdown(self):
+        for pool in (self._pool, self._forward_pool):
+            if pool is not None:
+                pool.shutdown(wait=False, cancel_futures=True)
+        self._pool = self._forward_pool = None
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "workers": self.max_workers,
+            "torch_threads": self.torch_threads,
+            "forward_torch_threads": self.forward_torch_threads,
+            "in_flight": self._pending,
+            "max_in_flight": self.max_pending,
+            "completed": self.completed,
+            "failed": self.failed,
+            "rejected": self.rejected,
+        }
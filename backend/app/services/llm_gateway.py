@@ -0,0 +1,370 @@
+import asyncio
+import hashlib
+import math
+import random
+import time
+from contextlib import AsyncExitStack, asynccontextmanager
+from typing import Any, AsyncIterator, Dict, List, Optional, Protocol
+
+import vertexai
+from vertexai.generative_models import Content, GenerativeModel, Part
+
+from app.core.config import settings
+from app.services.upstream import UpstreamStats
+
+# Pseudo-words the fake backend builds its replies from
+FAKE_WORDS = (
+    "protein", "fiber", "portion", "vegetables", "balance", "hydration", "whole", "grains",
+    "snack", "energy", "sugar", "salt", "lean", "colorful", "plate", "steady", "habit", "meal",
+)
+
+
+class LLMBackend(Protocol):
+    """
+    A text generation backend. `history` (a list of {"role", "text"}, possibly
+    empty) makes the call a chat turn; None makes it a single prompt.
+    """
+
+    name: str
+
+    @property
+    def available(self) -> bool: ...
+
+    async def complete(self, prompt: str, history: Optional[List[Dict[str, str]]] = None) -> str: ...
+
+    def stream(self, prompt: str, history: Optional[List[Dict[str, str]]] = None) -> AsyncIterator[str]: ...
+
+
+class VertexBackend:
+    """Gemini on Vertex AI. vertexai.init is deferred to first use so importing the app stays fast."""
+
+    name = "vertex"
+
+    def __init__(self, project_id: Optional[str], location: Optional[str], model_name: str):
+        self.project_id = project_id
+        self.location = location
+        self.model_name = model_name
+        self.model = None
+        self._initialized = False
+
+    def _get_model(self):
+        if not self._initialized:
+            self._initialized = True
+            print("LOCATION AND PROJECT ID:", self.location, self.project_id)
+            if self.project_id and self.location:
+                vertexai.init(project=self.project_id, location=self.location)
+                self.model = GenerativeModel(self.model_name)
+        return self.model
+
+    @property
+    def available(self) -> bool:
+        return self._get_model() is not None
+
+    def _start_chat(self, history: List[Dict[str, str]]):
+        # Convert internal history format to Gemini format
+        gemini_history = []
+        for msg in history:
+            role = 'user' if msg['role'] == 'user' else 'assistant'
+            text_part = Part.from_text(msg["text"])
+            gemini_history.append(Content(role=role, parts=[text_part]))
+        return self.model.start_chat(history=gemini_history)
+
+    async def _send(self, prompt: str, history: Optional[List[Dict[str, str]]], stream: bool):
+        if history is None:
+            return await self.model.generate_content_async(prompt, stream=stream)
+        return await self._start_chat(history).send_message_async(prompt, stream=stream)
+
+    async def complete(self, prompt: str, history: Optional[List[Dict[str, str]]] = None) -> str:
+        response = await self._send(prompt, history, stream=False)
+        return response.text
+
+    async def stream(self, prompt: str, history: Optional[List[Dict[str, str]]] = None) -> AsyncIterator[str]:
+        responses = await self._send(prompt, history, stream=True)
+        async for chunk in responses:
+            try:
+                text = chunk.text
+            except ValueError:
+                continue # chunk without text, e.g. the final one with only finish metadata
+            if text:
+                yield text
+
+
+class FakeBackend:
+    """
+    Deterministic local stand-in for load tests and CI: the reply is derived
+    from a hash of the prompt, and latencies come from a seeded distribution
+    ("fixed", "uniform", "lognormal" or "exponential" around `latency_ms`,
+    with `spread` as the relative width / log-space sigma). The first token
+    arrives after the drawn latency, then one token every `token_ms`.
+    """
+
+    name = "fake"
+    available = True
+
+    def __init__(
+        self,
+        latency_ms: float = 800.0,
+        distribution: str = "lognormal",
+        spread: float = 0.5,
+        token_ms: float = 20.0,
+        tokens: int = 60,
+        error_rate: float = 0.0,
+        seed: int = 0,
+    ):
+        if distribution not in ("fixed", "uniform", "lognormal", "exponential"):
+            raise ValueError(f"Unknown fake LLM latency distribution: {distribution}")
+        self.latency_ms = latency_ms
+        self.distribution = distribution
+        self.spread = spread
+        self.token_ms = token_ms
+        self.tokens = tokens
+        self.error_rate = error_rate
+        self.rng = random.Random(seed)
+
+    def _first_token_seconds(self) -> float:
+        if self.distribution == "uniform":
+            ms = self.rng.uniform(self.latency_ms * (1 - self.spread), self.latency_ms * (1 + self.spread))
+        elif self.distribution == "lognormal":
+            ms = self.rng.lognormvariate(math.log(self.latency_ms), self.spread) # median = latency_ms
+        elif self.distribution == "exponential":
+            ms = self.rng.expovariate(1.0 / self.latency_ms)
+        else:
+            ms = self.latency_ms
+        return max(ms, 0.0) / 1000.0
+
+    def _words(self, prompt: str, history: Optional[List[Dict[str, str]]]) -> List[str]:
+        seed = prompt + "".join(m["text"] for m in history or [])
+        digest = hashlib.sha256(seed.encode("utf-8")).digest()
+        words = [FAKE_WORDS[digest[i % len(digest)] % len(FAKE_WORDS)] for i in range(max(self.tokens - 1, 0))]
+        return ["[fake]"] + words
+
+    def _maybe_fail(self):
+        if self.error_rate and self.rng.random() < self.error_rate:
+            raise RuntimeError("Fake LLM backend error")
+
+    async def complete(self, prompt: str, history: Optional[List[Dict[str, str]]] = None) -> str:
+        words = self._words(prompt, history)
+        await asyncio.sleep(self._first_token_seconds() + self.token_ms / 1000.0 * (len(words) - 1))
+        self._maybe_fail()
+        return " ".join(words)
+
+    async def stream(self, prompt: str, history: Optional[List[Dict[str, str]]] = None) -> AsyncIterator[str]:
+        words = self._words(prompt, history)
+        await asyncio.sleep(self._first_token_seconds())
+        self._maybe_fail()
+        for i, word in enumerate(words):
+            if i:
+                await asyncio.sleep(self.token_ms / 1000.0)
+            yield word if i == 0 else " " + word
+
+
+def create_backend(name: str) -> LLMBackend:
+    if name == "fake":
+        return FakeBackend(
+            latency_ms=settings.LLM_FAKE_LATENCY_MS,
+            distribution=settings.LLM_FAKE_LATENCY_DISTRIBUTION,
+            spread=settings.LLM_FAKE_LATENCY_SPREAD,
+            token_ms=settings.LLM_FAKE_TOKEN_MS,
+            tokens=settings.LLM_FAKE_TOKENS,
+            error_rate=settings.LLM_FAKE_ERROR_RATE,
+            seed=settings.LLM_FAKE_SEED,
+        )
+    if name == "vertex":
+        return VertexBackend(settings.GCP_PROJECT_ID, settings.GCP_LOCATION, settings.LLM_MODEL)
+    raise ValueError(f"Unknown LLM backend: {name}")
+
+
+class LLMGateway:
+    """
+    Every LLM call goes through here. Calls hold a per-user and a global
+    concurrency slot, so a traffic spike queues instead of fanning out, and
+    one user can't take all the slots. The deadline covers the wait for a
+    slot as well as generation; on expiry asyncio.TimeoutError is raised,
+    which LLMService turns into its fallback message.
+
+    With `hedge_after_seconds`, a non-streaming call still running after that
+    long gets a second identical call if a global slot is free; the first
+    result wins and the other call is cancelled.
+    """
+
+    def __init__(
+        self,
+        backend: LLMBackend,
+        max_concurrency: int = 16,
+        per_user_concurrency: int = 2,
+        timeout_seconds: float = 60.0,
+        hedge_after_seconds: float = 0.0,
+    ):
+        self.backend = backend
+        self.max_concurrency = max_concurrency
+        self.per_user_concurrency = per_user_concurrency
+        self.timeout_seconds = timeout_seconds
+        self.hedge_after_seconds = hedge_after_seconds
+
+        self._global = asyncio.Semaphore(max_concurrency)
+        # user_id -> [semaphore, callers holding or waiting for it]; dropped when unused
+        self._users: Dict[Any, list] = {}
+        self.waiting = 0
+        self.in_flight = 0
+        self.peak_in_flight = 0
+
+        self.call_stats = UpstreamStats()
+        self.timeouts = 0
+        self.hedges = 0
+        self.hedge_wins = 0
+
+    @property
+    def available(self) -> bool:
+        return self.backend.available
+
+    @asynccontextmanager
+    async def _slot(self, user_id: Any = None):
+        entry = None
+        if user_id is not None:
+            entry = self._users.setdefault(user_id, [asyncio.Semaphore(self.per_user_concurrency), 0])
+            entry[1] += 1
+        self.waiting += 1
+        user_acquired = global_acquired = False
+        try:
+            if entry is not None:
+                await entry[0].acquire()
+                user_acquired = True
+            await self._global.acquire()
+            global_acquired = True
+            self.waiting -= 1
+            self.in_flight += 1
+            self.peak_in_flight = max(self.peak_in_flight, self.in_flight)
+            yield
+        finally:
+            if global_acquired:
+                self.in_flight -= 1
+                self._global.release()
+            else:
+                self.waiting -= 1
+            if entry is not None:
+                if user_acquired:
+                    entry[0].release()
+                entry[1] -= 1
+                if entry[1] == 0:
+                    self._users.pop(user_id, None)
+
+    async def complete(
+        self,
+        prompt: str,
+        history: Optional[List[Dict[str, str]]] = None,
+        user_id: Any = None,
+        timeout: Optional[float] = None,
+    ) -> str:
+        started = time.perf_counter()
+        ok = False
+        try:
+            result = await asyncio.wait_for(
+                self._complete(prompt, history, user_id), timeout=timeout or self.timeout_seconds
+            )
+            ok = True
+            return result
+        except asyncio.TimeoutError:
+            self.timeouts += 1
+            raise
+        finally:
+            self.call_stats.record((time.perf_counter() - started) * 1000.0, ok)
+
+    async def _complete(self, prompt: str, history: Optional[List[Dict[str, str]]], user_id: Any) -> str:
+        async with self._slot(user_id):
+            if self.hedge_after_seconds <= 0:
+                return await self.backend.complete(prompt, history)
+            return await self._hedged(prompt, history)
+
+    async def _hedged(self, prompt: str, history: Optional[List[Dict[str, str]]]) -> str:
+        primary = asyncio.ensure_future(self.backend.complete(prompt, history))
+        tasks = [primary]
+        hedge_slot = False
+        try:
+            done, _ = await asyncio.wait(tasks, timeout=self.hedge_after_seconds)
+            # Only hedge with spare capacity, so hedges never add to a queue
+            if not done and not self._global.locked():
+                await self._global.acquire()
+                hedge_slot = True
+                self.hedges += 1
+                tasks.append(asyncio.ensure_future(self.backend.complete(prompt, history)))
+
+            pending = set(tasks)
+            while pending:
+                done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                for task in done:
+                    if task.exception() is None:
+                        if task is not primary:
+                            self.hedge_wins += 1
+                        return task.result()
+            return primary.result() # Both failed: raise the primary call's error
+        finally:
+            for task in tasks:
+                task.cancel()
+            if hedge_slot:
+                self._global.release()
+
+    async def stream(
+        self,
+        prompt: str,
+        history: Optional[List[Dict[str, str]]] = None,
+        user_id: Any = None,
+        timeout: Optional[float] = None,
+        first_chunk_timeout: Optional[float] = None,
+    ) -> AsyncIterator[str]:
+        """
+        Text chunks of one generation, holding the call's slots until the stream
+        ends or is closed; consumers that stop early must aclose() it rather than
+        leave that to garbage collection. `timeout` bounds the whole stream,
+        `first_chunk_timeout` the time (including the wait for a slot) until the first chunk.
+        """
+        started = time.monotonic()
+        deadline = started + (timeout or self.timeout_seconds)
+        first_deadline = min(deadline, started + first_chunk_timeout) if first_chunk_timeout else deadline
+        ok = False
+        try:
+            async with AsyncExitStack() as stack:
+                # The slot is released by the stack as soon as it is acquired, whether the
+                # stream ends, fails, times out or is closed
+                async with asyncio.timeout(max(first_deadline - time.monotonic(), 0.0)):
+                    await stack.enter_async_context(self._slot(user_id))
+                iterator = self.backend.stream(prompt, history).__aiter__()
+                if hasattr(iterator, "aclose"):
+                    stack.push_async_callback(iterator.aclose)
+                limit = first_deadline
+                while True:
+                    try:
+                        chunk = await asyncio.wait_for(iterator.__anext__(), timeout=max(limit - time.monotonic(), 0.0))
+                    except StopAsyncIteration:
+                        ok = True
+                        return
+                    limit = deadline
+                    yield chunk
+        except asyncio.TimeoutError:
+            self.timeouts += 1
+            raise
+        finally:
+            self.call_stats.record((time.monotonic() - started) * 1000.0, ok)
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "backend": self.backend.name,
+            "max_concurrency": self.max_concurrency,
+            "per_user_concurrency": self.per_user_concurrency,
+            "in_flight": self.in_flight,
+            "peak_in_flight": self.peak_in_flight,
+            "waiting": self.waiting,
+            "users": len(self._users),
+            **self.call_stats.stats(),
+            "timeouts": self.timeouts,
+            "hedges": self.hedges,
+            "hedge_wins": self.hedge_wins,
+        }
+
+
+llm_gateway = LLMGateway(
+    create_backend(settings.LLM_BACKEND),
+    max_concurrency=settings.LLM_MAX_CONCURRENCY,
+    per_user_concurrency=settings.LLM_MAX_CONCURRENCY_PER_USER,
+    timeout_seconds=settings.LLM_TIMEOUT_SECONDS,
+    hedge_after_seconds=settings.LLM_HEDGE_AFTER_SECONDS,
+)
@@ -1,49 +1,87 @@
-from typing import List, Dict, Any
+from typing import AsyncIterator, Callable, List, Dict, Any, Optional
 import os
+import asyncio
+from contextlib import aclosing
 import google.generativeai as genai
 
 from app.core.config import settings
+from app.services.advice_cache import advice_cache, advice_key
+from app.services.llm_gateway import llm_gateway
 
-from vertexai.generative_models import GenerativeModel
-import vertexai
 from vertexai.language_models import TextGenerationModel
 from vertexai.preview.language_models import ChatMessage
-from vertexai.generative_models import Part, Content
+
+
+def coaching_profile(user) -> Dict[str, Any]:
+    # Mock user profile (augmented with real User data)
+    return {
+        "goal": "lose weight", 
+        "preferences": "low carb",
+        "language": user.language or "en"
+    }
+
+
+# Fields of a meal that the advice prompt (and so its cache key) uses
+ADVICE_FIELDS = ("food_name", "portion_size", "calories", "protein", "carbs", "fats", "candidates")
+
+
+def advice_inputs(meal) -> Dict[str, Any]:
+    """
+    The advice prompt inputs from an upload's meal_data or a saved Meal, so
+    inline, background and streamed advice share prompts and cache keys.
+    """
+    if isinstance(meal, dict):
+        return {field: meal.get(field) for field in ADVICE_FIELDS}
+    return {field: getattr(meal, field) for field in ADVICE_FIELDS}
 
 
 class LLMService:
-    def __init__(self):
+    """
+    Prompts and fallback messages for meal advice and the coach chat. Calls go
+    through the LLM gateway (concurrency limits, deadlines, backend choice).
+    """
+
+    def __init__(self, gateway=llm_gateway):
         self.api_key = settings.GEMINI_API_KEY
-        self.model = None
-        self.project_id = settings.GCP_PROJECT_ID
-        self.location = settings.GCP_LOCATION 
-        self.model = None
-        print("LOCATION AND PROJECT ID:", self.location, self.project_id)
-        if self.project_id and self.location:
-            vertexai.init(
-                project=self.project_id,
-                location=self.location,
-            )
-            self.model = GenerativeModel("gemini-2.5-pro")
+        self.gateway = gateway
+
+    def _advice_available(self) -> bool:
+        # Vertex advice has always also required GEMINI_API_KEY; other backends don't need it
+        return self.gateway.available and (bool(self.api_key) or self.gateway.backend.name != "vertex")
             
-    async def generate_dietary_analysis(self, meal_data: Dict[str, Any], user_profile: Dict[str, Any]) -> str:
+    async def generate_dietary_analysis(
+        self,
+        meal_data: Dict[str, Any],
+        user_profile: Dict[str, Any],
+        strict: bool = False,
+        user_id: Optional[int] = None,
+    ) -> str:
         """
         Generates personalized dietary advice based on the identified meal and user profile using Gemini.
+        With `strict` (background jobs), errors and timeouts raise instead of being returned as text
+        (so callers can retry) and the longer LLM_TIMEOUT_SECONDS deadline applies.
+        Answers come from the advice cache when its variant pool for these inputs is full.
         """
-        if not self.api_key or not self.model:
-            return (
-                "AI Analysis (Mock - Gemini): Based on your meal of "
-                f"{meal_data.get('food_name', 'unknown food')}, here are some insights. "
-                "Ensure you balance your macros! (Configure GEMINI_API_KEY for real insights)"
-            )
+        if not self._advice_available():
+            return self._mock_analysis(meal_data)
             
         prompt = self._construct_prompt(meal_data, user_profile)
+        timeout = settings.LLM_TIMEOUT_SECONDS if strict else settings.LLM_INTERACTIVE_TIMEOUT_SECONDS
+
+        async def generate() -> str:
+            return await self.gateway.complete(prompt, user_id=user_id, timeout=timeout)
         
         try:
-            # Gemini async generation
-            response = await self.model.generate_content_async(prompt)
-            return response.text
+            if settings.ADVICE_CACHE_ENABLED:
+                return await advice_cache.get_or_generate(advice_key(meal_data, user_profile), generate)
+            return await generate()
+        except asyncio.TimeoutError:
+            if strict:
+                raise
+            return "AI analysis is taking too long right now. Please try again in a moment."
         except Exception as e:
+            if strict:
+                raise
             return f"Error generating analysis with Gemini: {str(e)}"
 
     def _construct_prompt(self, meal_data: Dict, user_profile: Dict) -> str:
@@ -70,29 +108,173 @@ class LLMService:
         base_prompt += "\nProvide brief, actionable advice."
         return base_prompt
 
-    async def generate_chat_response(self, history: List[Dict[str, str]], message: str, context: str = "") -> str:
+    async def generate_chat_response(
+        self,
+        history: List[Dict[str, str]],
+        message: str,
+        context: str = "",
+        strict: bool = False,
+        user_id: Optional[int] = None,
+    ) -> str:
         """
         Generates a chat response using Gemini, maintaining conversation history.
+        With `strict`, errors, timeouts and a missing model raise instead of being returned as text.
         """
-        if not self.model:
+        if not self.gateway.available:
+            if strict:
+                raise RuntimeError("No chat model configured")
             return "I'm sorry, I cannot chat right now because the API key is missing."
 
         try:
-            # Convert internal history format to Gemini format
-            gemini_history = []
-            for msg in history:
-                role = 'user' if msg['role'] == 'user' else 'assistant'
-                text_part = Part.from_text(msg["text"])
-                history = Content(role=role, parts=[text_part])
-                gemini_history.append(history)       
-            chat = self.model.start_chat(history=gemini_history)
-            
-            # Prepend context to the message so the model knows the current state
-            full_message = f"{context}\n\nUser Question: {message}" if context else message
-            
-            response = await chat.send_message_async(full_message)
-            return response.text
+            full_message = self._chat_message(message, context)
+            return await self.gateway.complete(
+                full_message, history=history, user_id=user_id, timeout=settings.LLM_INTERACTIVE_TIMEOUT_SECONDS
+            )
+        except asyncio.TimeoutError:
+            if strict:
+                raise
+            return "The AI Coach is taking too long to respond. Please try again in a moment."
         except Exception as e:
+            if strict:
+                raise
             return f"Error communicating with AI Coach: {str(e)}"
 
+    async def summarize_conversation(
+        self,
+        summary: Optional[str],
+        messages: List[Dict[str, str]],
+        max_tokens: int,
+        user_id: Optional[int] = None,
+    ) -> str:
+        """
+        Folds `messages` into the running `summary` of a chat session. Raises on
+        errors and timeouts (and without a model), so the previous summary is kept.
+        """
+        if not self.gateway.available:
+            raise RuntimeError("No chat model configured")
+
+        transcript = "\n".join(f"{m['role'].capitalize()}: {m['text']}" for m in messages)
+        prompt = (
+            "You maintain a running summary of a conversation between a user and their AI nutrition coach. "
+            f"Update the summary with the new turns below, in at most {max_tokens * 3 // 4} words. "
+            "Keep facts the coach needs later: goals, preferences, allergies, foods eaten, advice given and open questions. "
+            "Write it in the language of the conversation and reply with the summary only."
+            f"\n\nCurrent summary: {summary or 'None yet.'}\n\nNew turns:\n{transcript}"
+        )
+        text = await self.gateway.complete(prompt, user_id=user_id)
+        return text.strip()
+
+    def _mock_analysis(self, meal_data: Dict[str, Any]) -> str:
+        return (
+            "AI Analysis (Mock - Gemini): Based on your meal of "
+            f"{meal_data.get('food_name', 'unknown food')}, here are some insights. "
+            "Ensure you balance your macros! (Configure GEMINI_API_KEY for real insights)"
+        )
+
+    def _chat_message(self, message: str, context: str) -> str:
+        # Prepend context to the message so the model knows the current state
+        return f"{context}\n\nUser Question: {message}" if context else message
+
+    async def stream_dietary_analysis(
+        self,
+        meal_data: Dict[str, Any],
+        user_profile: Dict[str, Any],
+        fresh: bool = False,
+        on_complete: Optional[Callable[[str], None]] = None,
+        user_id: Optional[int] = None,
+    ) -> AsyncIterator[str]:
+        """
+        Same advice as generate_dietary_analysis, yielded as text chunks while Gemini generates them.
+        A cached answer is yielded whole; `fresh` always generates (the result still fills the pool).
+        `on_complete` gets the advice only if it is real advice: cached or generated in full,
+        never the mock text or a timeout/error message.
+        """
+        if not self._advice_available():
+            yield self._mock_analysis(meal_data)
+            return
+
+        key = None
+        if settings.ADVICE_CACHE_ENABLED:
+            key = advice_key(meal_data, user_profile)
+            cached = None if fresh else await advice_cache.lookup(key)
+            if cached is not None:
+                yield cached
+                if on_complete is not None:
+                    on_complete(cached)
+                return
+
+        completed: List[str] = []
+        prompt = self._construct_prompt(meal_data, user_profile)
+        async with aclosing(self._stream_text(
+            self.gateway.stream(prompt, user_id=user_id, first_chunk_timeout=settings.LLM_INTERACTIVE_TIMEOUT_SECONDS),
+            "AI analysis is taking too long right now. Please try again in a moment.",
+            "Error generating analysis with Gemini",
+            on_complete=completed.append,
+        )) as texts:
+            async for text in texts:
+                yield text
+        if completed:
+            if key is not None:
+                await advice_cache.add(key, completed[0])
+            if on_complete is not None:
+                on_complete(completed[0])
+
+    async def stream_chat_response(
+        self,
+        history: List[Dict[str, str]],
+        message: str,
+        context: str = "",
+        on_complete: Optional[Callable[[str], None]] = None,
+        user_id: Optional[int] = None,
+    ) -> AsyncIterator[str]:
+        """
+        Same reply as generate_chat_response, yielded as text chunks while Gemini generates them.
+        `on_complete` gets the reply only if it was generated in full (not for error messages).
+        """
+        if not self.gateway.available:
+            yield "I'm sorry, I cannot chat right now because the API key is missing."
+            return
+
+        full_message = self._chat_message(message, context)
+        async with aclosing(self._stream_text(
+            self.gateway.stream(
+                full_message, history=history, user_id=user_id,
+                first_chunk_timeout=settings.LLM_INTERACTIVE_TIMEOUT_SECONDS,
+            ),
+            "The AI Coach is taking too long to respond. Please try again in a moment.",
+            "Error communicating with AI Coach",
+            on_complete=on_complete,
+        )) as texts:
+            async for text in texts:
+                yield text
+
+    async def _stream_text(
+        self,
+        chunks: AsyncIterator[str],
+        timeout_message: str,
+        error_prefix: str,
+        on_complete: Optional[Callable[[str], None]] = None,
+    ) -> AsyncIterator[str]:
+        """
+        Relays a gateway text stream. Timeouts and errors end it with a message,
+        as the non-streaming methods return one. `on_complete` gets the full
+        text only if the stream finished cleanly. `chunks` is closed however
+        this generator ends, releasing its gateway slot.
+        """
+        started = False
+        parts = []
+        try:
+            async for text in chunks:
+                started = True
+                parts.append(text)
+                yield text
+            if on_complete is not None and parts:
+                on_complete("".join(parts))
+        except asyncio.TimeoutError:
+            yield ("\n\n" if started else "") + timeout_message
+        except Exception as e:
+            yield ("\n\n" if started else "") + f"{error_prefix}: {str(e)}"
+        finally:
+            await chunks.aclose()
+
 llm_service = LLMService()
@@ -1,55 +1,85 @@
-import httpx
 from typing import Dict, Any, Optional
 from app.core.config import settings
+from app.services.cache import AsyncTTLCache, SQLiteCacheStore
+from app.services.upstream import upstream_clients
+from app.services.fdc_local import LocalFoodDatabase
+
+
+def nutrition_cache(name: str) -> AsyncTTLCache:
+    """Cache for USDA responses, backed by NUTRITION_CACHE_PATH when set."""
+    store = SQLiteCacheStore(settings.NUTRITION_CACHE_PATH, table=name) if settings.NUTRITION_CACHE_PATH else None
+    return AsyncTTLCache(
+        name,
+        max_entries=settings.NUTRITION_CACHE_MAX_ENTRIES,
+        ttl_seconds=settings.NUTRITION_CACHE_TTL_SECONDS,
+        store=store,
+    )
+
 
 class NutritionService:
     def __init__(self):
         self.api_key = settings.USDA_API_KEY
-        self.base_url = "https://api.nal.usda.gov/fdc/v1"
+        self.usda = upstream_clients.get("usda")
+        self.backend = settings.NUTRITION_BACKEND
+        self.local_db = LocalFoodDatabase(settings.FDC_DB_PATH)
+        # The classifier only emits 101 names, so nearly every lookup is a repeat
+        self.cache = nutrition_cache("nutrition")
         
     async def get_nutrition_info(self, query: str) -> Dict[str, float]:
         """
         Searches USDA database for food item and returns basic macros (per 100g).
         """
+        if self.backend == "local":
+            if self.local_db.available:
+                # Indexed FTS5 query on a local file: sub-millisecond, so it runs inline
+                return self.local_db.lookup(query) or self._get_mock_nutrition()
+            print(f"Warning: Local FDC database not found at {self.local_db.path}. Using the USDA API.")
+
         if not self.api_key:
             print("Warning: No USDA_API_KEY found. Returning mock data.")
             return self._get_mock_nutrition()
 
-        async with httpx.AsyncClient() as client:
-            try:
-                # 1. Search for the food
-                search_params = {
-                    "api_key": self.api_key,
-                    "query": query,
-                    "pageSize": 1,
-                    "dataType": ["Foundation", "Survey (FNDDS)", "Branded"] 
-                }
-                response = await client.get(f"{self.base_url}/foods/search", params=search_params)
-                response.raise_for_status()
-                data = response.json()
-                
-                if not data.get("foods"):
-                    return self._get_mock_nutrition()
-                
-                food_item = data["foods"][0]
-                
-                # 2. Extract Nutrients (Standardized IDs)
-                # 208: Energy (kcal)
-                # 203: Protein (g)
-                # 205: Carbohydrate (g)
-                # 204: Total Lipid/Fat (g)
-                nutrients = {n["nutrientId"]: n["value"] for n in food_item.get("foodNutrients", [])}
-                
-                return {
-                    "calories": nutrients.get(1008, nutrients.get(208, 0.0)), # Energy
-                    "protein": nutrients.get(1003, nutrients.get(203, 0.0)),
-                    "carbs": nutrients.get(1005, nutrients.get(205, 0.0)),
-                    "fats": nutrients.get(1004, nutrients.get(204, 0.0))
-                }
-                
-            except Exception as e:
-                print(f"USDA API Error: {str(e)}")
-                return self._get_mock_nutrition()
+        # Concurrent uploads of the same food share one request. Errors (including
+        # an open circuit) propagate uncached, so later uploads don't get stale mock data.
+        key = " ".join(query.lower().split())
+        try:
+            nutrition = await self.cache.get_or_compute(key, lambda: self._fetch_usda(query))
+        except Exception as e:
+            print(f"USDA API Error: {str(e)}")
+            return self._get_mock_nutrition()
+        return dict(nutrition) if nutrition else self._get_mock_nutrition()
+
+    async def _fetch_usda(self, query: str) -> Optional[Dict[str, float]]:
+        """Per-100g macros of the top USDA match; None if nothing matches. Raises on API errors."""
+        # 1. Search for the food
+        search_params = {
+            "api_key": self.api_key,
+            "query": query,
+            "pageSize": 1,
+            "dataType": ["Foundation", "Survey (FNDDS)", "Branded"] 
+        }
+        response = await self.usda.get("/foods/search", params=search_params)
+        response.raise_for_status()
+        data = response.json()
+
+        if not data.get("foods"):
+            return None
+
+        food_item = data["foods"][0]
+
+        # 2. Extract Nutrients (Standardized IDs)
+        # 208: Energy (kcal)
+        # 203: Protein (g)
+        # 205: Carbohydrate (g)
+        # 204: Total Lipid/Fat (g)
+        nutrients = {n["nutrientId"]: n["value"] for n in food_item.get("foodNutrients", [])}
+
+        return {
+            "calories": nutrients.get(1008, nutrients.get(208, 0.0)), # Energy
+            "protein": nutrients.get(1003, nutrients.get(203, 0.0)),
+            "carbs": nutrients.get(1005, nutrients.get(205, 0.0)),
+            "fats": nutrients.get(1004, nutrients.get(204, 0.0))
+        }
 
     def _get_mock_nutrition(self) -> Dict[str, float]:
         return {
@@ -59,4 +89,11 @@ class NutritionService:
             "fats": 10.0
         }
 
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "backend": self.backend if self.backend != "local" or self.local_db.available else "usda",
+            "cache": self.cache.stats(),
+            "upstream": self.usda.stats(),
+        }
+
 nutrition_service = NutritionService()
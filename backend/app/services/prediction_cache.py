@@ -0,0 +1,18 @@
+import hashlib
+
+from app.core.config import settings
+from app.services.cache import AsyncTTLCache
+
+
+def image_cache_key(image_bytes: bytes, model_version: str) -> str:
+    """Content address of an upload: identical photos hit the same entry until the model changes."""
+    return f"{model_version}:{hashlib.sha256(image_bytes).hexdigest()}"
+
+
+# Vision prediction and portion estimate per uploaded image
+prediction_cache = AsyncTTLCache(
+    "prediction",
+    max_entries=settings.PREDICTION_CACHE_MAX_ENTRIES,
+    ttl_seconds=settings.PREDICTION_CACHE_TTL_SECONDS,
+    max_bytes=settings.PREDICTION_CACHE_MAX_MB * 1024 * 1024,
+)
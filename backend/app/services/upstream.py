@@ -0,0 +1,233 @@
+import asyncio
+import importlib.util
+import random
+import time
+from typing import Any, Dict, Optional
+
+import httpx
+
+from app.core.config import settings
+
+# HTTP/2 needs the optional h2 package (httpx[http2]); without it clients speak HTTP/1.1 keep-alive
+HTTP2_AVAILABLE = importlib.util.find_spec("h2") is not None
+
+RETRY_STATUS = {429, 500, 502, 503, 504}
+
+
+class CircuitOpen(Exception):
+    """Raised instead of calling an upstream that has been failing."""
+
+
+class UpstreamStats:
+    """Call count, errors and latency of an external API."""
+
+    def __init__(self):
+        self.calls = 0
+        self.errors = 0
+        self.total_ms = 0.0
+        self.max_ms = 0.0
+
+    def record(self, elapsed_ms: float, ok: bool):
+        self.calls += 1
+        self.errors += 0 if ok else 1
+        self.total_ms += elapsed_ms
+        self.max_ms = max(self.max_ms, elapsed_ms)
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "calls": self.calls,
+            "errors": self.errors,
+            "mean_ms": self.total_ms / self.calls if self.calls else 0.0,
+            "max_ms": self.max_ms,
+        }
+
+
+class CircuitBreaker:
+    """
+    Opens after `failure_threshold` consecutive failed requests and rejects
+    calls for `reset_seconds`; then lets one probe through (half-open) and
+    closes again if it succeeds.
+    """
+
+    def __init__(self, failure_threshold: int = 5, reset_seconds: float = 30.0):
+        self.failure_threshold = failure_threshold
+        self.reset_seconds = reset_seconds
+        self.failures = 0
+        self.opened_at: Optional[float] = None
+        self.probing = False
+        self.rejected = 0
+
+    @property
+    def state(self) -> str:
+        if self.opened_at is None:
+            return "closed"
+        if self.probing or time.monotonic() - self.opened_at >= self.reset_seconds:
+            return "half_open"
+        return "open"
+
+    def allow(self) -> bool:
+        state = self.state
+        if state == "closed":
+            return True
+        if state == "half_open" and not self.probing:
+            self.probing = True
+            return True
+        self.rejected += 1
+        return False
+
+    def record_success(self):
+        self.failures = 0
+        self.opened_at = None
+        self.probing = False
+
+    def record_failure(self):
+        self.failures += 1
+        if self.probing or self.failures >= self.failure_threshold:
+            self.opened_at = time.monotonic()
+        self.probing = False
+
+
+class UpstreamClient:
+    """
+    Pooled keep-alive httpx client for one external service, with bounded
+    concurrency, retries with jittered exponential backoff (GET only, since
+    they're idempotent) and a circuit breaker.
+    """
+
+    def __init__(
+        self,
+        name: str,
+        base_url: str = "",
+        timeout: float = 10.0,
+        connect_timeout: float = 3.0,
+        max_connections: int = 20,
+        max_concurrency: int = 10,
+        retries: int = 2,
+        backoff_seconds: float = 0.2,
+        breaker_failures: int = 5,
+        breaker_reset_seconds: float = 30.0,
+        http2: bool = True,
+    ):
+        self.name = name
+        self.base_url = base_url
+        self.timeout = httpx.Timeout(timeout, connect=connect_timeout)
+        self.limits = httpx.Limits(max_connections=max_connections, max_keepalive_connections=max_connections)
+        self.max_concurrency = max_concurrency
+        self.retries = retries
+        self.backoff_seconds = backoff_seconds
+        self.http2 = http2 and HTTP2_AVAILABLE
+        self.breaker = CircuitBreaker(breaker_failures, breaker_reset_seconds)
+        self.upstream = UpstreamStats()
+        self.retried = 0
+
+        self._client: Optional[httpx.AsyncClient] = None
+        self._semaphore = asyncio.Semaphore(max_concurrency)
+        self._in_flight = 0
+
+    @property
+    def client(self) -> httpx.AsyncClient:
+        # Opened by the app lifespan; created on first use for scripts running without it
+        if self._client is None or self._client.is_closed:
+            self._client = httpx.AsyncClient(
+                base_url=self.base_url, timeout=self.timeout, limits=self.limits, http2=self.http2
+            )
+        return self._client
+
+    async def aclose(self):
+        if self._client is not None:
+            await self._client.aclose()
+            self._client = None
+
+    async def get(self, path: str, params: Optional[Dict[str, Any]] = None) -> httpx.Response:
+        """
+        GET with retries on connection errors, timeouts, 429 and 5xx. Raises
+        CircuitOpen without calling out while the breaker is open, and
+        httpx errors once retries are exhausted; other 4xx are returned as is.
+        """
+        if not self.breaker.allow():
+            raise CircuitOpen(f"{self.name} is unavailable (circuit open after repeated failures)")
+
+        start = time.perf_counter()
+        ok = False
+        try:
+            async with self._semaphore:
+                self._in_flight += 1
+                try:
+                    response = await self._get_with_retries(path, params)
+                finally:
+                    self._in_flight -= 1
+            ok = True
+            return response
+        finally:
+            self.upstream.record((time.perf_counter() - start) * 1000.0, ok)
+            if ok:
+                self.breaker.record_success()
+            else:
+                self.breaker.record_failure()
+
+    async def _get_with_retries(self, path: str, params: Optional[Dict[str, Any]]) -> httpx.Response:
+        for attempt in range(self.retries + 1):
+            last_attempt = attempt == self.retries
+            try:
+                response = await self.client.get(path, params=params)
+                if response.status_code not in RETRY_STATUS or last_attempt:
+                    if response.status_code in RETRY_STATUS:
+                        response.raise_for_status()
+                    return response
+            except httpx.TransportError:
+                if last_attempt:
+                    raise
+            self.retried += 1
+            # Full jitter, so callers that failed together don't retry together
+            await asyncio.sleep(random.uniform(0, self.backoff_seconds * 2 ** attempt))
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            **self.upstream.stats(),
+            "retries": self.retried,
+            "in_flight": self._in_flight,
+            "max_concurrency": self.max_concurrency,
+            "http2": self.http2,
+            "circuit": self.breaker.state,
+            "circuit_rejected": self.breaker.rejected,
+        }
+
+
+class UpstreamRegistry:
+    """Named UpstreamClients, opened and closed by the app lifespan."""
+
+    def __init__(self):
+        self._clients: Dict[str, UpstreamClient] = {}
+
+    def register(self, name: str, **kwargs) -> UpstreamClient:
+        self._clients[name] = UpstreamClient(name, **kwargs)
+        return self._clients[name]
+
+    def get(self, name: str) -> UpstreamClient:
+        return self._clients[name]
+
+    async def start(self):
+        for upstream in self._clients.values():
+            upstream.client
+
+    async def close(self):
+        for upstream in self._clients.values():
+            await upstream.aclose()
+
+    def stats(self) -> Dict[str, Any]:
+        return {name: upstream.stats() for name, upstream in self._clients.items()}
+
+
+upstream_clients = UpstreamRegistry()
+upstream_clients.register(
+    "usda",
+    base_url=settings.USDA_BASE_URL,
+    timeout=settings.USDA_TIMEOUT_SECONDS,
+    connect_timeout=settings.UPSTREAM_CONNECT_TIMEOUT_SECONDS,
+    max_connections=settings.USDA_MAX_CONNECTIONS,
+    max_concurrency=settings.USDA_MAX_CONCURRENCY,
+    retries=settings.USDA_RETRIES,
+    breaker_failures=settings.UPSTREAM_BREAKER_FAILURES,
+    breaker_reset_seconds=settings.UPSTREAM_BREAKER_RESET_SECONDS,
+    http2=settings.UPSTREAM_HTTP2,
+)
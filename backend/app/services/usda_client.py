@@ -1,9 +1,16 @@
-import httpx
 import os
 from typing import Optional, Dict, Any
 
+from app.core.config import settings
+from app.services.nutrition_service import nutrition_cache
+from app.services.upstream import upstream_clients
+
+# Shared by all clients: responses don't depend on which key fetched them
+search_cache = nutrition_cache("usda_search")
+details_cache = nutrition_cache("usda_details")
+
 class USDAClient:
-    BASE_URL = "https://api.nal.usda.gov/fdc/v1"
+    BASE_URL = settings.USDA_BASE_URL
 
     def __init__(self, api_key: Optional[str] = None):
         self.api_key = api_key or os.getenv("USDA_API_KEY")
@@ -12,23 +19,26 @@ class USDAClient:
     async def search_foods(self, query: str, page_size: int = 5) -> Dict[str, Any]:
         if not self.api_key:
              raise ValueError("USDA_API_KEY is not set")
-             
-        async with httpx.AsyncClient() as client:
-            response = await client.get(
-                f"{self.BASE_URL}/foods/search",
-                params={"api_key": self.api_key, "query": query, "pageSize": page_size}
-            )
-            response.raise_for_status()
-            return response.json()
+
+        key = f"{page_size}:{' '.join(query.lower().split())}"
+        return await search_cache.get_or_compute(
+            key, lambda: self._get("/foods/search", {"query": query, "pageSize": page_size})
+        )
 
     async def get_food_details(self, fdc_id: str) -> Dict[str, Any]:
         if not self.api_key:
              raise ValueError("USDA_API_KEY is not set")
-             
-        async with httpx.AsyncClient() as client:
-            response = await client.get(
-                f"{self.BASE_URL}/food/{fdc_id}",
-                params={"api_key": self.api_key}
-            )
-            response.raise_for_status()
-            return response.json()
+
+        return await details_cache.get_or_compute(str(fdc_id), lambda: self._get(f"/food/{fdc_id}", {}))
+
+    async def _get(self, path: str, params: Dict[str, Any]) -> Dict[str, Any]:
+        response = await upstream_clients.get("usda").get(path, params={"api_key": self.api_key, **params})
+        response.raise_for_status()
+        return response.json()
+
+
+def stats() -> Dict[str, Any]:
+    return {
+        "search_cache": search_cache.stats(),
+        "details_cache": details_cache.stats(),
+    }
@@ -4,53 +4,287 @@ from PIL import Image
 import io
 import json
 import os
-from app.models.food_classifier import FoodClassifier, get_transforms
+import threading
+import time
+from typing import Any, Dict, List, Optional
+from app.core.config import settings
+from app.models.food_classifier import FoodClassifier, load_classifier
+from app.models.preprocessing import load_image_tensor
+from app.models.quantization import load_quantized_model
+from app.models.weights import load_state_dict_file, resolve_weights_path
+from app.services.inference_batcher import InferenceBatcher
+from app.services.inference_executor import InferenceExecutor
 
 class VisionService:
     def __init__(self):
         self.device = torch.device("cuda" if torch.cuda.is_available() else "mps" if torch.backends.mps.is_available() else "cpu")
-        print(f"VisionService using device: {self.device}")
-        
-        # Load Fine-Tuned Model
-        self.model = FoodClassifier(num_classes=101, pretrained=False)
-        model_path = "app/models/food_classifier_finetuned.pth"
+        self.backend = settings.VISION_BACKEND
+
+        # Weights are loaded on first use (or by warm_up() from the app lifespan),
+        # so importing this module stays cheap
+        self.model = None
+        self.fast_model = None
+        self.embedding_version = None
+        self.categories = None
+        self._model_version = None
+        self._load_lock = threading.Lock()
+        self.ready = False
+        self.warmup_error = None
+        self.load_seconds = None
+        self.warmup_seconds = None
+        self.stage_counts = {"fast": 0, "full": 0}
+            
+        # Decode, transforms and forward passes run here, never on the event loop
+        self.executor = InferenceExecutor(
+            max_workers=settings.VISION_EXECUTOR_WORKERS,
+            max_queue=settings.VISION_EXECUTOR_QUEUE_DEPTH,
+            torch_threads=settings.VISION_TORCH_THREADS,
+            processes=settings.WEB_CONCURRENCY,
+        )
+
+        # Concurrent predict_food calls share a single forward pass
+        self.batcher = InferenceBatcher(
+            self._run_batch,
+            max_batch_size=settings.VISION_BATCH_MAX_SIZE,
+            max_wait_ms=settings.VISION_BATCH_WAIT_MS,
+            max_queue_size=settings.VISION_BATCH_QUEUE_DEPTH,
+        )
+
+    @property
+    def loaded(self) -> bool:
+        return self.model is not None
+
+    @property
+    def model_version(self) -> str:
+        self.load()
+        return self._model_version
+
+    def load(self):
+        """Loads weights and class mapping once; safe to call from any thread."""
+        if self.loaded:
+            return
+        with self._load_lock:
+            if self.loaded:
+                return
+            started = time.perf_counter()
+            print(f"VisionService using device: {self.device}")
+
+            # Load Fine-Tuned Model (fp32, or the INT8 quantized artifact)
+            self._weights_metadata = {}
+            model = self._load_model()
+            if settings.VISION_CASCADE_ENABLED:
+                if self._has_gate(model):
+                    # The gate needs the full model's pooled features for every image,
+                    # so there is nothing the first stage could answer on its own
+                    print("WARNING: Cascade disabled while the food gate head is loaded.")
+                else:
+                    self._load_fast_model()
+
+            # Load Class Mapping (embedded in .safetensors weights, else the JSON sidecar)
+            class_map_path = "app/models/food_classifier_finetuned.json"
+            if "classes" in self._weights_metadata:
+                self.categories = json.loads(self._weights_metadata["classes"])
+            elif os.path.exists(class_map_path):
+                with open(class_map_path, 'r') as f:
+                    self.categories = json.load(f)
+            else:
+                print("WARNING: Class mapping not found. Using indices.")
+                self.categories = [str(i) for i in range(101)]
+
+            self.model = model
+            self.load_seconds = time.perf_counter() - started
+
+    async def ensure_loaded(self):
+        if not self.loaded:
+            await self.executor.run(self.load, bounded=False, forward=True)
+
+    def _warm_up_sync(self):
+        self.load()
+        started = time.perf_counter()
+
+        # Prime the decode path and the oneDNN kernels/allocator for each batch
+        # shape the batcher is likely to produce
+        buffer = io.BytesIO()
+        Image.new("RGB", (640, 480), (128, 96, 64)).save(buffer, format="JPEG")
+        tensor = self._preprocess(buffer.getvalue())
+        for batch_size in sorted({1, settings.VISION_BATCH_MAX_SIZE}):
+            batch = tensor.unsqueeze(0).expand(batch_size, -1, -1, -1).contiguous().to(self.device)
+            for _ in range(settings.VISION_WARMUP_ITERATIONS):
+                self._forward(batch)
+                if self.fast_model is not None:
+                    with torch.no_grad():
+                        self.fast_model(batch)
+
+        self.warmup_seconds = time.perf_counter() - started
+
+    async def warm_up(self):
+        """Loads the model and runs dummy forwards on an inference worker; flips `ready` when done."""
+        try:
+            await self.executor.run(self._warm_up_sync, bounded=False, forward=True)
+            self.ready = True
+            print(f"VisionService ready (load {self.load_seconds:.2f}s, warm-up {self.warmup_seconds:.2f}s)")
+        except Exception as e:
+            self.warmup_error = str(e)
+            print(f"VisionService warm-up failed: {e}")
+
+    def _load_model(self) -> torch.nn.Module:
+        if self.backend == "student":
+            student_path = resolve_weights_path(settings.VISION_STUDENT_MODEL_PATH)
+            if student_path.exists():
+                # Distilled compact classifier; its arch and class list travel in the file's metadata.
+                # The food gate head sits on ResNet50 features, so it is not available here
+                model, self._weights_metadata = load_classifier(student_path)
+                print(f"Loaded distilled student ({self._weights_metadata.get('arch', 'resnet50')}) from {student_path}")
+                self._model_version = self._artifact_version(student_path)
+                return model.to(self.device)
+            print(f"WARNING: Student model not found at {student_path}. Falling back to fp32.")
+            self.backend = "fp32"
+
+        if self.backend == "int8":
+            int8_path = settings.VISION_INT8_MODEL_PATH
+            if os.path.exists(int8_path):
+                # Quantized kernels only run on CPU
+                self.device = torch.device("cpu")
+                print(f"Loading INT8 quantized model from {int8_path} (engine: {settings.VISION_QUANT_ENGINE})")
+                self._model_version = self._artifact_version(int8_path)
+                return load_quantized_model(int8_path, engine=settings.VISION_QUANT_ENGINE)
+            print(f"WARNING: INT8 model not found at {int8_path}. Falling back to fp32.")
+            self.backend = "fp32"
+
+        gate_path = resolve_weights_path(settings.VISION_GATE_PATH)
+        with_gate = gate_path.exists()
+        model_path = resolve_weights_path(settings.VISION_MODEL_PATH)
         
-        if os.path.exists(model_path):
+        if model_path.exists():
             print(f"Loading fine-tuned weights from {model_path}")
-            state_dict = torch.load(model_path, map_location=self.device)
-            self.model.load_state_dict(state_dict)
+            # Weights are memory-mapped and assigned in place rather than copied into
+            # freshly allocated parameters, so their pages live in the OS page cache and
+            # are shared by every worker process (and across fork from a preloaded parent)
+            state_dict, self._weights_metadata = load_state_dict_file(model_path)
+            with torch.device("meta"):
+                model = FoodClassifier(num_classes=101, pretrained=False, with_gate=with_gate)
+            # The gate head ships as a separate file and is loaded below
+            missing, unexpected = model.load_state_dict(state_dict, strict=False, assign=True)
+            if unexpected or any(not key.startswith("gate.") for key in missing):
+                raise RuntimeError(f"Classifier weights do not match FoodClassifier (missing: {missing}, unexpected: {unexpected})")
+            self._model_version = self._artifact_version(model_path)
+            # Embeddings are only comparable between uploads seen by the same backbone weights
+            self.embedding_version = self._model_version
         else:
             print("WARNING: Fine-tuned weights not found. Using random init (expect poor results).")
-            
-        self.model.to(self.device)
-        self.model.eval()
-        
-        # Load Transforms
-        self.transforms = get_transforms(is_training=False)
-        
-        # Load Class Mapping
-        class_map_path = "app/models/food_classifier_finetuned.json"
-        if os.path.exists(class_map_path):
-            with open(class_map_path, 'r') as f:
-                self.categories = json.load(f)
+            model = FoodClassifier(num_classes=101, pretrained=False, with_gate=with_gate)
+            self._model_version = f"{self.backend}:random-init"
+
+        if with_gate:
+            print(f"Loading food gate head from {gate_path}")
+            gate_state, _ = load_state_dict_file(gate_path)
+            model.gate.load_state_dict(gate_state, assign=True)
+            self._model_version += f"+gate:{self._artifact_version(gate_path)}"
         else:
-            print("WARNING: Class mapping not found. Using indices.")
-            self.categories = [str(i) for i in range(101)]
+            print("Food gate head not found. All uploads will be treated as food.")
             
-    async def predict_food(self, image_bytes: bytes):
-        image = Image.open(io.BytesIO(image_bytes)).convert("RGB")
-        tensor = self.transforms(image).unsqueeze(0).to(self.device)
-        
+        model.to(self.device)
+        model.eval()
+        return model
+
+    def _load_fast_model(self):
+        """First cascade stage: a small classifier that answers the easy images on its own."""
+        fast_path = resolve_weights_path(settings.VISION_CASCADE_MODEL_PATH)
+        if not fast_path.exists():
+            print(f"WARNING: Cascade model not found at {fast_path}. Every image uses the full model.")
+            return
+        self.fast_model, metadata = load_classifier(fast_path)
+        self.fast_model.to(self.device)
+        print(f"Loaded cascade model ({metadata.get('arch', 'resnet50')}) from {fast_path}")
+        self._model_version += (
+            f"+cascade:{self._artifact_version(fast_path)}"
+            f":{settings.VISION_CASCADE_MIN_CONFIDENCE}:{settings.VISION_CASCADE_MIN_MARGIN}"
+        )
+
+    def _artifact_version(self, path: str) -> str:
+        # Changes whenever the weights file is replaced, invalidating cached predictions
+        stat = os.stat(path)
+        return f"{self.backend}:{os.path.basename(path)}:{stat.st_size}:{int(stat.st_mtime)}"
+
+    def _preprocess(self, image_bytes: bytes) -> torch.Tensor:
+        # Reduced-size JPEG decode + fused resize/crop/normalize (shared with Gatekeeper)
+        return load_image_tensor(image_bytes)
+
+    def _forward(self, batch: torch.Tensor):
+        """Returns (class logits, gate logits or None, pooled features or None)."""
+        with torch.no_grad():
+            if isinstance(self.model, FoodClassifier):
+                return self.model.forward_with_features(batch)
+            return self.model(batch), None, None
+
+    @staticmethod
+    def _has_gate(model: torch.nn.Module) -> bool:
+        return isinstance(model, FoodClassifier) and model.gate is not None
+
+    def _predict_batch(self, tensors: List[torch.Tensor]) -> List[Dict[str, Any]]:
+        self.load()
+        batch = torch.stack(tensors).to(self.device)
+        rows = list(range(len(tensors)))
+        stages = ["full"] * len(rows)
+        food_probs = [None] * len(rows)
+        embeddings = [None] * len(rows)
+
         with torch.no_grad():
-            outputs = self.model(tensor)
-            probs = torch.nn.functional.softmax(outputs, dim=1)
+            if self.fast_model is not None and not self._has_gate(self.model):
+                # Cascade: keep the small model's answer when it is confident and
+                # clearly ahead of its runner-up; escalate the rest to the full model.
+                # Never with a gate head: kept rows would skip the food/non-food check
+                probs = torch.nn.functional.softmax(self.fast_model(batch), dim=1)
+                top2 = torch.topk(probs, 2).values
+                confident = (top2[:, 0] >= settings.VISION_CASCADE_MIN_CONFIDENCE) & \
+                            (top2[:, 0] - top2[:, 1] >= settings.VISION_CASCADE_MIN_MARGIN)
+                rows = (~confident).nonzero().flatten().tolist()
+                stages = ["fast" if keep else "full" for keep in confident.tolist()]
+            else:
+                probs = None
+
+            if rows:
+                # Indexing copies the batch; skip it when every row escalates
+                outputs, gate_logits, features = self._forward(batch if len(rows) == len(tensors) else batch[rows])
+                full_probs = torch.nn.functional.softmax(outputs, dim=1)
+                if probs is None:
+                    probs = full_probs
+                else:
+                    probs[rows] = full_probs
+                if gate_logits is not None:
+                    gate_probs = torch.nn.functional.softmax(gate_logits, dim=1)[:, 1]
+                    for i, row in enumerate(rows):
+                        food_probs[row] = gate_probs[i].item()
+                if features is not None and settings.VISION_EMBEDDINGS_ENABLED:
+                    # Unit-length float16 pooled features, for "similar meals" search
+                    normalized = torch.nn.functional.normalize(features.float(), dim=1).to(torch.float16).cpu().numpy()
+                    for i, row in enumerate(rows):
+                        embeddings[row] = normalized[i]
+
             top3_probs, top3_indices = torch.topk(probs, 3)
 
+        for stage in stages:
+            self.stage_counts[stage] += 1
+
+        return [
+            {
+                **self._format_prediction(top3_probs[row], top3_indices[row], food_probs[row]),
+                "stage": stages[row],
+                "embedding": embeddings[row],
+            }
+            for row in range(len(tensors))
+        ]
+
+    async def _run_batch(self, tensors: List[torch.Tensor]) -> List[Dict[str, Any]]:
+        # Images in the batch were already admitted during preprocessing
+        return await self.executor.run(self._predict_batch, tensors, bounded=False, forward=True)
+
+    def _format_prediction(self, top_probs: torch.Tensor, top_indices: torch.Tensor, food_prob: Optional[float] = None) -> Dict[str, Any]:
         candidates = []
         
-        for i in range(3):
-            idx = top3_indices[0][i].item()
-            prob = top3_probs[0][i].item()
+        for i in range(len(top_indices)):
+            idx = top_indices[i].item()
+            prob = top_probs[i].item()
             
             if idx < len(self.categories):
                 name = self.categories[idx]
@@ -62,29 +296,58 @@ class VisionService:
             
             candidates.append({"food": formatted_name, "class": name, "confidence": prob})
             
-        # Since this model is trained ONLY on food, it assumes the input IS food.
-        # We lose the "Non-Food" rejection capability of the original ImageNet model 
-        # unless we train a specific "Background" class or use an ensemble.
-        # For now, we assume valid food input for the specialist.
+        # The classifier itself only knows food classes; the non-food decision comes
+        # from the gate head on the same pooled features. Without trained gate
+        # weights (or on the INT8 backend) we assume valid food input.
+        is_food = food_prob is None or food_prob >= settings.VISION_GATE_THRESHOLD
         
         return {
             "food_name": candidates[0]["food"],
             "confidence": candidates[0]["confidence"],
-            "class_id": 0,
-            "is_food": True, 
+            "class_id": top_indices[0].item(),
+            "class": candidates[0]["class"],
+            "is_food": is_food, 
+            "food_probability": food_prob,
             "candidates": candidates
         }
+
+    async def predict_food(self, image_bytes: bytes):
+        await self.ensure_loaded()
+        tensor = await self.executor.run(self._preprocess, image_bytes)
+
+        if settings.VISION_BATCHING_ENABLED:
+            return await self.batcher.submit(tensor)
+        return (await self._run_batch([tensor]))[0]
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "backend": self.backend,
+            "loaded": self.loaded,
+            "ready": self.ready,
+            "load_seconds": self.load_seconds,
+            "warmup_seconds": self.warmup_seconds,
+            "cascade_enabled": self.fast_model is not None,
+            "stage_counts": dict(self.stage_counts),
+            "batching": self.batcher.stats.snapshot(),
+            "executor": self.executor.stats(),
+        }
     
-    async def estimate_portion(self, image_bytes: bytes, food_name: str = "unknown"):
+    async def estimate_portion(self, image_bytes: bytes, food_name: str = "unknown", class_id: Optional[int] = None, class_name: Optional[str] = None):
         from app.core.portion_data import PORTION_HEURISTICS, DEFAULT_WEIGHT
-        
-        weight = DEFAULT_WEIGHT
-        # Simple fuzzy matching
-        lower_name = food_name.lower()
-        for key, val in PORTION_HEURISTICS.items():
-            if key in lower_name:
-                weight = val
-                break
+        from app.services.class_table import class_table
+
+        entry = class_table.get(class_id, class_name) if class_id is not None else None
+        if entry is not None:
+            # Precomputed per class by scripts/build_class_table.py
+            weight = entry["portion_g"]
+        else:
+            weight = DEFAULT_WEIGHT
+            # Simple fuzzy matching
+            lower_name = food_name.lower()
+            for key, val in PORTION_HEURISTICS.items():
+                if key in lower_name:
+                    weight = val
+                    break
                 
         return {
             "portion_size": f"standard ({weight}g)",
@@ -0,0 +1,33 @@
+# Multi-worker serving: gunicorn -c gunicorn.conf.py app.main:app
+#
+# The classifier weights are loaded once in the master before workers are
+# forked. They are memory-mapped from disk and never written, so every worker
+# shares the same physical pages instead of holding its own ResNet50 copy.
+import os
+
+bind = os.getenv("BIND", "0.0.0.0:8000")
+workers = int(os.getenv("WEB_CONCURRENCY", "2"))
+worker_class = "uvicorn.workers.UvicornWorker"
+preload_app = True
+timeout = 120
+
+# Keep app settings in sync with the actual worker count (used to split torch threads)
+os.environ["WEB_CONCURRENCY"] = str(workers)
+
+
+def on_starting(server):
+    import torch
+    from app.services.vision_service import vision_service
+
+    # No OpenMP pool may exist before fork (libgomp is not fork-safe), so the
+    # master loads weights single-threaded and never runs a forward pass
+    torch.set_num_threads(1)
+    vision_service.load()
+
+
+def post_fork(server, worker):
+    import torch
+    from app.services.vision_service import vision_service
+
+    torch.set_num_threads(vision_service.executor.torch_threads)
+    server.log.info(f"Worker {worker.pid}: {vision_service.executor.torch_threads} torch threads per inference worker")
@@ -0,0 +1,122 @@
+"""Shared helpers for the benchmark scripts in this directory."""
+import io
+import resource
+import statistics
+import sys
+import time
+from typing import Dict, Iterable, List
+
+import numpy as np
+from PIL import Image
+
+# Typical phone camera resolutions (width, height)
+PHOTO_SIZES = {
+    "12mp": (4032, 3024),
+    "3mp": (2048, 1536),
+    "vga": (640, 480),
+}
+
+
+def synthetic_jpeg(width: int, height: int, quality: int = 90, seed: int = 0) -> bytes:
+    """Smooth gradients plus noise, so the JPEG has realistic entropy rather than flat blocks."""
+    rng = np.random.default_rng(seed)
+    y, x = np.mgrid[0:height, 0:width].astype(np.float32)
+    base = np.stack([
+        128 + 100 * np.sin(x / 211.0),
+        128 + 100 * np.cos(y / 173.0),
+        128 + 100 * np.sin((x + y) / 307.0),
+    ], axis=-1)
+    base += rng.normal(0, 12, size=base.shape).astype(np.float32)
+    pixels = np.clip(base, 0, 255).astype(np.uint8)
+
+    buffer = io.BytesIO()
+    Image.fromarray(pixels).save(buffer, format="JPEG", quality=quality)
+    return buffer.getvalue()
+
+
+def percentiles(values: Iterable[float], points=(50, 95, 99)) -> Dict[str, float]:
+    values = np.asarray(list(values), dtype=np.float64)
+    if values.size == 0:
+        return {f"p{p}": 0.0 for p in points}
+    return {f"p{p}": float(np.percentile(values, p)) for p in points}
+
+
+def measure_latency(model, runs: int = 50, warmup: int = 5) -> float:
+    """Median single-image (1x3x224x224) forward latency of a torch model, in milliseconds."""
+    import torch # Only the model benchmarks need torch
+
+    example = torch.randn(1, 3, 224, 224)
+    timings = []
+    with torch.no_grad():
+        for i in range(warmup + runs):
+            start = time.perf_counter()
+            model(example)
+            if i >= warmup:
+                timings.append((time.perf_counter() - start) * 1000.0)
+    return statistics.median(timings)
+
+
+def evaluate(model, loader):
+    """Returns (top-1 predictions, top-1 accuracy, top-3 accuracy) of a torch model over the loader."""
+    import torch
+
+    top1_preds = []
+    correct_top1 = 0
+    correct_top3 = 0
+    total = 0
+
+    with torch.no_grad():
+        for inputs, labels in loader:
+            outputs = model(inputs)
+            top3 = torch.topk(outputs, 3, dim=1).indices
+            top1_preds.append(top3[:, 0])
+            correct_top1 += (top3[:, 0] == labels).sum().item()
+            correct_top3 += (top3 == labels.unsqueeze(1)).any(dim=1).sum().item()
+            total += labels.size(0)
+
+    return torch.cat(top1_preds), correct_top1 / total, correct_top3 / total
+
+
+def reset_peak_rss() -> bool:
+    """Resets the kernel's RSS high-water mark (Linux only). Returns False where unsupported."""
+    try:
+        with open("/proc/self/clear_refs", "w") as f:
+            f.write("5")
+        return True
+    except OSError:
+        return False
+
+
+def peak_rss_mb() -> float:
+    """
+    Peak resident set size of this process, in MB. Uses VmHWM on Linux so it
+    honours reset_peak_rss(); otherwise ru_maxrss (bytes on macOS).
+    """
+    try:
+        with open("/proc/self/status") as f:
+            for line in f:
+                if line.startswith("VmHWM:"):
+                    return int(line.split()[1]) / 1024
+    except OSError:
+        pass
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak / (1024 * 1024) if sys.platform == "darwin" else peak / 1024
+
+
+def current_rss_mb() -> float:
+    try:
+        with open("/proc/self/status") as f:
+            for line in f:
+                if line.startswith("VmRSS:"):
+                    return int(line.split()[1]) / 1024
+    except OSError:
+        pass
+    return peak_rss_mb()
+
+
+def read_images(paths: List[str]) -> List[bytes]:
+    images = []
+    for path in paths:
+        with open(path, "rb") as f:
+            images.append(f.read())
+    return images
@@ -0,0 +1,73 @@
+import os
+import sys
+import json
+import time
+import argparse
+from pathlib import Path
+
+from torch.utils.data import DataLoader
+from torchvision import datasets
+
+# Add backend to path so we can import app modules
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from app.models.food_classifier import get_transforms
+from app.models.food_dataset import CACHE_ROOT, MemmapFoodDataset
+
+DATA_DIR = Path("data/food-101/images")
+
+
+def measure(dataset, batch_size, num_workers, max_batches):
+    """Samples/sec of the input pipeline alone (no model), after the first batch so worker startup is excluded."""
+    loader = DataLoader(dataset, batch_size=batch_size, shuffle=True, num_workers=num_workers)
+    iterator = iter(loader)
+    next(iterator)
+    count = 0
+    started = time.perf_counter()
+    for i, (inputs, _) in enumerate(iterator):
+        count += inputs.size(0)
+        if i + 1 >= max_batches:
+            break
+    elapsed = time.perf_counter() - started
+    return count / elapsed
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Training input pipeline: ImageFolder JPEG decode vs pre-decoded memmap cache.")
+    parser.add_argument("--data-dir", type=Path, default=DATA_DIR)
+    parser.add_argument("--cache-dir", type=Path, default=CACHE_ROOT)
+    parser.add_argument("--batch-size", type=int, default=32)
+    parser.add_argument("--workers", type=int, nargs="*", default=[0, 2, 4])
+    parser.add_argument("--batches", type=int, default=50, help="Batches timed per configuration")
+    parser.add_argument("--json", dest="json_path", default=None)
+    args = parser.parse_args()
+
+    sources = {}
+    if args.data_dir.exists():
+        sources["imagefolder"] = datasets.ImageFolder(root=args.data_dir, transform=get_transforms(is_training=True))
+    if (args.cache_dir / "meta.json").exists():
+        sources["memmap"] = MemmapFoodDataset(args.cache_dir, "train", train=True)
+    if not sources:
+        print(f"Error: neither {args.data_dir} nor {args.cache_dir / 'meta.json'} exists")
+        return
+
+    # Projected over the size of the cached train split (ImageFolder trains on an 80% split of everything)
+    epoch_size = len(sources["memmap"]) if "memmap" in sources else int(0.8 * len(sources["imagefolder"]))
+
+    rows = []
+    print(f"{'Source':<13}{'Workers':>8}{'samples/s':>12}{'Epoch (min)':>13}")
+    print("-" * 46)
+    for name, dataset in sources.items():
+        for workers in args.workers:
+            rate = measure(dataset, args.batch_size, workers, args.batches)
+            row = {"source": name, "workers": workers, "samples_per_sec": rate, "epoch_minutes": epoch_size / rate / 60}
+            rows.append(row)
+            print(f"{name:<13}{workers:>8}{rate:>12.1f}{row['epoch_minutes']:>13.1f}")
+
+    if args.json_path:
+        with open(args.json_path, "w") as f:
+            json.dump(rows, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,128 @@
+import os
+import sys
+import time
+import asyncio
+import argparse
+import tempfile
+
+# Add backend to path so we can import app modules
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+# Throwaway database and the local fake LLM, so this runs without network access
+os.environ["DATABASE_URL"] = f"sqlite:///{tempfile.mkdtemp()}/bench_llm_gateway.db"
+os.environ["ADVICE_CACHE_PATH"] = ""
+os.environ["LLM_BACKEND"] = "fake"
+
+import httpx
+from fastapi import Request
+
+from bench_utils import percentiles
+
+TIMEOUT_REPLY = "The AI Coach is taking too long to respond. Please try again in a moment."
+
+
+async def chat(client, user_id, i):
+    start = time.perf_counter()
+    response = await client.post(
+        "/api/v1/chat/message",
+        json={"message": f"What should I eat after my run? ({user_id}/{i})", "history": []},
+        headers={"X-Bench-User": str(user_id)},
+    )
+    response.raise_for_status()
+    return user_id, (time.perf_counter() - start) * 1000.0, response.json()["response"] == TIMEOUT_REPLY
+
+
+async def scenario(app, backend, requests, deadline, sequential=False, **gateway_settings):
+    """
+    Sends n chat messages for each (user_id, n) through a fresh gateway: all at
+    once, or one after another per user with `sequential`. Returns the results and gateway stats.
+    """
+    from app.core.config import settings
+    from app.services.llm_gateway import LLMGateway
+    from app.services.llm_service import llm_service
+
+    settings.LLM_INTERACTIVE_TIMEOUT_SECONDS = deadline
+    llm_service.gateway = LLMGateway(backend, **gateway_settings)
+
+    async def user_calls(client, user_id, n):
+        return [await chat(client, user_id, i) for i in range(n)]
+
+    async with httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://bench", timeout=120.0) as client:
+        if sequential:
+            per_user = await asyncio.gather(*[user_calls(client, user_id, n) for user_id, n in requests])
+            results = [r for calls in per_user for r in calls]
+        else:
+            results = await asyncio.gather(*[chat(client, user_id, i) for user_id, n in requests for i in range(n)])
+    return results, llm_service.gateway.stats()
+
+
+def report(name, results, stats, users=None):
+    latencies = [ms for user_id, ms, _ in results if users is None or user_id in users]
+    p = percentiles(latencies)
+    fallbacks = sum(1 for user_id, _, fallback in results if fallback and (users is None or user_id in users))
+    print(f"{name:<34}{len(latencies):>6}{p['p50']:>9.0f}{p['p95']:>9.0f}{p['p99']:>9.0f}"
+          f"{fallbacks:>10}{stats['peak_in_flight']:>7}{stats['hedges']:>8}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Load-test the LLM gateway through /chat/message with the fake backend.")
+    parser.add_argument("--latency-ms", type=float, default=800.0)
+    parser.add_argument("--distribution", default="lognormal")
+    parser.add_argument("--spread", type=float, default=0.6)
+    parser.add_argument("--token-ms", type=float, default=2.0)
+    parser.add_argument("--tokens", type=int, default=50)
+    parser.add_argument("--concurrency", type=int, default=16)
+    parser.add_argument("--per-user", type=int, default=2)
+    parser.add_argument("--users", type=int, default=50)
+    parser.add_argument("--requests-per-user", type=int, default=4)
+    parser.add_argument("--deadline-s", type=float, default=20.0)
+    parser.add_argument("--hedge-after-ms", type=float, default=1500.0)
+    args = parser.parse_args()
+
+    from app.main import app
+    from app.db.base import Base, engine
+    from app.api.deps import get_current_user
+    from app.models.user import User
+    from app.services.llm_gateway import FakeBackend
+
+    Base.metadata.create_all(bind=engine)
+
+    def bench_user(request: Request):
+        return User(id=int(request.headers["X-Bench-User"]), language="en", target_calories=2000)
+
+    app.dependency_overrides[get_current_user] = bench_user
+
+    def backend():
+        return FakeBackend(latency_ms=args.latency_ms, distribution=args.distribution, spread=args.spread,
+                           token_ms=args.token_ms, tokens=args.tokens, seed=0)
+
+    limits = {"max_concurrency": args.concurrency, "per_user_concurrency": args.per_user, "deadline": args.deadline_s}
+    spike = [(user_id, args.requests_per_user) for user_id in range(1, args.users + 1)]
+    light = [(user_id, 20) for user_id in range(1, args.concurrency // 2 + 1)]
+    noisy = [(0, 60)] + [(user_id, 1) for user_id in range(1, 11)]
+
+    print(f"Fake LLM: {args.distribution} first token around {args.latency_ms:.0f} ms (spread {args.spread}), "
+          f"{args.tokens} tokens x {args.token_ms:.0f} ms; gateway {args.concurrency} slots, {args.per_user} per user\n")
+    print(f"{'Scenario':<34}{'Calls':>6}{'p50 ms':>9}{'p95 ms':>9}{'p99 ms':>9}{'Fallbacks':>10}{'Peak':>7}{'Hedges':>8}")
+
+    results, stats = asyncio.run(scenario(app, backend(), spike, **limits))
+    report(f"spike: {len(spike)} users x {args.requests_per_user}", results, stats)
+
+    short = dict(limits, deadline=args.latency_ms * 3 / 1000.0)
+    results, stats = asyncio.run(scenario(app, backend(), spike, **short))
+    report(f"spike, {short['deadline']:.1f}s deadline", results, stats)
+
+    results, stats = asyncio.run(scenario(app, backend(), light, sequential=True, **limits))
+    report(f"light: {len(light)} users x 20 in turn", results, stats)
+    results, stats = asyncio.run(scenario(
+        app, backend(), light, sequential=True, hedge_after_seconds=args.hedge_after_ms / 1000.0, **limits
+    ))
+    report(f"light load, hedge after {args.hedge_after_ms:.0f} ms", results, stats)
+
+    results, stats = asyncio.run(scenario(app, backend(), noisy, **limits))
+    report("noisy user: 60 calls", results, stats, users={0})
+    report("  10 other users meanwhile", results, stats, users=set(range(1, 11)))
+
+
+if __name__ == "__main__":
+    main()
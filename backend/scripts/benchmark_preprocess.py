@@ -0,0 +1,85 @@
+import os
+import sys
+import io
+import time
+import argparse
+import multiprocessing
+
+# Add backend to path so we can import app modules
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from bench_utils import PHOTO_SIZES, synthetic_jpeg, percentiles, peak_rss_mb, current_rss_mb, reset_peak_rss, read_images
+
+
+def _legacy_preprocess(image_bytes: bytes):
+    from PIL import Image
+    from app.models.food_classifier import get_transforms
+    transform = get_transforms(is_training=False)
+    return transform(Image.open(io.BytesIO(image_bytes)).convert("RGB"))
+
+
+def _fast_preprocess(image_bytes: bytes):
+    from app.models.preprocessing import load_image_tensor
+    return load_image_tensor(image_bytes)
+
+
+PIPELINES = {"legacy": _legacy_preprocess, "fast": _fast_preprocess}
+
+
+def _run_pipeline(name: str, images, repeats: int):
+    """Runs in a fresh process so peak RSS reflects only this pipeline."""
+    import torch
+    torch.set_num_threads(1)
+    fn = PIPELINES[name]
+
+    # Import and allocator warm-up on a tiny image before taking the RSS baseline
+    fn(synthetic_jpeg(64, 64))
+    reset_peak_rss()
+    baseline_mb = current_rss_mb()
+
+    timings = []
+    for _ in range(repeats):
+        for image_bytes in images:
+            start = time.perf_counter()
+            fn(image_bytes)
+            timings.append((time.perf_counter() - start) * 1000.0)
+
+    return {
+        "mean_ms": sum(timings) / len(timings),
+        **percentiles(timings),
+        "peak_rss_delta_mb": peak_rss_mb() - baseline_mb,
+    }
+
+
+def _max_abs_diff(images) -> float:
+    return max(
+        (_legacy_preprocess(b) - _fast_preprocess(b)).abs().max().item()
+        for b in images
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Decode + preprocess time and peak memory, legacy vs fast path.")
+    parser.add_argument("--images", nargs="*", default=[], help="Real photos to benchmark (default: synthetic)")
+    parser.add_argument("--sizes", nargs="*", default=list(PHOTO_SIZES), choices=list(PHOTO_SIZES))
+    parser.add_argument("--repeats", type=int, default=5)
+    args = parser.parse_args()
+
+    if args.images:
+        workloads = {"real": read_images(args.images)}
+    else:
+        workloads = {size: [synthetic_jpeg(*PHOTO_SIZES[size], seed=i) for i in range(4)] for size in args.sizes}
+
+    ctx = multiprocessing.get_context("spawn")
+    print(f"{'Images':<8}{'Pipeline':<10}{'Mean ms':>10}{'p50':>9}{'p95':>9}{'Peak RSS +MB':>15}")
+    print("-" * 61)
+    for label, images in workloads.items():
+        for name in PIPELINES:
+            with ctx.Pool(1) as pool:
+                r = pool.apply(_run_pipeline, (name, images, args.repeats))
+            print(f"{label:<8}{name:<10}{r['mean_ms']:>10.1f}{r['p50']:>9.1f}{r['p95']:>9.1f}{r['peak_rss_delta_mb']:>15.1f}")
+        print(f"{'':<8}max |legacy - fast| on normalized tensors: {_max_abs_diff(images):.3f}")
+
+
+if __name__ == "__main__":
+    main()
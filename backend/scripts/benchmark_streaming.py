@@ -0,0 +1,125 @@
+import os
+import sys
+import json
+import time
+import socket
+import asyncio
+import argparse
+import tempfile
+import threading
+
+# Add backend to path so we can import app modules
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+# Throwaway database so the benchmark never touches nutrivision.db
+os.environ["DATABASE_URL"] = f"sqlite:///{tempfile.mkdtemp()}/bench_streaming.db"
+os.environ["ADVICE_CACHE_PATH"] = ""
+
+import httpx
+import uvicorn
+
+from bench_utils import percentiles
+
+
+async def time_request(client, method, url, **kwargs):
+    """(time to first body byte, total time) in ms, plus the body."""
+    start = time.perf_counter()
+    ttfb = None
+    body = []
+    async with client.stream(method, url, **kwargs) as response:
+        response.raise_for_status()
+        async for chunk in response.aiter_text():
+            if ttfb is None:
+                ttfb = (time.perf_counter() - start) * 1000.0
+            body.append(chunk)
+    return ttfb, (time.perf_counter() - start) * 1000.0, "".join(body)
+
+
+def done_text(sse_body):
+    """Assembled text from the final `done` event."""
+    event = sse_body.strip().split("\n\n")[-1]
+    assert event.startswith("event: done"), event
+    return json.loads(event.split("data: ", 1)[1])["text"]
+
+
+async def run(base_url, repeats, meal_id):
+    results = {}
+    chat = {"message": "What should I eat for dinner?", "history": []}
+    async with httpx.AsyncClient(base_url=base_url, timeout=60.0) as client:
+        cases = {
+            "chat (blocking)": ("POST", "/api/v1/chat/message", {"json": chat}),
+            "chat (SSE)": ("POST", "/api/v1/chat/message/stream", {"json": chat}),
+            "advice (SSE)": ("GET", f"/api/v1/meals/{meal_id}/advice/stream", {"params": {"regenerate": True}}),
+        }
+        for name, (method, url, kwargs) in cases.items():
+            ttfbs, totals = [], []
+            for _ in range(repeats):
+                ttfb, total, body = await time_request(client, method, url, **kwargs)
+                ttfbs.append(ttfb)
+                totals.append(total)
+            results[name] = (percentiles(ttfbs)["p50"], percentiles(totals)["p50"], body)
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Time-to-first-byte of blocking vs SSE LLM endpoints against a fake streaming model.")
+    parser.add_argument("--first-token-ms", type=float, default=800.0)
+    parser.add_argument("--token-ms", type=float, default=20.0)
+    parser.add_argument("--tokens", type=int, default=150)
+    parser.add_argument("--repeats", type=int, default=5)
+    args = parser.parse_args()
+
+    from app.main import app
+    from app.db.base import Base, engine, SessionLocal
+    from app.api.deps import get_current_user
+    from app.models.user import User
+    from app.models.meal import Meal
+    from app.services.llm_service import llm_service
+    from app.services.llm_gateway import FakeBackend
+
+    llm_service.gateway.backend = FakeBackend(
+        latency_ms=args.first_token_ms, distribution="fixed", token_ms=args.token_ms, tokens=args.tokens
+    )
+
+    Base.metadata.create_all(bind=engine)
+    with SessionLocal() as db:
+        user = User(google_sub="bench", email="bench@example.com", language="en")
+        db.add(user)
+        db.commit()
+        meal = Meal(user_id=user.id, food_name="Pizza", portion_size="standard (200g)", calories=266.0,
+                    protein=11.0, carbs=33.0, fats=10.0, confidence=0.9)
+        db.add(meal)
+        db.commit()
+        user_id, meal_id = user.id, meal.id
+    app.dependency_overrides[get_current_user] = lambda: User(id=user_id, language="en")
+
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        port = s.getsockname()[1]
+    server = uvicorn.Server(uvicorn.Config(app, host="127.0.0.1", port=port, log_level="warning"))
+    thread = threading.Thread(target=server.run, daemon=True)
+    thread.start()
+    while not server.started:
+        time.sleep(0.05)
+
+    try:
+        results = asyncio.run(run(f"http://127.0.0.1:{port}", args.repeats, meal_id))
+    finally:
+        server.should_exit = True
+        thread.join()
+
+    generation_ms = args.first_token_ms + args.token_ms * (args.tokens - 1)
+    print(f"Fake model: first token {args.first_token_ms:.0f} ms, {args.tokens} tokens, "
+          f"{generation_ms:.0f} ms per full response\n")
+    print(f"{'Endpoint':<18}{'TTFB p50 ms':>13}{'Total p50 ms':>14}")
+    for name, (ttfb, total, _) in results.items():
+        print(f"{name:<18}{ttfb:>13.1f}{total:>14.1f}")
+
+    with SessionLocal() as db:
+        saved = db.get(Meal, meal_id).analysis_text
+    streamed = done_text(results["advice (SSE)"][2])
+    print(f"\nAdvice saved to the meal after the stream: {saved == streamed} ({len(saved or '')} chars)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,282 @@
+import os
+import sys
+import json
+import time
+import asyncio
+import argparse
+import platform
+
+# Add backend to path so we can import app modules
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from bench_utils import PHOTO_SIZES, synthetic_jpeg, percentiles, peak_rss_mb, reset_peak_rss, read_images
+
+SECTIONS = ["preprocess", "forward", "gatekeeper", "portion", "predict"]
+# Rows from two runs are compared when all of these match
+ROW_KEY = ("section", "images", "batch_size", "threads", "concurrency", "workers")
+
+
+def _row(section, timings_ms, images_per_call=1, **params):
+    total_s = sum(timings_ms) / 1000.0
+    return {
+        "section": section,
+        "images": params.get("images"),
+        "batch_size": params.get("batch_size", 1),
+        "threads": params.get("threads"),
+        "concurrency": params.get("concurrency", 1),
+        "workers": params.get("workers"),
+        "calls": len(timings_ms),
+        "mean_ms": sum(timings_ms) / len(timings_ms),
+        **percentiles(timings_ms),
+        "images_per_sec": params.get("images_per_sec", len(timings_ms) * images_per_call / total_s),
+        "peak_rss_mb": peak_rss_mb(),
+    }
+
+
+def _timed(fn, repeats, warmup=2):
+    for _ in range(warmup):
+        fn()
+    timings = []
+    for _ in range(repeats):
+        start = time.perf_counter()
+        fn()
+        timings.append((time.perf_counter() - start) * 1000.0)
+    return timings
+
+
+def bench_preprocess(workloads, repeats, **_):
+    from app.models.preprocessing import load_image_tensor
+    rows = []
+    for label, images in workloads.items():
+        reset_peak_rss()
+        timings = []
+        for image_bytes in images:
+            timings += _timed(lambda: load_image_tensor(image_bytes), repeats)
+        rows.append(_row("preprocess", timings, images=label))
+    return rows
+
+
+def bench_forward(workloads, repeats, batch_sizes, threads, **_):
+    """Model forward only (no decode), across batch sizes and intra-op thread counts."""
+    import torch
+    from app.models.preprocessing import load_image_tensor
+    from app.services.vision_service import vision_service
+
+    vision_service.load()
+    tensor = load_image_tensor(next(iter(workloads.values()))[0])
+    rows = []
+    for n_threads in threads:
+        torch.set_num_threads(n_threads)
+        for batch_size in batch_sizes:
+            batch = tensor.unsqueeze(0).expand(batch_size, -1, -1, -1).contiguous()
+            reset_peak_rss()
+            timings = _timed(lambda: vision_service._forward(batch), repeats)
+            rows.append(_row("forward", timings, images_per_call=batch_size, batch_size=batch_size, threads=n_threads))
+    return rows
+
+
+def bench_gatekeeper(workloads, repeats, **_):
+    """Standalone ResNet18 Gatekeeper: preprocess + forward (is_food() itself is still a stub)."""
+    import torch
+    from app.models.gatekeeper import Gatekeeper
+    from app.models.preprocessing import decode_image
+    try:
+        gatekeeper = Gatekeeper()
+    except Exception as e:
+        # Needs the torchvision ImageNet weights download
+        print(f"Skipping gatekeeper: {e}")
+        return []
+
+    rows = []
+    for label, images in workloads.items():
+        reset_peak_rss()
+        timings = []
+        for image_bytes in images:
+            def run():
+                with torch.no_grad():
+                    gatekeeper.model(gatekeeper.transform(decode_image(image_bytes)).unsqueeze(0))
+            timings += _timed(run, repeats)
+        rows.append(_row("gatekeeper", timings, images=label, threads=torch.get_num_threads()))
+    return rows
+
+
+def bench_portion(workloads, repeats, **_):
+    from app.services.vision_service import vision_service
+
+    async def run(image_bytes):
+        timings = []
+        for _ in range(repeats):
+            start = time.perf_counter()
+            await vision_service.estimate_portion(image_bytes, "pizza")
+            timings.append((time.perf_counter() - start) * 1000.0)
+        return timings
+
+    rows = []
+    for label, images in workloads.items():
+        reset_peak_rss()
+        timings = []
+        for image_bytes in images:
+            timings += asyncio.run(run(image_bytes))
+        rows.append(_row("portion", timings, images=label))
+    return rows
+
+
+def bench_predict(workloads, repeats, concurrency, executor_workers, **_):
+    """
+    End-to-end VisionService.predict_food (executor, micro-batching) under N
+    concurrent callers, for each number of executor decode workers.
+    """
+    from app.core.config import settings
+    from app.services.inference_executor import InferenceExecutor
+    from app.services.vision_service import vision_service
+
+    async def run(images, callers):
+        await vision_service.ensure_loaded()
+        for image_bytes in images[:2]:
+            await vision_service.predict_food(image_bytes)
+
+        latencies = []
+        requests = [images[i % len(images)] for i in range(max(callers, repeats * len(images)))]
+
+        async def caller(worker_id):
+            for i in range(worker_id, len(requests), callers):
+                start = time.perf_counter()
+                await vision_service.predict_food(requests[i])
+                latencies.append((time.perf_counter() - start) * 1000.0)
+
+        started = time.perf_counter()
+        await asyncio.gather(*(caller(w) for w in range(callers)))
+        return latencies, len(requests) / (time.perf_counter() - started)
+
+    rows = []
+    for workers in executor_workers:
+        vision_service.executor.shutdown()
+        vision_service.executor = InferenceExecutor(
+            max_workers=workers,
+            max_queue=settings.VISION_EXECUTOR_QUEUE_DEPTH,
+            torch_threads=settings.VISION_TORCH_THREADS,
+            processes=settings.WEB_CONCURRENCY,
+        )
+        for label, images in workloads.items():
+            for callers in concurrency:
+                reset_peak_rss()
+                latencies, throughput = asyncio.run(run(images, callers))
+                rows.append(_row("predict", latencies, images=label, concurrency=callers, workers=workers,
+                                 threads=vision_service.executor.stats().get("forward_torch_threads"),
+                                 batch_size=settings.VISION_BATCH_MAX_SIZE if settings.VISION_BATCHING_ENABLED else 1,
+                                 images_per_sec=throughput))
+    return rows
+
+
+BENCHMARKS = {
+    "preprocess": bench_preprocess,
+    "forward": bench_forward,
+    "gatekeeper": bench_gatekeeper,
+    "portion": bench_portion,
+    "predict": bench_predict,
+}
+
+
+def compare(results, baseline, tolerance):
+    """Prints per-row changes vs a baseline run; returns the rows that regressed beyond `tolerance`."""
+    from app.core.config import settings
+
+    def key(row):
+        # Runs recorded before predict rows had a worker count used the configured default
+        workers = row.get("workers") or (settings.VISION_EXECUTOR_WORKERS if row["section"] == "predict" else None)
+        return tuple(row.get(k) for k in ROW_KEY[:-1]) + (workers,)
+
+    base_rows = {key(r): r for r in baseline["results"]}
+    regressions = []
+    print(f"\nComparison with baseline ({baseline['meta'].get('timestamp')}, {baseline['meta'].get('host')}):")
+    print(f"{'Section':<12}{'Images':<8}{'Batch':>6}{'Thr':>5}{'Conc':>6}{'Wrk':>5}{'p50':>9}{'p95':>9}{'img/s':>9}")
+    for row in results:
+        base = base_rows.get(key(row))
+        if base is None:
+            continue
+        p50 = row["p50"] / base["p50"] - 1 if base["p50"] else 0.0
+        p95 = row["p95"] / base["p95"] - 1 if base["p95"] else 0.0
+        ips = row["images_per_sec"] / base["images_per_sec"] - 1 if base["images_per_sec"] else 0.0
+        regressed = p50 > tolerance or ips < -tolerance
+        if regressed:
+            regressions.append(row)
+        print(f"{row['section']:<12}{str(row['images'] or '-'):<8}{row['batch_size']:>6}{str(row['threads'] or '-'):>5}"
+              f"{row['concurrency']:>6}{str(row.get('workers') or '-'):>5}{p50:>+9.1%}{p95:>+9.1%}{ips:>+9.1%}" + ("  REGRESSION" if regressed else ""))
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Latency/throughput/memory benchmarks for the vision inference path.")
+    parser.add_argument("--sections", nargs="*", default=SECTIONS, choices=SECTIONS)
+    parser.add_argument("--images", nargs="*", default=[], help="Real photos to benchmark (default: synthetic)")
+    parser.add_argument("--sizes", nargs="*", default=list(PHOTO_SIZES), choices=list(PHOTO_SIZES))
+    parser.add_argument("--repeats", type=int, default=10)
+    parser.add_argument("--batch-sizes", type=int, nargs="*", default=[1, 4, 8, 16])
+    parser.add_argument("--threads", type=int, nargs="*", default=sorted({1, os.cpu_count() or 1}))
+    parser.add_argument("--concurrency", type=int, nargs="*", default=[1, 4, 16])
+    parser.add_argument("--executor-workers", type=int, nargs="*", default=None,
+                        help="Executor decode workers for the predict section (default: 1 and VISION_EXECUTOR_WORKERS)")
+    parser.add_argument("--json", dest="json_path", default=None, help="Write results (e.g. benchmarks/<name>.json)")
+    parser.add_argument("--compare", default=None, help="Baseline JSON from an earlier run")
+    parser.add_argument("--tolerance", type=float, default=0.15,
+                        help="Relative p50 slowdown / throughput drop counted as a regression")
+    args = parser.parse_args()
+
+    if args.images:
+        workloads = {"real": read_images(args.images)}
+    else:
+        workloads = {size: [synthetic_jpeg(*PHOTO_SIZES[size], seed=i) for i in range(4)] for size in args.sizes}
+
+    import torch
+    from app.core.config import settings
+    from app.services.vision_service import vision_service
+
+    executor_workers = args.executor_workers or sorted({1, settings.VISION_EXECUTOR_WORKERS})
+
+    results = []
+    print(f"{'Section':<12}{'Images':<8}{'Batch':>6}{'Thr':>5}{'Conc':>6}{'Wrk':>5}{'p50 ms':>9}{'p95 ms':>9}{'p99 ms':>9}"
+          f"{'img/s':>9}{'Peak MB':>9}")
+    print("-" * 87)
+    for section in args.sections:
+        rows = BENCHMARKS[section](workloads, args.repeats, batch_sizes=args.batch_sizes,
+                                   threads=args.threads, concurrency=args.concurrency,
+                                   executor_workers=executor_workers)
+        for r in rows:
+            print(f"{r['section']:<12}{str(r['images'] or '-'):<8}{r['batch_size']:>6}{str(r['threads'] or '-'):>5}"
+                  f"{r['concurrency']:>6}{str(r['workers'] or '-'):>5}{r['p50']:>9.1f}{r['p95']:>9.1f}{r['p99']:>9.1f}"
+                  f"{r['images_per_sec']:>9.1f}{r['peak_rss_mb']:>9.0f}")
+        results += rows
+
+    report = {
+        "meta": {
+            "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"),
+            "host": platform.node(),
+            "platform": platform.platform(),
+            "processor": platform.processor() or platform.machine(),
+            "cpu_count": os.cpu_count(),
+            "python": platform.python_version(),
+            "torch": torch.__version__,
+            "model_version": vision_service.model_version if vision_service.loaded else None,
+            "backend": vision_service.backend,
+            "repeats": args.repeats,
+            "synthetic": not args.images,
+        },
+        "results": results,
+    }
+    if args.json_path:
+        os.makedirs(os.path.dirname(args.json_path) or ".", exist_ok=True)
+        with open(args.json_path, "w") as f:
+            json.dump(report, f, indent=2)
+        print(f"\nWrote {args.json_path}")
+
+    if args.compare:
+        with open(args.compare) as f:
+            baseline = json.load(f)
+        if baseline["meta"].get("cpu_count") != os.cpu_count():
+            print("WARNING: baseline was recorded on a machine with a different CPU count")
+        if compare(results, baseline, args.tolerance):
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
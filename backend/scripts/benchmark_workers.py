@@ -0,0 +1,150 @@
+import os
+import sys
+import json
+import time
+import argparse
+import tempfile
+import multiprocessing
+
+# Add backend to path so we can import app modules
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from bench_utils import synthetic_jpeg
+
+# How each simulated server worker gets its classifier weights
+MODES = {
+    "legacy": "each worker torch.load()s its own copy (previous behaviour)",
+    "mmap": "each worker memory-maps the same weights file",
+    "preload": "master loads (mmap) once, workers are forked from it",
+}
+
+
+def read_memory_mb(pid: int):
+    """(RSS, PSS) in MB. PSS splits shared pages between the processes mapping them."""
+    values = {}
+    with open(f"/proc/{pid}/smaps_rollup") as f:
+        for line in f:
+            key, _, rest = line.partition(":")
+            if key in ("Rss", "Pss"):
+                values[key] = int(rest.split()[0]) / 1024
+    return values.get("Rss", 0.0), values.get("Pss", 0.0)
+
+
+def _worker(mode, weights, threads, duration, tensor, ready, go, results):
+    import torch
+    from app.models.food_classifier import FoodClassifier
+    from app.services.vision_service import vision_service
+
+    torch.set_num_threads(threads)
+    if mode == "legacy":
+        model = FoodClassifier(num_classes=101, pretrained=False)
+        model.load_state_dict(torch.load(weights, map_location="cpu"))
+        model.eval()
+    else:
+        vision_service.load()
+        model = vision_service.model
+
+    batch = tensor.unsqueeze(0)
+    with torch.no_grad():
+        for _ in range(2):
+            model(batch)
+        ready.wait()
+        go.wait()
+
+        count = 0
+        started = time.perf_counter()
+        while time.perf_counter() - started < duration:
+            model(batch)
+            count += 1
+    results.put(count)
+
+
+def run(mode, workers, weights, duration, tensor):
+    from app.services.vision_service import vision_service
+
+    ctx = multiprocessing.get_context("fork")
+    ready = ctx.Barrier(workers + 1)
+    go = ctx.Barrier(workers + 1)
+    results = ctx.Queue()
+    threads = max(1, (os.cpu_count() or 1) // workers)
+
+    if mode == "preload":
+        vision_service.load()
+
+    procs = [
+        ctx.Process(target=_worker, args=(mode, weights, threads, duration, tensor, ready, go, results))
+        for _ in range(workers)
+    ]
+    for p in procs:
+        p.start()
+
+    # Sample memory once every worker has loaded and warmed up
+    ready.wait()
+    pids = [p.pid for p in procs] + ([os.getpid()] if mode == "preload" else [])
+    memory = [read_memory_mb(pid) for pid in pids]
+    go.wait()
+
+    total = sum(results.get() for _ in procs)
+    for p in procs:
+        p.join()
+
+    return {
+        "mode": mode,
+        "workers": workers,
+        "torch_threads_per_worker": threads,
+        "total_rss_mb": sum(m[0] for m in memory),
+        "total_pss_mb": sum(m[1] for m in memory),
+        "images_per_sec": total / duration,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Total memory and throughput for N model-serving worker processes.")
+    parser.add_argument("--weights", default=None, help="Classifier .pth (default: VISION_MODEL_PATH, or random weights)")
+    parser.add_argument("--workers", type=int, nargs="*", default=[1, 2, 4, 8])
+    parser.add_argument("--modes", nargs="*", default=list(MODES), choices=list(MODES))
+    parser.add_argument("--duration", type=float, default=10.0, help="Seconds of inference per run")
+    parser.add_argument("--json", dest="json_path", default=None)
+    args = parser.parse_args()
+
+    weights = args.weights or os.getenv("VISION_MODEL_PATH", "app/models/food_classifier_finetuned.pth")
+    if not os.path.exists(weights):
+        import torch
+        from app.models.food_classifier import FoodClassifier
+        weights = os.path.join(tempfile.mkdtemp(), "random_classifier.pth")
+        torch.save(FoodClassifier(num_classes=101, pretrained=False).state_dict(), weights)
+        print(f"No weights found; using random weights at {weights}")
+
+    # Configure the app before it is imported; the gate head is irrelevant here
+    os.environ["VISION_MODEL_PATH"] = weights
+    os.environ["VISION_GATE_PATH"] = os.devnull + ".missing"
+
+    import torch
+    from app.models.preprocessing import load_image_tensor
+    # No OpenMP pool may exist in the parent before fork
+    torch.set_num_threads(1)
+    tensor = load_image_tensor(synthetic_jpeg(1024, 768))
+
+    rows = []
+    print(f"{'Mode':<9}{'Workers':>8}{'Threads':>9}{'RSS MB':>10}{'PSS MB':>10}{'img/s':>9}")
+    print("-" * 55)
+    for mode in args.modes:
+        for workers in args.workers:
+            # Each configuration runs in its own process so preloaded weights don't leak across runs
+            ctx = multiprocessing.get_context("fork")
+            queue = ctx.Queue()
+            runner = ctx.Process(target=lambda: queue.put(run(mode, workers, weights, args.duration, tensor)))
+            runner.start()
+            row = queue.get()
+            runner.join()
+            rows.append(row)
+            print(f"{mode:<9}{workers:>8}{row['torch_threads_per_worker']:>9}"
+                  f"{row['total_rss_mb']:>10.0f}{row['total_pss_mb']:>10.0f}{row['images_per_sec']:>9.1f}")
+
+    if args.json_path:
+        with open(args.json_path, "w") as f:
+            json.dump(rows, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,161 @@
+import os
+import sys
+import json
+import time
+import asyncio
+import argparse
+
+# Add backend to path so we can import app modules
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from app.core.config import settings
+from app.core.portion_data import PORTION_HEURISTICS, DEFAULT_WEIGHT
+from app.services.fdc_local import LocalFoodDatabase
+
+# Food-101 labels that search badly as-is; anything else can go in --overrides
+QUERY_OVERRIDES = {
+    "cup_cakes": "cupcake",
+    "donuts": "doughnut",
+    "escargots": "snail",
+}
+
+
+def display_name(class_name: str) -> str:
+    # Same formatting as VisionService: "hot_pot" -> "Hot Pot"
+    return class_name.replace("_", " ").title()
+
+
+def heuristic_portion(name: str) -> int:
+    """First PORTION_HEURISTICS keyword in the name, as VisionService.estimate_portion matches it."""
+    lower_name = name.lower()
+    for key, val in PORTION_HEURISTICS.items():
+        if key in lower_name:
+            return val
+    return DEFAULT_WEIGHT
+
+
+def lookup_local(db: LocalFoodDatabase, query: str):
+    # A match on only some of the words ("Hot And Sour Soup" -> "Hot dog") is
+    # flagged so it can be reviewed and corrected with --overrides
+    matches = db.search(query, limit=1, require_all=True)
+    weak = not matches
+    if weak:
+        matches = db.search(query, limit=1)
+    if not matches:
+        return None
+    best = matches[0]
+    return {"fdc_id": best["fdc_id"], "usda_description": best["description"], "weak_match": weak,
+            **{key: best[key] for key in ("calories", "protein", "carbs", "fats")}}
+
+
+async def lookup_usda(client, query: str):
+    data = await client.search_foods(query, page_size=1)
+    if not data.get("foods"):
+        return None
+    food = data["foods"][0]
+    nutrients = {n["nutrientId"]: n["value"] for n in food.get("foodNutrients", [])}
+    return {
+        "fdc_id": food.get("fdcId"),
+        "usda_description": food.get("description"),
+        "weak_match": False,
+        "calories": nutrients.get(1008, nutrients.get(208, 0.0)),
+        "protein": nutrients.get(1003, nutrients.get(203, 0.0)),
+        "carbs": nutrients.get(1005, nutrients.get(205, 0.0)),
+        "fats": nutrients.get(1004, nutrients.get(204, 0.0)),
+    }
+
+
+async def build_entries(classes, overrides, source):
+    if source == "local":
+        db = LocalFoodDatabase(settings.FDC_DB_PATH)
+    elif source == "usda":
+        from app.services.usda_client import USDAClient
+        client = USDAClient(settings.USDA_API_KEY)
+
+    entries = []
+    for class_id, class_name in enumerate(classes):
+        override = overrides.get(class_name, {})
+        name = override.get("display_name", display_name(class_name))
+        query = override.get("query", QUERY_OVERRIDES.get(class_name, name))
+        match = None
+        if source == "local":
+            match = lookup_local(db, query)
+        elif source == "usda":
+            try:
+                match = await lookup_usda(client, query)
+            except Exception as e:
+                print(f"  {class_name}: USDA lookup failed ({e})")
+        if match is not None and "macros" in override:
+            match.update(override["macros"], weak_match=False)
+
+        entries.append({
+            "id": class_id,
+            "class": class_name,
+            "display_name": name,
+            "aliases": sorted({class_name, name.lower(), query.lower()}),
+            "query": query,
+            "portion_g": override.get("portion_g", heuristic_portion(name)),
+            "fdc_id": match["fdc_id"] if match else None,
+            "usda_description": match["usda_description"] if match else None,
+            "weak_match": match["weak_match"] if match else False,
+            "calories": match["calories"] if match else None,
+            "protein": match["protein"] if match else None,
+            "carbs": match["carbs"] if match else None,
+            "fats": match["fats"] if match else None,
+        })
+    return entries
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Precompute the per-class nutrition/portion table used by upload.")
+    parser.add_argument("--classes", default="app/models/food_classifier_finetuned.json",
+                        help="JSON list of classifier labels, in output index order")
+    parser.add_argument("--source", choices=["local", "usda", "none"], default=None,
+                        help="Where macros come from (default: local FDC database if built, else the USDA API)")
+    parser.add_argument("--overrides", default=None,
+                        help='JSON {class: {"query", "display_name", "portion_g", "macros"}} corrections')
+    parser.add_argument("--output", default=settings.CLASS_TABLE_PATH)
+    args = parser.parse_args()
+
+    source = args.source
+    if source is None:
+        source = "local" if os.path.exists(settings.FDC_DB_PATH) else "usda" if settings.USDA_API_KEY else "none"
+    with open(args.classes) as f:
+        classes = json.load(f)
+    overrides = {}
+    if args.overrides:
+        with open(args.overrides) as f:
+            overrides = json.load(f)
+
+    print(f"Building class table for {len(classes)} classes from '{source}'...")
+    entries = asyncio.run(build_entries(classes, overrides, source))
+
+    table = {
+        "meta": {
+            "built_at": time.strftime("%Y-%m-%dT%H:%M:%S"),
+            "source": source,
+            "classes_file": args.classes,
+            "fdc_db": settings.FDC_DB_PATH if source == "local" else None,
+        },
+        "classes": entries,
+    }
+    tmp_path = args.output + ".tmp"
+    with open(tmp_path, "w") as f:
+        json.dump(table, f, indent=1)
+    os.replace(tmp_path, args.output)
+
+    print(f"{'Id':>4}  {'Class':<24}{'Portion':>8}{'kcal/100g':>11}  USDA food")
+    for e in entries:
+        kcal = f"{e['calories']:.0f}" if e["calories"] is not None else "-"
+        flag = "  (partial match, review)" if e["weak_match"] else ""
+        print(f"{e['id']:>4}  {e['class']:<24}{e['portion_g']:>7}g{kcal:>11}  {e['usda_description'] or 'no match'}{flag}")
+    unmatched = [e["class"] for e in entries if e["calories"] is None]
+    weak = [e["class"] for e in entries if e["weak_match"]]
+    print(f"\nWrote {args.output}: {len(entries) - len(unmatched)}/{len(entries)} classes with macros, "
+          f"{len(weak)} partial matches")
+    if unmatched:
+        print(f"No match (upload falls back to a runtime lookup): {', '.join(unmatched)}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,90 @@
+import os
+import sys
+import json
+import time
+import argparse
+import multiprocessing
+from pathlib import Path
+
+import numpy as np
+from PIL import Image
+
+# Add backend to path so we can import app modules
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from app.models.food_dataset import CACHE_ROOT, DATA_ROOT, list_food101_split
+from app.models.preprocessing import RESIZE_SIZE, decode_image
+
+CLASS_MAP_PATH = Path("app/models/food_classifier_finetuned.json")
+
+
+def decode_fixed(args):
+    """JPEG -> (size, size, 3) uint8: short side resized to `size`, then center-cropped square."""
+    path, size = args
+    with open(path, "rb") as f:
+        image = decode_image(f.read(), min_side=size)
+    width, height = image.size
+    scale = size / min(width, height)
+    crop = size / scale
+    left = (width - crop) / 2
+    top = (height - crop) / 2
+    image = image.resize((size, size), Image.BILINEAR, box=(left, top, left + crop, top + crop))
+    return np.asarray(image, dtype=np.uint8)
+
+
+def build_split(samples, split, output, size, shard_size, workers):
+    labels = np.array([label for _, label in samples], dtype=np.int16)
+    np.save(output / f"{split}_labels.npy", labels)
+
+    shard_names = []
+    started = time.perf_counter()
+    with multiprocessing.Pool(workers) as pool:
+        for shard_idx, start in enumerate(range(0, len(samples), shard_size)):
+            chunk = samples[start:start + shard_size]
+            name = f"{split}_{shard_idx:03d}.npy"
+            shard = np.lib.format.open_memmap(output / name, mode="w+", dtype=np.uint8,
+                                              shape=(len(chunk), size, size, 3))
+            jobs = ((path, size) for path, _ in chunk)
+            for i, pixels in enumerate(pool.imap(decode_fixed, jobs, chunksize=16)):
+                shard[i] = pixels
+            shard.flush()
+            del shard
+            shard_names.append(name)
+            done = start + len(chunk)
+            print(f"  {split}: {done}/{len(samples)} images "
+                  f"({done / (time.perf_counter() - started):.0f} img/s)")
+    return {"count": len(samples), "shards": shard_names}
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Pre-decode Food-101 into memory-mappable uint8 shards for training.")
+    parser.add_argument("--data-root", type=Path, default=DATA_ROOT)
+    parser.add_argument("--output", type=Path, default=CACHE_ROOT)
+    parser.add_argument("--size", type=int, default=RESIZE_SIZE,
+                        help="Stored square side; random 224 crops are taken from it at train time")
+    parser.add_argument("--shard-size", type=int, default=8192, help="Images per shard file")
+    parser.add_argument("--splits", nargs="*", default=["train", "test"])
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1)
+    args = parser.parse_args()
+
+    with open(CLASS_MAP_PATH) as f:
+        classes = json.load(f)
+
+    args.output.mkdir(parents=True, exist_ok=True)
+    (args.output / "meta.json").unlink(missing_ok=True)
+    meta = {"classes": classes, "size": args.size, "shard_size": args.shard_size, "splits": {}}
+    for split in args.splits:
+        samples = list_food101_split(args.data_root, split, classes)
+        print(f"Caching {len(samples)} {split} images at {args.size}x{args.size}...")
+        meta["splits"][split] = build_split(samples, split, args.output, args.size, args.shard_size, args.workers)
+
+    # Written last, so a half-built cache is never picked up by training
+    with open(args.output / "meta.json", "w") as f:
+        json.dump(meta, f)
+
+    total_bytes = sum(p.stat().st_size for p in args.output.glob("*.npy"))
+    print(f"Cache written to {args.output} ({total_bytes / 1e9:.1f} GB)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,53 @@
+import os
+import sys
+import json
+import time
+import argparse
+from pathlib import Path
+
+import torch
+
+# Add backend to path so we can import app modules
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from app.models.weights import save_weights, load_weights
+
+CLASS_MAP_PATH = Path("app/models/food_classifier_finetuned.json")
+
+
+def convert(src: Path, dst: Path, classes):
+    state_dict = torch.load(src, map_location="cpu", weights_only=True)
+    metadata = {"source": src.name}
+    if classes is not None:
+        metadata["classes"] = json.dumps(classes)
+    save_weights(state_dict, dst, metadata)
+
+    # Round-trip check before anyone deletes the .pth
+    started = time.perf_counter()
+    loaded, _ = load_weights(dst)
+    load_ms = (time.perf_counter() - started) * 1000.0
+    for name, tensor in state_dict.items():
+        if not torch.equal(tensor, loaded[name]):
+            raise RuntimeError(f"Mismatch in {name} after conversion")
+    print(f"{src} -> {dst} ({len(state_dict)} tensors, {dst.stat().st_size / 1e6:.1f} MB, loads in {load_ms:.1f} ms)")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Convert .pth state dicts to memory-mappable .safetensors.")
+    parser.add_argument("weights", nargs="+", type=Path, help=".pth files, e.g. food_classifier_finetuned.pth gatekeeper.pth")
+    parser.add_argument("--classes", type=Path, default=CLASS_MAP_PATH,
+                        help="Class list JSON to embed as metadata")
+    parser.add_argument("--no-classes", action="store_true", help="Don't embed a class list (e.g. gate heads)")
+    args = parser.parse_args()
+
+    classes = None
+    if not args.no_classes and args.classes.exists():
+        with open(args.classes) as f:
+            classes = json.load(f)
+
+    for src in args.weights:
+        convert(src, src.with_suffix(".safetensors"), classes)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,184 @@
+import os
+import sys
+import json
+import time
+import argparse
+from pathlib import Path
+
+import torch
+import torch.nn.functional as F
+import torch.optim as optim
+from torch.utils.data import DataLoader, Subset, random_split
+from tqdm import tqdm
+
+# Add backend to path so we can import app modules
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from app.core.config import settings
+from app.models.food_classifier import COMPACT_ARCHS, build_classifier, get_transforms, load_classifier
+from app.models.food_dataset import DATA_ROOT, ImageListDataset, MemmapFoodDataset, list_food101_split
+from app.models.weights import resolve_weights_path, save_weights
+from bench_utils import evaluate, measure_latency
+
+CLASS_MAP_PATH = Path("app/models/food_classifier_finetuned.json")
+
+
+def distillation_loss(student_logits, teacher_logits, labels, temperature: float, alpha: float):
+    """
+    Hinton et al. KD: alpha * T^2 * KL(teacher_T || student_T) + (1 - alpha) * CE(labels).
+    The T^2 factor keeps soft-target gradients on the same scale as the hard loss.
+    """
+    soft = F.kl_div(
+        F.log_softmax(student_logits / temperature, dim=1),
+        F.log_softmax(teacher_logits / temperature, dim=1),
+        reduction="batchmean",
+        log_target=True,
+    ) * temperature ** 2
+    hard = F.cross_entropy(student_logits, labels)
+    return alpha * soft + (1 - alpha) * hard
+
+
+def load_data(args, classes):
+    """
+    (train, val, test). Validation images are held out of the train split
+    (without augmentation) for picking the best epoch; the test split is only
+    used for the final report.
+    """
+    if args.cache_dir is not None:
+        train_full = MemmapFoodDataset(args.cache_dir, "train", train=True)
+        train_plain = MemmapFoodDataset(args.cache_dir, "train", train=False)
+        test_dataset = MemmapFoodDataset(args.cache_dir, "test", train=False)
+    else:
+        train_samples = list_food101_split(args.data_root, "train", classes)
+        test_samples = list_food101_split(args.data_root, "test", classes)
+        train_full = ImageListDataset(train_samples, get_transforms(is_training=True))
+        train_plain = ImageListDataset(train_samples, get_transforms(is_training=False))
+        test_dataset = ImageListDataset(test_samples, get_transforms(is_training=False))
+
+    # Same fixed seed as train_model.py, so reruns validate on the same images
+    val_size = min(args.val_images, len(train_full) // 5)
+    train_split, val_split = random_split(range(len(train_full)), [len(train_full) - val_size, val_size],
+                                          generator=torch.Generator().manual_seed(42))
+    return Subset(train_full, train_split.indices), Subset(train_plain, val_split.indices), test_dataset
+
+
+def model_row(name, model, loader, path=None):
+    _, top1, top3 = evaluate(model, loader)
+    return {
+        "model": name,
+        "params_m": sum(p.numel() for p in model.parameters()) / 1e6,
+        "size_mb": path.stat().st_size / 1e6 if path else None,
+        "top1": top1,
+        "top3": top3,
+        "latency_ms": measure_latency(model),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Distill the fine-tuned ResNet50 into a compact student classifier.")
+    parser.add_argument("--arch", default="mobilenet_v3_large", choices=list(COMPACT_ARCHS))
+    parser.add_argument("--teacher", type=Path, default=Path(settings.VISION_MODEL_PATH))
+    parser.add_argument("--output", type=Path, default=Path(settings.VISION_STUDENT_MODEL_PATH))
+    parser.add_argument("--data-root", type=Path, default=DATA_ROOT)
+    parser.add_argument("--cache-dir", type=Path, default=None, help="Pre-decoded cache from build_training_cache.py")
+    parser.add_argument("--epochs", type=int, default=10)
+    parser.add_argument("--batch-size", type=int, default=64)
+    parser.add_argument("--lr", type=float, default=1e-3)
+    parser.add_argument("--temperature", type=float, default=4.0)
+    parser.add_argument("--alpha", type=float, default=0.7, help="Weight of the soft-target loss")
+    parser.add_argument("--num-workers", type=int, default=4)
+    parser.add_argument("--bf16", action="store_true", help="bfloat16 autocast for teacher and student forwards")
+    parser.add_argument("--val-images", type=int, default=2000,
+                        help="Train images held out for choosing the best epoch")
+    parser.add_argument("--eval-images", type=int, default=2000, help="Test images for the final comparison table")
+    parser.add_argument("--eval-only", action="store_true", help="Skip training; compare the existing --output")
+    parser.add_argument("--json", dest="json_path", default=None)
+    args = parser.parse_args()
+
+    torch.set_num_threads(os.cpu_count() or 1)
+    with open(CLASS_MAP_PATH) as f:
+        classes = json.load(f)
+
+    teacher_path = resolve_weights_path(args.teacher)
+    print(f"Loading teacher from {teacher_path}...")
+    teacher, _ = load_classifier(teacher_path)
+
+    train_dataset, val_dataset, test_dataset = load_data(args, classes)
+    generator = torch.Generator().manual_seed(0)
+    eval_idx = torch.randperm(len(test_dataset), generator=generator)[:args.eval_images].tolist()
+    eval_loader = DataLoader(Subset(test_dataset, eval_idx), batch_size=args.batch_size, num_workers=args.num_workers)
+
+    if not args.eval_only:
+        student = build_classifier(args.arch, num_classes=len(classes), pretrained=True)
+        train_loader = DataLoader(train_dataset, batch_size=args.batch_size, shuffle=True,
+                                  num_workers=args.num_workers, persistent_workers=args.num_workers > 0)
+        val_loader = DataLoader(val_dataset, batch_size=args.batch_size, num_workers=args.num_workers)
+        print(f"Data: {len(train_dataset)} training, {len(val_dataset)} validation images")
+        optimizer = optim.AdamW(student.parameters(), lr=args.lr, weight_decay=1e-4)
+        scheduler = optim.lr_scheduler.CosineAnnealingLR(optimizer, T_max=args.epochs * len(train_loader))
+        metadata = {"arch": args.arch, "classes": json.dumps(classes), "teacher": teacher_path.name,
+                    "temperature": args.temperature, "alpha": args.alpha}
+
+        best_acc = -1.0  # always keep the first epoch's student
+        for epoch in range(args.epochs):
+            student.train()
+            started = time.perf_counter()
+            running_loss = 0.0
+            seen = 0
+            progress_bar = tqdm(train_loader, desc=f"Epoch {epoch+1}/{args.epochs}")
+            for inputs, labels in progress_bar:
+                with torch.autocast(device_type="cpu", dtype=torch.bfloat16, enabled=args.bf16):
+                    # Teacher sees the same augmented batch, so soft targets match what the student sees
+                    with torch.no_grad():
+                        teacher_logits = teacher(inputs)
+                    student_logits = student(inputs)
+                loss = distillation_loss(student_logits.float(), teacher_logits.float(), labels,
+                                         args.temperature, args.alpha)
+                optimizer.zero_grad()
+                loss.backward()
+                optimizer.step()
+                scheduler.step()
+                running_loss += loss.item() * inputs.size(0)
+                seen += inputs.size(0)
+                progress_bar.set_postfix(loss=loss.item())
+
+            student.eval()
+            _, val_top1, _ = evaluate(student, val_loader)
+            elapsed = time.perf_counter() - started
+            print(f"Epoch {epoch+1}: loss {running_loss / seen:.4f} val top-1 {val_top1:.4f} "
+                  f"({elapsed:.0f} s, {seen / elapsed:.1f} samples/s)")
+            if val_top1 > best_acc:
+                best_acc = val_top1
+                save_weights(student.state_dict(), args.output, metadata)
+                print(f"New best student! Saved to {args.output}")
+
+    student, student_meta = load_classifier(resolve_weights_path(args.output))
+
+    print(f"\nComparing teacher and student on {len(eval_idx)} test images...")
+    rows = [
+        model_row("teacher (resnet50)", teacher, eval_loader, teacher_path),
+        model_row(f"student ({student_meta.get('arch')})", student, eval_loader, resolve_weights_path(args.output)),
+    ]
+
+    print("\n" + "=" * 78)
+    print(f"DISTILLATION REPORT (CPU, batch 1, {torch.get_num_threads()} threads)")
+    print("=" * 78)
+    print(f"{'Model':<30}{'Params (M)':>11}{'Size (MB)':>11}{'Top-1':>9}{'Top-3':>9}{'Latency (ms)':>14}")
+    for row in rows:
+        print(f"{row['model']:<30}{row['params_m']:>11.1f}{row['size_mb']:>11.1f}"
+              f"{row['top1']:>9.2%}{row['top3']:>9.2%}{row['latency_ms']:>14.1f}")
+    print("-" * 78)
+    teacher_row, student_row = rows
+    print(f"Speedup: {teacher_row['latency_ms'] / student_row['latency_ms']:.2f}x   "
+          f"Top-1 change: {student_row['top1'] - teacher_row['top1']:+.2%}")
+    print("Serve it with VISION_BACKEND=student"
+          + (f" VISION_STUDENT_MODEL_PATH={args.output}" if str(args.output) != settings.VISION_STUDENT_MODEL_PATH else ""))
+    print("=" * 78)
+
+    if args.json_path:
+        with open(args.json_path, "w") as f:
+            json.dump(rows, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,121 @@
+import os
+import sys
+import json
+import argparse
+from pathlib import Path
+
+import torch
+from torch.utils.data import DataLoader, Subset
+
+# Add backend to path so we can import app modules
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from app.core.config import settings
+from app.models.food_classifier import load_classifier
+from app.models.food_dataset import DATA_ROOT, ImageListDataset, list_food101_split
+from app.models.preprocessing import preprocess_image
+from app.models.weights import resolve_weights_path
+from bench_utils import measure_latency
+
+CLASS_MAP_PATH = Path("app/models/food_classifier_finetuned.json")
+
+
+def collect_probs(model, loader):
+    """Softmax outputs for every image in the loader, plus the labels."""
+    probs, labels = [], []
+    with torch.no_grad():
+        for inputs, targets in loader:
+            probs.append(torch.softmax(model(inputs), dim=1))
+            labels.append(targets)
+    return torch.cat(probs), torch.cat(labels)
+
+
+def simulate(fast_probs, full_probs, labels, min_confidence, min_margin, fast_ms, full_ms):
+    """Accuracy, escalation rate and mean per-image latency of the cascade at one threshold pair."""
+    top2 = torch.topk(fast_probs, 2, dim=1).values
+    confident = (top2[:, 0] >= min_confidence) & (top2[:, 0] - top2[:, 1] >= min_margin)
+    preds = torch.where(confident, fast_probs.argmax(dim=1), full_probs.argmax(dim=1))
+    escalation = 1.0 - confident.float().mean().item()
+    return {
+        "min_confidence": min_confidence,
+        "min_margin": min_margin,
+        "escalation_rate": escalation,
+        "top1": (preds == labels).float().mean().item(),
+        # Every image pays for the fast model; escalated ones also pay for the full one
+        "mean_latency_ms": fast_ms + escalation * full_ms,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Pick confidence/margin thresholds for the small->full model cascade.")
+    parser.add_argument("--fast-weights", type=Path, default=Path(settings.VISION_CASCADE_MODEL_PATH))
+    parser.add_argument("--full-weights", type=Path, default=Path(settings.VISION_MODEL_PATH))
+    parser.add_argument("--data-root", type=Path, default=DATA_ROOT)
+    parser.add_argument("--eval-images", type=int, default=2000)
+    parser.add_argument("--batch-size", type=int, default=32)
+    parser.add_argument("--confidences", type=float, nargs="*", default=[0.5, 0.6, 0.7, 0.8, 0.9, 0.95])
+    parser.add_argument("--margins", type=float, nargs="*", default=[0.0, 0.1, 0.2, 0.3, 0.5])
+    parser.add_argument("--max-top1-drop", type=float, default=0.005,
+                        help="Only recommend thresholds within this top-1 drop vs the full model")
+    parser.add_argument("--json", dest="json_path", default=None)
+    args = parser.parse_args()
+
+    with open(CLASS_MAP_PATH) as f:
+        classes = json.load(f)
+
+    fast_model, fast_meta = load_classifier(resolve_weights_path(args.fast_weights))
+    full_model, _ = load_classifier(resolve_weights_path(args.full_weights))
+    print(f"Fast model: {fast_meta.get('arch', 'resnet50')}  Full model: resnet50")
+
+    test_samples = list_food101_split(args.data_root, "test", classes)
+    generator = torch.Generator().manual_seed(0)
+    eval_idx = torch.randperm(len(test_samples), generator=generator)[:args.eval_images].tolist()
+    loader = DataLoader(Subset(ImageListDataset(test_samples, preprocess_image), eval_idx),
+                        batch_size=args.batch_size, num_workers=2)
+
+    print(f"Scoring {len(eval_idx)} test images with both models...")
+    fast_probs, labels = collect_probs(fast_model, loader)
+    full_probs, _ = collect_probs(full_model, loader)
+
+    # Batch-1 latency, which is what a lone upload pays
+    fast_ms = measure_latency(fast_model)
+    full_ms = measure_latency(full_model)
+    full_top1 = (full_probs.argmax(dim=1) == labels).float().mean().item()
+    fast_top1 = (fast_probs.argmax(dim=1) == labels).float().mean().item()
+
+    rows = [
+        simulate(fast_probs, full_probs, labels, conf, margin, fast_ms, full_ms)
+        for conf in args.confidences
+        for margin in args.margins
+    ]
+
+    print("\n" + "=" * 64)
+    print("CASCADE THRESHOLD SWEEP")
+    print("=" * 64)
+    print(f"Full model only:  top-1 {full_top1:.2%}  {full_ms:.1f} ms")
+    print(f"Fast model only:  top-1 {fast_top1:.2%}  {fast_ms:.1f} ms")
+    print("-" * 64)
+    print(f"{'Conf':>6}{'Margin':>8}{'Escalated':>12}{'Top-1':>10}{'Drop':>9}{'Mean ms':>10}{'Speedup':>9}")
+    for row in rows:
+        print(f"{row['min_confidence']:>6.2f}{row['min_margin']:>8.2f}{row['escalation_rate']:>12.1%}"
+              f"{row['top1']:>10.2%}{full_top1 - row['top1']:>9.2%}"
+              f"{row['mean_latency_ms']:>10.1f}{full_ms / row['mean_latency_ms']:>8.2f}x")
+    print("=" * 64)
+
+    within_budget = [row for row in rows if full_top1 - row["top1"] <= args.max_top1_drop]
+    if within_budget:
+        best = min(within_budget, key=lambda row: row["mean_latency_ms"])
+        print(f"Recommended: VISION_CASCADE_MIN_CONFIDENCE={best['min_confidence']} "
+              f"VISION_CASCADE_MIN_MARGIN={best['min_margin']} "
+              f"({best['escalation_rate']:.1%} escalated, {best['mean_latency_ms']:.1f} ms mean)")
+    else:
+        print(f"No threshold pair stays within {args.max_top1_drop:.2%} of the full model; keep the cascade off.")
+
+    if args.json_path:
+        with open(args.json_path, "w") as f:
+            json.dump({"full_top1": full_top1, "fast_top1": fast_top1, "full_ms": full_ms,
+                       "fast_ms": fast_ms, "thresholds": rows}, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
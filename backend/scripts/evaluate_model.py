@@ -1,18 +1,193 @@
 import os
 import sys
+import json
+import time
 import random
 import asyncio
+import argparse
 from pathlib import Path
 from collections import defaultdict
 
+import numpy as np
+
 # Add backend to path so we can import app modules
 sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
 
+from app.models.preprocessing import load_image_tensor
 from app.services.vision_service import vision_service
 
 DATASET_PATH = Path("data/food-101/images")
+DATA_ROOT = DATASET_PATH.parent
+RUNS_DIR = Path("eval_runs")
+
+
+class UploadPathDataset:
+    """Test images through the exact decode/preprocess path uploads take (draft-mode JPEG decode)."""
+
+    def __init__(self, samples):
+        self.samples = samples
+
+    def __len__(self):
+        return len(self.samples)
+
+    def __getitem__(self, index):
+        path, label = self.samples[index]
+        with open(path, "rb") as f:
+            return load_image_tensor(f.read()), label
+
+
+def evaluate_batched(args):
+    """
+    Runs the served classifier over the whole test split in batches and persists
+    float16 logits + labels, so metrics can be recomputed later with --from-logits.
+    """
+    import torch
+    from torch.utils.data import DataLoader
+    from app.models.food_dataset import list_food101_split
+
+    if args.threads:
+        torch.set_num_threads(args.threads)
+    vision_service.load()
+    model = vision_service.model
+    classes = vision_service.categories
+
+    samples = list_food101_split(args.data_root, "test", classes)
+    if args.limit:
+        samples = samples[:args.limit]
+    if not samples:
+        print(f"Error: No test images found under {args.data_root}")
+        return None
+
+    run_dir = args.output or RUNS_DIR / time.strftime("%Y%m%d-%H%M%S")
+    run_dir.mkdir(parents=True, exist_ok=True)
+    # Written batch by batch straight to disk; 20k x 101 float16 is ~4 MB
+    logits = np.lib.format.open_memmap(run_dir / "logits.npy", mode="w+", dtype=np.float16,
+                                       shape=(len(samples), len(classes)))
+    labels = np.array([label for _, label in samples], dtype=np.int16)
+    np.save(run_dir / "labels.npy", labels)
+
+    loader = DataLoader(UploadPathDataset(samples), batch_size=args.batch_size,
+                        num_workers=args.num_workers, persistent_workers=args.num_workers > 0)
+    print(f"Evaluating {len(samples)} test images "
+          f"(batch size {args.batch_size}, {args.num_workers} decode workers, {torch.get_num_threads()} torch threads)...")
+
+    offset = 0
+    started = time.perf_counter()
+    with torch.no_grad():
+        for inputs, _ in loader:
+            outputs = model(inputs.to(vision_service.device))
+            logits[offset:offset + len(outputs)] = outputs.float().cpu().numpy()
+            offset += len(outputs)
+            elapsed = time.perf_counter() - started
+            print(f"\r[{offset}/{len(samples)}] {offset / elapsed:.1f} img/s", end="", flush=True)
+    elapsed = time.perf_counter() - started
+    logits.flush()
+    print()
+
+    meta = {
+        "classes": classes,
+        "paths": [path for path, _ in samples],
+        "model_version": vision_service.model_version,
+        "backend": vision_service.backend,
+        "batch_size": args.batch_size,
+        "num_workers": args.num_workers,
+        "torch_threads": torch.get_num_threads(),
+        "seconds": elapsed,
+        "images_per_sec": len(samples) / elapsed,
+    }
+    with open(run_dir / "meta.json", "w") as f:
+        json.dump(meta, f)
+
+    print(f"Saved logits for {len(samples)} images to {run_dir} "
+          f"({elapsed:.1f} s, {meta['images_per_sec']:.1f} img/s end-to-end)")
+    return run_dir
+
 
-async def evaluate():
+def load_run(run_dir: Path):
+    logits = np.load(run_dir / "logits.npy", mmap_mode="r")
+    labels = np.load(run_dir / "labels.npy").astype(np.int64)
+    with open(run_dir / "meta.json") as f:
+        meta = json.load(f)
+    return logits, labels, meta
+
+
+def compute_metrics(logits: np.ndarray, labels: np.ndarray, num_classes: int, topk=(1, 3, 5), ece_bins: int = 15):
+    """Top-k accuracy, per-class accuracy, confusion matrix and expected calibration error from stored logits."""
+    logits = np.asarray(logits, dtype=np.float32)
+    shifted = logits - logits.max(axis=1, keepdims=True)
+    probs = np.exp(shifted)
+    probs /= probs.sum(axis=1, keepdims=True)
+
+    ranked = np.argsort(-logits, axis=1)[:, :max(topk)]
+    hits = ranked == labels[:, None]
+    accuracy = {f"top{k}": float(hits[:, :k].any(axis=1).mean()) for k in topk}
+
+    predicted = ranked[:, 0]
+    confusion = np.zeros((num_classes, num_classes), dtype=np.int64)
+    np.add.at(confusion, (labels, predicted), 1)
+    support = confusion.sum(axis=1)
+    per_class = np.divide(np.diag(confusion), support, out=np.zeros(num_classes), where=support > 0)
+
+    # ECE: |accuracy - confidence| per confidence bin, weighted by bin size
+    confidence = probs.max(axis=1)
+    correct = predicted == labels
+    bins = np.minimum((confidence * ece_bins).astype(np.int64), ece_bins - 1)
+    ece = 0.0
+    for b in range(ece_bins):
+        in_bin = bins == b
+        if in_bin.any():
+            ece += in_bin.mean() * abs(correct[in_bin].mean() - confidence[in_bin].mean())
+
+    return {
+        **accuracy,
+        "ece": float(ece),
+        "mean_confidence": float(confidence.mean()),
+        "per_class": per_class,
+        "support": support,
+        "confusion": confusion,
+    }
+
+
+def report(run_dir: Path, confusion_csv: Path = None):
+    started = time.perf_counter()
+    logits, labels, meta = load_run(run_dir)
+    classes = meta["classes"]
+    metrics = compute_metrics(logits, labels, len(classes))
+    elapsed = time.perf_counter() - started
+
+    print("\n" + "=" * 30)
+    print("EVALUATION RESULTS")
+    print("=" * 30)
+    print(f"Run:                {run_dir}")
+    print(f"Model:              {meta.get('model_version')}")
+    print(f"Images Tested:      {len(labels)}")
+    for k in (1, 3, 5):
+        print(f"{f'Top-{k} Accuracy:':<20}{metrics[f'top{k}']:.2%}")
+    print(f"ECE (15 bins):      {metrics['ece']:.4f} (mean confidence {metrics['mean_confidence']:.2%})")
+    if "images_per_sec" in meta:
+        print(f"Throughput:         {meta['images_per_sec']:.1f} img/s "
+              f"(batch {meta['batch_size']}, {meta['num_workers']} workers, {meta['torch_threads']} threads)")
+    print("=" * 30)
+
+    evaluated = np.flatnonzero(metrics["support"])
+    worst = evaluated[np.argsort(metrics["per_class"][evaluated])][:10]
+    print("Weakest classes:")
+    for idx in worst:
+        row = metrics["confusion"][idx].copy()
+        row[idx] = 0
+        confused_with = classes[int(row.argmax())] if row.any() else "-"
+        print(f"  {classes[idx]:<28}{metrics['per_class'][idx]:>8.2%}   most confused with {confused_with}")
+    print(f"(metrics recomputed from stored logits in {elapsed:.2f} s)")
+
+    if confusion_csv:
+        with open(confusion_csv, "w") as f:
+            f.write("true\\predicted," + ",".join(classes) + "\n")
+            for idx, name in enumerate(classes):
+                f.write(name + "," + ",".join(str(n) for n in metrics["confusion"][idx]) + "\n")
+        print(f"Confusion matrix written to {confusion_csv}")
+
+
+async def evaluate(limit: int = 50):
     print(f"Loading dataset from {DATASET_PATH}...")
     if not DATASET_PATH.exists():
         print(f"Error: Dataset not found at {DATASET_PATH}")
@@ -45,7 +220,7 @@ async def evaluate():
     
     # 3. Evaluate Test Set
     # Limit to first 100 for speed in this demo, or run full if user wants
-    EVAL_LIMIT = 50 
+    EVAL_LIMIT = limit
     print(f"\nRunning evaluation on random {EVAL_LIMIT} images from test set...")
     
     subset = test_set[:EVAL_LIMIT]
@@ -104,4 +279,28 @@ async def evaluate():
     print("Note: Low accuracy might be due to label mismatches between Food-101 and ImageNet classes.")
 
 if __name__ == "__main__":
-    asyncio.run(evaluate())
+    parser = argparse.ArgumentParser(description="Evaluate the food classifier on Food-101.")
+    parser.add_argument("--batched", action="store_true",
+                        help="Run the classifier directly over the full test split and save logits")
+    parser.add_argument("--from-logits", type=Path, default=None, metavar="RUN_DIR",
+                        help="Recompute metrics from a saved run without re-running inference")
+    parser.add_argument("--data-root", type=Path, default=DATA_ROOT)
+    parser.add_argument("--output", type=Path, default=None, help=f"Run directory (default: {RUNS_DIR}/<timestamp>)")
+    parser.add_argument("--batch-size", type=int, default=64)
+    parser.add_argument("--num-workers", type=int, default=max(1, (os.cpu_count() or 2) // 2),
+                        help="DataLoader processes decoding JPEGs")
+    parser.add_argument("--threads", type=int, default=0, help="torch intra-op threads (0 = torch default)")
+    parser.add_argument("--limit", type=int, default=None,
+                        help="Images to evaluate (default: all in batched mode, 50 in per-upload mode)")
+    parser.add_argument("--confusion-csv", type=Path, default=None)
+    args = parser.parse_args()
+
+    if args.from_logits:
+        report(args.from_logits, args.confusion_csv)
+    elif args.batched:
+        run_dir = evaluate_batched(args)
+        if run_dir:
+            report(run_dir, args.confusion_csv)
+    else:
+        # End-to-end through vision_service.predict_food, one upload at a time
+        asyncio.run(evaluate(args.limit or 50))
@@ -0,0 +1,145 @@
+import os
+import sys
+import csv
+import json
+import time
+import sqlite3
+import argparse
+from pathlib import Path
+
+# Add backend to path so we can import app modules
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from app.core.config import settings
+from app.services.fdc_local import SCHEMA, LocalFoodDatabase
+
+# FDC nutrient ids (legacy nutrient numbers in brackets). Foundation foods often
+# only report Atwater energy, so those are fallbacks for kcal.
+ENERGY_IDS = (1008, 2047, 2048)  # Energy kcal [208], Atwater General, Atwater Specific
+PROTEIN_ID = 1003  # [203]
+FAT_ID = 1004  # [204]
+CARBS_ID = 1005  # [205]
+NUTRIENT_IDS = (*ENERGY_IDS, PROTEIN_ID, FAT_ID, CARBS_ID)
+
+# Bulk download data_type values; branded foods (~2M products) are opt-in
+DEFAULT_DATA_TYPES = ["foundation_food", "sr_legacy_food", "survey_fndds_food"]
+JSON_ROOTS = {
+    "FoundationFoods": "foundation_food",
+    "SRLegacyFoods": "sr_legacy_food",
+    "SurveyFoods": "survey_fndds_food",
+    "BrandedFoods": "branded_food",
+}
+
+# food_nutrient amounts are per 100 g for every data type
+PIVOT_SQL = f"""
+INSERT INTO foods (fdc_id, data_type, description, calories, protein, carbs, fats)
+SELECT s.fdc_id, s.data_type, s.description,
+       COALESCE(MAX(CASE WHEN n.nutrient_id = {ENERGY_IDS[0]} THEN n.amount END),
+                MAX(CASE WHEN n.nutrient_id = {ENERGY_IDS[1]} THEN n.amount END),
+                MAX(CASE WHEN n.nutrient_id = {ENERGY_IDS[2]} THEN n.amount END)) AS calories,
+       COALESCE(MAX(CASE WHEN n.nutrient_id = {PROTEIN_ID} THEN n.amount END), 0.0),
+       COALESCE(MAX(CASE WHEN n.nutrient_id = {CARBS_ID} THEN n.amount END), 0.0),
+       COALESCE(MAX(CASE WHEN n.nutrient_id = {FAT_ID} THEN n.amount END), 0.0)
+FROM staging_food s JOIN staging_nutrient n ON n.fdc_id = s.fdc_id
+GROUP BY s.fdc_id
+HAVING calories IS NOT NULL
+"""
+
+
+def load_csv(conn, csv_dir: Path, data_types):
+    """FDC bulk CSV layout: food.csv + food_nutrient.csv, streamed row by row."""
+    wanted = set(data_types)
+    with open(csv_dir / "food.csv", newline="", encoding="utf-8") as f:
+        conn.executemany(
+            "INSERT OR REPLACE INTO staging_food VALUES (?, ?, ?)",
+            ((int(r["fdc_id"]), r["data_type"], r["description"]) for r in csv.DictReader(f)
+             if r["data_type"] in wanted and r["description"]),
+        )
+
+    keep = {str(i) for i in NUTRIENT_IDS}
+    with open(csv_dir / "food_nutrient.csv", newline="", encoding="utf-8") as f:
+        conn.executemany(
+            "INSERT INTO staging_nutrient VALUES (?, ?, ?)",
+            ((int(r["fdc_id"]), int(r["nutrient_id"]), float(r["amount"])) for r in csv.DictReader(f)
+             if r["nutrient_id"] in keep and r["amount"]),
+        )
+
+
+def load_json(conn, json_path: Path, data_types):
+    """FDC JSON downloads ({"FoundationFoods": [...]} etc.). Loaded whole, so prefer CSV for branded foods."""
+    with open(json_path, encoding="utf-8") as f:
+        data = json.load(f)
+    for root, data_type in JSON_ROOTS.items():
+        if data_type not in data_types:
+            continue
+        for food in data.get(root, []):
+            conn.execute("INSERT OR REPLACE INTO staging_food VALUES (?, ?, ?)",
+                         (food["fdcId"], data_type, food["description"]))
+            conn.executemany(
+                "INSERT INTO staging_nutrient VALUES (?, ?, ?)",
+                ((food["fdcId"], n["nutrient"]["id"], n["amount"]) for n in food.get("foodNutrients", [])
+                 if n.get("nutrient", {}).get("id") in NUTRIENT_IDS and n.get("amount") is not None),
+            )
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Build the local FoodData Central database (NUTRITION_BACKEND=local).")
+    parser.add_argument("sources", nargs="+", type=Path,
+                        help="Unpacked FDC CSV download directories and/or FDC JSON files")
+    parser.add_argument("--output", type=Path, default=Path(settings.FDC_DB_PATH))
+    parser.add_argument("--data-types", nargs="*", default=DEFAULT_DATA_TYPES,
+                        help="FDC data_type values to import (add branded_food for products)")
+    args = parser.parse_args()
+
+    started = time.perf_counter()
+    args.output.parent.mkdir(parents=True, exist_ok=True)
+    tmp_path = args.output.with_name(args.output.name + ".tmp")
+    tmp_path.unlink(missing_ok=True)
+
+    conn = sqlite3.connect(tmp_path)
+    conn.execute("PRAGMA journal_mode = OFF")
+    conn.execute("PRAGMA synchronous = OFF")
+    conn.executescript(SCHEMA)
+    conn.execute("CREATE TEMP TABLE staging_food (fdc_id INTEGER PRIMARY KEY, data_type TEXT, description TEXT)")
+    conn.execute("CREATE TEMP TABLE staging_nutrient (fdc_id INTEGER, nutrient_id INTEGER, amount REAL)")
+
+    for source in args.sources:
+        print(f"Reading {source}...")
+        if source.is_dir():
+            load_csv(conn, source, args.data_types)
+        else:
+            load_json(conn, source, args.data_types)
+
+    print("Pivoting per-100g macros and building the full-text index...")
+    conn.execute("CREATE INDEX temp.staging_nutrient_fdc ON staging_nutrient (fdc_id)")
+    conn.execute(PIVOT_SQL)
+    conn.execute("INSERT INTO foods_fts (rowid, description) SELECT fdc_id, description FROM foods")
+    conn.execute("INSERT INTO foods_fts (foods_fts) VALUES ('optimize')")
+    counts = dict(conn.execute("SELECT data_type, COUNT(*) FROM foods GROUP BY data_type").fetchall())
+    conn.executemany("INSERT INTO meta VALUES (?, ?)", [
+        ("imported_at", time.strftime("%Y-%m-%dT%H:%M:%S")),
+        ("sources", json.dumps([str(s) for s in args.sources])),
+        ("counts", json.dumps(counts)),
+    ])
+    conn.commit()
+    conn.execute("DROP TABLE staging_nutrient")
+    conn.execute("DROP TABLE staging_food")
+    conn.execute("VACUUM")
+    conn.close()
+    os.replace(tmp_path, args.output)
+
+    print(f"Imported {sum(counts.values())} foods {counts} into {args.output} "
+          f"({args.output.stat().st_size / 1e6:.1f} MB, {time.perf_counter() - started:.0f} s)")
+
+    # Sanity check + lookup latency on the finished file
+    db = LocalFoodDatabase(str(args.output))
+    for query in ("Pizza", "Hot Dog", "Chicken Wings", "Caesar Salad", "Takoyaki"):
+        start = time.perf_counter()
+        matches = db.search(query, limit=1)
+        elapsed_ms = (time.perf_counter() - start) * 1000.0
+        best = f"{matches[0]['description']} ({matches[0]['calories']:.0f} kcal/100g)" if matches else "no match"
+        print(f"  {query:<15} -> {best}  [{elapsed_ms:.2f} ms]")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,73 @@
+import os
+import sys
+import json
+import argparse
+import subprocess
+
+BACKEND_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+
+# Each probe runs in a fresh interpreter so module caches and torch kernels start cold
+IMPORT_PROBE = """
+import json, time
+started = time.perf_counter()
+import {module}
+print(json.dumps({{"seconds": time.perf_counter() - started}}))
+"""
+
+PREDICTION_PROBE = """
+import asyncio, json, sys, time
+sys.path.insert(0, "scripts")
+from bench_utils import synthetic_jpeg
+image = synthetic_jpeg(1024, 768)
+
+started = time.perf_counter()
+from app.services.vision_service import vision_service
+
+async def run():
+    result = {{"import_s": time.perf_counter() - started}}
+    if {warm_up}:
+        t = time.perf_counter()
+        await vision_service.warm_up()
+        result["warm_up_s"] = time.perf_counter() - t
+    t = time.perf_counter()
+    await vision_service.predict_food(image)
+    result["first_prediction_s"] = time.perf_counter() - t
+    t = time.perf_counter()
+    await vision_service.predict_food(image)
+    result["second_prediction_s"] = time.perf_counter() - t
+    result["time_to_first_prediction_s"] = time.perf_counter() - started - result["second_prediction_s"]
+    return result
+
+print(json.dumps(asyncio.run(run())))
+"""
+
+
+def run_probe(code: str):
+    proc = subprocess.run([sys.executable, "-c", code], cwd=BACKEND_DIR, capture_output=True, text=True)
+    if proc.returncode != 0:
+        return {"error": proc.stderr.strip().splitlines()[-1] if proc.stderr else "failed"}
+    return json.loads(proc.stdout.strip().splitlines()[-1])
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Import time and time-to-first-prediction, each in a fresh process.")
+    parser.add_argument("--runs", type=int, default=3)
+    args = parser.parse_args()
+
+    report = {}
+    for module in ("app.main", "app.services.vision_service"):
+        runs = [run_probe(IMPORT_PROBE.format(module=module)) for _ in range(args.runs)]
+        ok = [r["seconds"] for r in runs if "seconds" in r]
+        report[f"import {module}"] = min(ok) if ok else runs[0]["error"]
+
+    for label, warm_up in (("lazy (first request loads)", False), ("warm-up then predict", True)):
+        runs = [run_probe(PREDICTION_PROBE.format(warm_up=warm_up)) for _ in range(args.runs)]
+        report[label] = runs[0] if "error" in runs[0] else {
+            key: min(r[key] for r in runs) for key in runs[0]
+        }
+
+    print(json.dumps(report, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,97 @@
+import os
+import sys
+import json
+import argparse
+from pathlib import Path
+
+import torch
+from torch.utils.data import DataLoader, Subset
+
+# Add backend to path so we can import app modules
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from app.models.food_classifier import FoodClassifier, get_transforms
+from app.models.food_dataset import DATA_ROOT, ImageListDataset, list_food101_split
+from app.models.quantization import build_quantizable_classifier, quantize_static, save_quantized_model
+from app.models.weights import load_state_dict_file, resolve_weights_path
+from bench_utils import evaluate, measure_latency
+
+WEIGHTS_PATH = Path("app/models/food_classifier_finetuned.safetensors")
+CLASS_MAP_PATH = Path("app/models/food_classifier_finetuned.json")
+OUTPUT_PATH = Path("app/models/food_classifier_int8.pt")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Post-training static INT8 quantization of the food classifier.")
+    parser.add_argument("--weights", type=Path, default=WEIGHTS_PATH)
+    parser.add_argument("--output", type=Path, default=OUTPUT_PATH)
+    parser.add_argument("--data-root", type=Path, default=DATA_ROOT)
+    parser.add_argument("--calibration-images", type=int, default=512)
+    parser.add_argument("--eval-images", type=int, default=2000)
+    parser.add_argument("--batch-size", type=int, default=32)
+    parser.add_argument("--engine", default="fbgemm", help="fbgemm (x86) or qnnpack (ARM)")
+    parser.add_argument("--max-top1-drop", type=float, default=0.01,
+                        help="Accuracy budget: largest acceptable top-1 drop vs fp32 (absolute)")
+    args = parser.parse_args()
+
+    # Quantized kernels are CPU-only; keep the fp32 comparison on CPU too
+    torch.set_num_threads(os.cpu_count() or 1)
+
+    with open(CLASS_MAP_PATH) as f:
+        classes = json.load(f)
+
+    weights_path = resolve_weights_path(args.weights)
+    print(f"Loading fp32 weights from {weights_path}...")
+    state_dict, _ = load_state_dict_file(weights_path)
+    fp32_model = FoodClassifier(num_classes=len(classes), pretrained=False)
+    fp32_model.load_state_dict(state_dict)
+    fp32_model.eval()
+
+    transform = get_transforms(is_training=False)
+    train_samples = list_food101_split(args.data_root, "train", classes)
+    test_samples = list_food101_split(args.data_root, "test", classes)
+
+    # Calibrate on a class-mixed subset of the training split
+    generator = torch.Generator().manual_seed(0)
+    calib_idx = torch.randperm(len(train_samples), generator=generator)[:args.calibration_images].tolist()
+    eval_idx = torch.randperm(len(test_samples), generator=generator)[:args.eval_images].tolist()
+    calib_loader = DataLoader(Subset(ImageListDataset(train_samples, transform), calib_idx),
+                              batch_size=args.batch_size, num_workers=2)
+    eval_loader = DataLoader(Subset(ImageListDataset(test_samples, transform), eval_idx),
+                             batch_size=args.batch_size, num_workers=2)
+
+    print(f"Calibrating on {len(calib_idx)} training images (engine: {args.engine})...")
+    int8_model = build_quantizable_classifier(state_dict, num_classes=len(classes))
+    quantize_static(int8_model, (inputs for inputs, _ in calib_loader), engine=args.engine)
+    save_quantized_model(int8_model, str(args.output))
+    print(f"Saved INT8 model to {args.output} ({args.output.stat().st_size / 1e6:.1f} MB)")
+
+    print(f"\nEvaluating parity on {len(eval_idx)} test images...")
+    fp32_preds, fp32_top1, fp32_top3 = evaluate(fp32_model, eval_loader)
+    int8_preds, int8_top1, int8_top3 = evaluate(int8_model, eval_loader)
+    agreement = (fp32_preds == int8_preds).float().mean().item()
+
+    fp32_ms = measure_latency(fp32_model)
+    int8_ms = measure_latency(int8_model)
+    top1_drop = fp32_top1 - int8_top1
+
+    print("\n" + "=" * 52)
+    print("INT8 PARITY REPORT")
+    print("=" * 52)
+    print(f"{'':<10}{'Top-1':>10}{'Top-3':>10}{'Latency (ms)':>16}")
+    print(f"{'fp32':<10}{fp32_top1:>10.2%}{fp32_top3:>10.2%}{fp32_ms:>16.1f}")
+    print(f"{'int8':<10}{int8_top1:>10.2%}{int8_top3:>10.2%}{int8_ms:>16.1f}")
+    print("-" * 52)
+    print(f"Top-1 agreement:  {agreement:.2%}")
+    print(f"Top-1 drop:       {top1_drop:.2%} (budget {args.max_top1_drop:.2%})")
+    print(f"Speedup:          {fp32_ms / int8_ms:.2f}x")
+    print("=" * 52)
+
+    if top1_drop > args.max_top1_drop:
+        print("FAIL: INT8 accuracy loss exceeds budget. Keep VISION_BACKEND=fp32.")
+        sys.exit(1)
+    print("PASS: INT8 model is within budget. Enable with VISION_BACKEND=int8.")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,200 @@
+import os
+import sys
+import json
+import time
+import socket
+import asyncio
+import argparse
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import httpx
+
+# Add backend to path so we can import app modules
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from app.services.upstream import UpstreamClient, CircuitOpen
+
+FOODS = {"foods": [{"description": "Pizza, cheese", "foodNutrients": [{"nutrientId": 1008, "value": 266.0}]}]}
+
+
+class StandIn:
+    """Behaviour of the local stand-in for the USDA API, switched per scenario."""
+    mode = "ok"          # ok | flaky (every other request 503) | slow | down (always 500)
+    delay = 0.0
+    requests = 0
+    connections = 0
+    active = 0
+    max_active = 0
+    lock = threading.Lock()
+
+    @classmethod
+    def reset(cls, mode="ok", delay=0.0):
+        with cls.lock:
+            cls.mode, cls.delay = mode, delay
+            cls.requests = cls.connections = cls.active = cls.max_active = 0
+
+
+class Handler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"  # keep-alive
+
+    def setup(self):
+        super().setup()
+        # Headers and body go out in separate writes; don't let Nagle hold the body back on keep-alive
+        self.request.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+        with StandIn.lock:
+            StandIn.connections += 1
+
+    def do_GET(self):
+        with StandIn.lock:
+            StandIn.requests += 1
+            StandIn.active += 1
+            StandIn.max_active = max(StandIn.max_active, StandIn.active)
+            n = StandIn.requests
+        try:
+            if StandIn.delay:
+                time.sleep(StandIn.delay)
+            if StandIn.mode == "down" or (StandIn.mode == "flaky" and n % 2 == 1):
+                self._send(500 if StandIn.mode == "down" else 503, {"error": "unavailable"})
+            else:
+                self._send(200, FOODS)
+        finally:
+            with StandIn.lock:
+                StandIn.active -= 1
+
+    def _send(self, status, payload):
+        body = json.dumps(payload).encode()
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        try:
+            self.end_headers()
+            self.wfile.write(body)
+        except (BrokenPipeError, ConnectionResetError):
+            pass  # client gave up (timeout scenario)
+
+    def log_message(self, *args):
+        pass
+
+
+def make_client(base_url, **kwargs):
+    options = dict(timeout=2.0, retries=2, backoff_seconds=0.01, breaker_failures=5, breaker_reset_seconds=30.0)
+    options.update(kwargs)
+    return UpstreamClient("standin", base_url=base_url, **options)
+
+
+async def scenario_pooling(base_url, n):
+    """Sequential calls: a new AsyncClient per call (old behaviour) vs one pooled client."""
+    StandIn.reset()
+    start = time.perf_counter()
+    for _ in range(n):
+        async with httpx.AsyncClient() as client:
+            (await client.get(f"{base_url}/foods/search", params={"query": "pizza"})).raise_for_status()
+    per_call_ms = (time.perf_counter() - start) * 1000.0 / n
+    per_call_conns = StandIn.connections
+
+    StandIn.reset()
+    upstream = make_client(base_url)
+    start = time.perf_counter()
+    for _ in range(n):
+        (await upstream.get("/foods/search", params={"query": "pizza"})).raise_for_status()
+    pooled_ms = (time.perf_counter() - start) * 1000.0 / n
+    await upstream.aclose()
+
+    print(f"pooling:     client per call {per_call_ms:.2f} ms/req, {per_call_conns} connections | "
+          f"pooled {pooled_ms:.2f} ms/req, {StandIn.connections} connection(s)")
+    return StandIn.connections == 1
+
+
+async def scenario_retries(base_url, n):
+    """Every other upstream request fails with 503; jittered retries hide it from callers."""
+    StandIn.reset("flaky")
+    upstream = make_client(base_url)
+    ok = 0
+    for _ in range(n):
+        response = await upstream.get("/foods/search")
+        ok += response.status_code == 200
+    await upstream.aclose()
+    print(f"retries:     {ok}/{n} succeeded, {upstream.retried} retries, {StandIn.requests} upstream requests")
+    return ok == n
+
+
+async def scenario_timeout(base_url):
+    """Upstream slower than the client timeout: fails after (retries + 1) * timeout, not never."""
+    StandIn.reset("slow", delay=1.0)
+    upstream = make_client(base_url, timeout=0.2, retries=1)
+    start = time.perf_counter()
+    try:
+        await upstream.get("/foods/search")
+        timed_out = False
+    except httpx.TimeoutException:
+        timed_out = True
+    elapsed = time.perf_counter() - start
+    await upstream.aclose()
+    print(f"timeout:     timed out={timed_out} after {elapsed:.2f} s (2 attempts x 0.2 s)")
+    return timed_out and elapsed < 1.0
+
+
+async def scenario_breaker(base_url, n):
+    """Upstream down: after 5 failed requests the circuit opens and calls fail in microseconds."""
+    StandIn.reset("down")
+    upstream = make_client(base_url)
+    rejected, rejected_ms = 0, []
+    for _ in range(n):
+        start = time.perf_counter()
+        try:
+            await upstream.get("/foods/search")
+        except CircuitOpen:
+            rejected += 1
+            rejected_ms.append((time.perf_counter() - start) * 1000.0)
+        except httpx.HTTPStatusError:
+            pass
+    reached = StandIn.requests
+    await upstream.aclose()
+    mean = sum(rejected_ms) / len(rejected_ms) if rejected_ms else 0.0
+    print(f"breaker:     {rejected}/{n} calls rejected by the open circuit ({mean:.3f} ms each), "
+          f"{reached} upstream requests, circuit {upstream.breaker.state}")
+    return rejected == n - 5
+
+
+async def scenario_concurrency(base_url, n, limit):
+    """n concurrent callers against a slow upstream never exceed `limit` requests in flight."""
+    StandIn.reset("ok", delay=0.05)
+    upstream = make_client(base_url, max_concurrency=limit, max_connections=limit)
+    await asyncio.gather(*(upstream.get("/foods/search") for _ in range(n)))
+    await upstream.aclose()
+    print(f"concurrency: {n} callers, limit {limit}, max in flight at upstream {StandIn.max_active}, "
+          f"{StandIn.connections} connections")
+    return StandIn.max_active <= limit
+
+
+async def run(base_url, n):
+    return {
+        "pooling": await scenario_pooling(base_url, n),
+        "retries": await scenario_retries(base_url, n),
+        "timeout": await scenario_timeout(base_url),
+        "breaker": await scenario_breaker(base_url, 20),
+        "concurrency": await scenario_concurrency(base_url, n, 4),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Exercise UpstreamClient against a local stand-in HTTP server.")
+    parser.add_argument("--requests", type=int, default=50)
+    args = parser.parse_args()
+
+    server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    base_url = f"http://127.0.0.1:{server.server_address[1]}"
+    try:
+        results = asyncio.run(run(base_url, args.requests))
+    finally:
+        server.shutdown()
+
+    failed = [name for name, passed in results.items() if not passed]
+    print("\nAll scenarios passed" if not failed else f"\nFAILED: {', '.join(failed)}")
+    sys.exit(1 if failed else 0)
+
+
+if __name__ == "__main__":
+    main()
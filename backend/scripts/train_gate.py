@@ -0,0 +1,143 @@
+import os
+import sys
+import json
+import random
+import argparse
+from pathlib import Path
+
+import torch
+import torch.nn as nn
+from torch.utils.data import DataLoader
+from tqdm import tqdm
+
+# Add backend to path so we can import app modules
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from app.core.config import settings
+from app.models.food_classifier import FoodClassifier
+from app.models.food_dataset import DATA_ROOT, ImageListDataset, list_food101_split
+from app.models.preprocessing import preprocess_image
+from app.models.weights import load_state_dict_file, resolve_weights_path, save_weights
+
+CLASS_MAP_PATH = Path("app/models/food_classifier_finetuned.json")
+IMAGE_SUFFIXES = {".jpg", ".jpeg", ".png", ".webp"}
+
+
+def extract_features(model, samples, batch_size, num_workers):
+    """Pooled backbone features for every sample, computed once and reused for all head epochs."""
+    loader = DataLoader(ImageListDataset(samples, preprocess_image), batch_size=batch_size, num_workers=num_workers)
+    features, labels = [], []
+    with torch.no_grad():
+        for inputs, targets in tqdm(loader, desc="Extracting features"):
+            features.append(model.extract_features(inputs))
+            labels.append(targets)
+    return torch.cat(features), torch.cat(labels)
+
+
+def gate_metrics(gate, features, labels, threshold):
+    with torch.no_grad():
+        food_prob = torch.softmax(gate(features), dim=1)[:, 1]
+    predicted_food = food_prob >= threshold
+    is_food = labels == 1
+
+    tp = (predicted_food & is_food).sum().item()
+    fp = (predicted_food & ~is_food).sum().item()
+    fn = (~predicted_food & is_food).sum().item()
+    tn = (~predicted_food & ~is_food).sum().item()
+    precision = tp / (tp + fp) if tp + fp else 0.0
+    recall = tp / (tp + fn) if tp + fn else 0.0
+    return {
+        "precision": precision,
+        "recall": recall,
+        "f1": 2 * precision * recall / (precision + recall) if precision + recall else 0.0,
+        "non_food_rejection": tn / (tn + fp) if tn + fp else 0.0,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Train/evaluate the food/non-food gate head on FoodClassifier features.")
+    parser.add_argument("--non-food-dir", type=Path,
+                        help="Folder of non-food training images (e.g. Food-5K training/non_food), searched recursively")
+    parser.add_argument("--non-food-eval-dir", type=Path,
+                        help="Held-out non-food images for --eval-only (e.g. Food-5K evaluation/non_food); "
+                             "must not overlap --non-food-dir")
+    parser.add_argument("--data-root", type=Path, default=DATA_ROOT)
+    parser.add_argument("--weights", type=Path, default=Path(settings.VISION_MODEL_PATH))
+    parser.add_argument("--output", type=Path, default=Path(settings.VISION_GATE_PATH))
+    parser.add_argument("--food-images", type=int, default=5000, help="Food-101 images sampled as positives")
+    parser.add_argument("--epochs", type=int, default=50)
+    parser.add_argument("--batch-size", type=int, default=64)
+    parser.add_argument("--num-workers", type=int, default=4)
+    parser.add_argument("--threshold", type=float, default=settings.VISION_GATE_THRESHOLD)
+    parser.add_argument("--eval-only", action="store_true", help="Report precision/recall of the existing head")
+    args = parser.parse_args()
+
+    # The 80/20 split below only exists while training, so evaluating the saved head
+    # needs non-food images it never saw (Food-101 "test" covers the food side)
+    non_food_dir = args.non_food_eval_dir if args.eval_only else args.non_food_dir
+    if non_food_dir is None:
+        parser.error("--eval-only needs --non-food-eval-dir" if args.eval_only else "--non-food-dir is required")
+    if args.eval_only and args.non_food_dir is not None and args.non_food_dir.resolve() == non_food_dir.resolve():
+        parser.error("--non-food-eval-dir must be a different folder from the training --non-food-dir")
+
+    with open(CLASS_MAP_PATH) as f:
+        classes = json.load(f)
+
+    model = FoodClassifier(num_classes=len(classes), pretrained=False, with_gate=True)
+    state_dict, _ = load_state_dict_file(resolve_weights_path(args.weights))
+    model.backbone.load_state_dict({k.removeprefix("backbone."): v for k, v in state_dict.items()})
+    model.eval()
+
+    rng = random.Random(42)
+    food = list_food101_split(args.data_root, "test" if args.eval_only else "train", classes)
+    food = [(path, 1) for path, _ in rng.sample(food, min(args.food_images, len(food)))]
+    non_food = [(str(p), 0) for p in sorted(non_food_dir.rglob("*")) if p.suffix.lower() in IMAGE_SUFFIXES]
+    print(f"Samples: {len(food)} food, {len(non_food)} non-food")
+
+    features, labels = extract_features(model, food + non_food, args.batch_size, args.num_workers)
+
+    if args.eval_only:
+        gate_state, _ = load_state_dict_file(resolve_weights_path(args.output))
+        model.gate.load_state_dict(gate_state)
+        val_features, val_labels = features, labels
+    else:
+        perm = torch.randperm(len(labels), generator=torch.Generator().manual_seed(0))
+        split = int(0.8 * len(perm))
+        train_idx, val_idx = perm[:split], perm[split:]
+        train_features, train_labels = features[train_idx], labels[train_idx]
+        val_features, val_labels = features[val_idx], labels[val_idx]
+
+        # Non-food is the minority class; weight it so recall isn't bought with false accepts
+        counts = torch.bincount(train_labels, minlength=2).clamp(min=1).float()
+        criterion = nn.CrossEntropyLoss(weight=counts.sum() / (2 * counts))
+        optimizer = torch.optim.AdamW(model.gate.parameters(), lr=1e-3, weight_decay=1e-4)
+
+        for epoch in range(args.epochs):
+            order = torch.randperm(len(train_labels))
+            for start in range(0, len(order), args.batch_size):
+                idx = order[start:start + args.batch_size]
+                optimizer.zero_grad()
+                loss = criterion(model.gate(train_features[idx]), train_labels[idx])
+                loss.backward()
+                optimizer.step()
+            if (epoch + 1) % 10 == 0:
+                m = gate_metrics(model.gate, val_features, val_labels, args.threshold)
+                print(f"Epoch {epoch+1}/{args.epochs} loss {loss.item():.4f} "
+                      f"val precision {m['precision']:.4f} recall {m['recall']:.4f}")
+
+        save_weights(model.gate.state_dict(), args.output)
+        print(f"Saved gate head to {args.output}")
+
+    metrics = gate_metrics(model.gate, val_features, val_labels, args.threshold)
+    print("\n" + "=" * 30)
+    print(f"GATE RESULTS (threshold {args.threshold})")
+    print("=" * 30)
+    print(f"Food Precision:     {metrics['precision']:.2%}")
+    print(f"Food Recall:        {metrics['recall']:.2%}")
+    print(f"F1:                 {metrics['f1']:.2%}")
+    print(f"Non-Food Rejected:  {metrics['non_food_rejection']:.2%}")
+    print("=" * 30)
+
+
+if __name__ == "__main__":
+    main()
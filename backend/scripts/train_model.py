@@ -1,5 +1,10 @@
 import os
 import sys
+import json
+import time
+import random
+import argparse
+import numpy as np
 import torch
 import torch.nn as nn
 import torch.optim as optim
@@ -11,27 +16,26 @@ from pathlib import Path
 # Add backend to path
 sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
 
-from app.models.food_classifier import FoodClassifier, get_transforms
+from app.models.food_classifier import COMPACT_ARCHS, build_classifier, get_transforms
+from app.models.food_dataset import MemmapFoodDataset
+from app.models.weights import save_weights
 
 # Config
 DATA_DIR = Path("data/food-101/images")
-MODEL_SAVE_PATH = Path("app/models/food_classifier_finetuned.pth")
+MODEL_SAVE_PATH = Path("app/models/food_classifier_finetuned.safetensors")
+CHECKPOINT_PATH = Path("checkpoints/train_last.pt")
 BATCH_SIZE = 32
 NUM_EPOCHS = 5 # Start small for demo/testing
 LEARNING_RATE = 0.001
 NUM_CLASSES = 101
 
-def train():
-    print(f"Checking device...")
-    device = torch.device("cuda" if torch.cuda.is_available() else "mps" if torch.backends.mps.is_available() else "cpu")
-    print(f"Using device: {device}")
-
-    if not DATA_DIR.exists():
-        print(f"Error: Dataset not found at {DATA_DIR}")
-        return
+def load_datasets(cache_dir: Path = None):
+    """(train, val, class names). Reads the pre-decoded cache when given, else decodes JPEGs via ImageFolder."""
+    if cache_dir is not None:
+        train_dataset = MemmapFoodDataset(cache_dir, "train", train=True)
+        val_dataset = MemmapFoodDataset(cache_dir, "test", train=False)
+        return train_dataset, val_dataset, train_dataset.classes
 
-    # 1. Prepare Data
-    print("Loading dataset...")
     # Use training transforms for both for now, or Split first then apply transforms?
     # ImageFolder applies same transform to all. 
     # For simplicity in this script, we'll use the training transform (with augmentation) for train
@@ -51,47 +55,147 @@ def train():
     train_size = int(0.8 * total_size)
     val_size = total_size - train_size
     
-    train_dataset, val_dataset = random_split(full_dataset, [train_size, val_size])
+    # Fixed seed so a resumed run validates on the same images
+    train_dataset, val_dataset = random_split(full_dataset, [train_size, val_size],
+                                              generator=torch.Generator().manual_seed(42))
+    return train_dataset, val_dataset, full_dataset.classes
+
+def head_parameters(model: nn.Module):
+    """The classification layer that replaces the ImageNet head (fc for ResNets, classifier[-1] otherwise)."""
+    backbone = model.backbone
+    head = backbone.fc if hasattr(backbone, "fc") else backbone.classifier[-1]
+    return list(head.parameters())
+
+def set_backbone_frozen(model: nn.Module, frozen: bool):
+    head = {id(p) for p in head_parameters(model)}
+    for param in model.parameters():
+        if id(param) not in head:
+            param.requires_grad = not frozen
+
+def save_checkpoint(path: Path, state: dict):
+    # Written to a temp file first so a crash mid-save never corrupts the last good checkpoint
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp_path = path.with_name(path.name + ".tmp")
+    torch.save(state, tmp_path)
+    os.replace(tmp_path, path)
+
+def rng_state() -> dict:
+    return {
+        "python": random.getstate(),
+        "numpy": np.random.get_state(),
+        "torch": torch.get_rng_state(),
+        "cuda": torch.cuda.get_rng_state_all() if torch.cuda.is_available() else [],
+    }
+
+def restore_rng_state(state: dict):
+    random.setstate(state["python"])
+    np.random.set_state(state["numpy"])
+    torch.set_rng_state(state["torch"])
+    if state["cuda"] and torch.cuda.is_available():
+        torch.cuda.set_rng_state_all(state["cuda"])
+
+def train(args):
+    print(f"Checking device...")
+    device = torch.device("cuda" if torch.cuda.is_available() else "mps" if torch.backends.mps.is_available() else "cpu")
+    print(f"Using device: {device}")
+
+    source = args.cache_dir / "meta.json" if args.cache_dir is not None else DATA_DIR
+    if not source.exists():
+        print(f"Error: Dataset not found at {source}")
+        return
+
+    # 1. Prepare Data
+    print(f"Loading dataset from {source}...")
+    train_dataset, val_dataset, classes = load_datasets(args.cache_dir)
+    train_size = len(train_dataset)
+    val_size = len(val_dataset)
     
-    train_loader = DataLoader(train_dataset, batch_size=BATCH_SIZE, shuffle=True, num_workers=2)
-    val_loader = DataLoader(val_dataset, batch_size=BATCH_SIZE, shuffle=False, num_workers=2)
+    train_loader = DataLoader(train_dataset, batch_size=args.batch_size, shuffle=True, num_workers=args.num_workers,
+                              persistent_workers=args.num_workers > 0)
+    val_loader = DataLoader(val_dataset, batch_size=args.batch_size, shuffle=False, num_workers=args.num_workers)
     
     print(f"Data loaded: {train_size} training, {val_size} validation samples.")
-    print(f"Classes: {len(full_dataset.classes)}")
+    print(f"Classes: {len(classes)}")
 
     # 2. Setup Model
-    print("Initializing model...")
-    model = FoodClassifier(num_classes=NUM_CLASSES, pretrained=True)
+    resuming = args.resume and args.checkpoint.exists()
+    if args.resume and not resuming:
+        print(f"No checkpoint at {args.checkpoint}; starting from scratch.")
+    print(f"Initializing {args.arch} model...")
+    # ImageNet weights are only needed for a fresh run; a checkpoint overwrites them
+    model = build_classifier(args.arch, num_classes=NUM_CLASSES, pretrained=not resuming)
     model = model.to(device)
+    # NHWC lets oneDNN pick its fast convolution kernels on CPU without per-layer reorders
+    memory_format = torch.channels_last if args.channels_last else torch.contiguous_format
+    model = model.to(memory_format=memory_format)
+
+    use_bf16 = args.bf16 and device.type in ("cpu", "cuda")
+    if args.bf16 and not use_bf16:
+        print(f"WARNING: bf16 autocast is not supported on {device.type}; training in fp32.")
     
     criterion = nn.CrossEntropyLoss()
-    # Optimize only the head first? Or all? 
-    # ResNet50 is deep. Let's optimize all but with low LR.
-    optimizer = optim.AdamW(model.parameters(), lr=LEARNING_RATE)
+    # ResNet50 is deep. Optimize all but with low LR (frozen params just get no gradients).
+    optimizer = optim.AdamW(model.parameters(), lr=args.lr)
+    # One-cycle: ~10% warm-up then cosine decay, stepped once per optimizer step
+    steps_per_epoch = max(1, len(train_loader) // args.accum_steps)
+    total_steps = steps_per_epoch * args.epochs
+    scheduler = optim.lr_scheduler.OneCycleLR(optimizer, max_lr=args.lr, total_steps=total_steps,
+                                              pct_start=min(0.5, max(0.1, 2 / total_steps)))
     
     # 3. Training Loop
     best_acc = 0.0
+    start_epoch = 0
+    train_seconds = 0.0
+    time_to_target = None
+    history = []
+
+    if resuming:
+        print(f"Resuming from {args.checkpoint}...")
+        checkpoint = torch.load(args.checkpoint, map_location=device, weights_only=False)
+        model.load_state_dict(checkpoint["model"])
+        optimizer.load_state_dict(checkpoint["optimizer"])
+        scheduler.load_state_dict(checkpoint["scheduler"])
+        restore_rng_state(checkpoint["rng"])
+        start_epoch = checkpoint["epoch"] + 1
+        best_acc = checkpoint["best_acc"]
+        train_seconds = checkpoint["train_seconds"]
+        time_to_target = checkpoint["time_to_target"]
+        history = checkpoint["history"]
     
-    for epoch in range(NUM_EPOCHS):
-        print(f"\nEpoch {epoch+1}/{NUM_EPOCHS}")
+    for epoch in range(start_epoch, args.epochs):
+        frozen = epoch < args.freeze_epochs
+        print(f"\nEpoch {epoch+1}/{args.epochs}" + (" (backbone frozen)" if frozen else ""))
         print("-" * 10)
+        set_backbone_frozen(model, frozen)
         
         # Train
+        epoch_start = time.perf_counter()
         model.train()
+        if frozen:
+            # Keep the pretrained BatchNorm statistics while only the head learns
+            for module in model.modules():
+                if isinstance(module, nn.modules.batchnorm._BatchNorm):
+                    module.eval()
         running_loss = 0.0
         correct = 0
         total = 0
+        optimizer.zero_grad()
         
         progress_bar = tqdm(train_loader, desc="Training")
-        for inputs, labels in progress_bar:
-            inputs, labels = inputs.to(device), labels.to(device)
-            
-            optimizer.zero_grad()
+        for step, (inputs, labels) in enumerate(progress_bar):
+            inputs = inputs.to(device, memory_format=memory_format)
+            labels = labels.to(device)
             
-            outputs = model(inputs)
-            loss = criterion(outputs, labels)
-            loss.backward()
-            optimizer.step()
+            with torch.autocast(device_type=device.type, dtype=torch.bfloat16, enabled=use_bf16):
+                outputs = model(inputs)
+                loss = criterion(outputs, labels)
+            # Gradients add up over accum_steps micro-batches before each optimizer step
+            (loss / args.accum_steps).backward()
+            if (step + 1) % args.accum_steps == 0:
+                optimizer.step()
+                optimizer.zero_grad()
+                if scheduler.last_epoch < scheduler.total_steps:
+                    scheduler.step()
             
             running_loss += loss.item() * inputs.size(0)
             _, predicted = torch.max(outputs, 1)
@@ -100,9 +204,12 @@ def train():
             
             progress_bar.set_postfix(loss=loss.item())
             
+        epoch_seconds = time.perf_counter() - epoch_start
+        train_seconds += epoch_seconds
         epoch_loss = running_loss / train_size
         epoch_acc = correct / total
-        print(f"Train Loss: {epoch_loss:.4f} Acc: {epoch_acc:.4f}")
+        print(f"Train Loss: {epoch_loss:.4f} Acc: {epoch_acc:.4f} "
+              f"({epoch_seconds:.0f} s, {total / epoch_seconds:.1f} samples/s)")
         
         # Validate
         model.eval()
@@ -110,9 +217,10 @@ def train():
         val_correct = 0
         val_total = 0
         
-        with torch.no_grad():
+        with torch.no_grad(), torch.autocast(device_type=device.type, dtype=torch.bfloat16, enabled=use_bf16):
             for inputs, labels in tqdm(val_loader, desc="Validation"):
-                inputs, labels = inputs.to(device), labels.to(device)
+                inputs = inputs.to(device, memory_format=memory_format)
+                labels = labels.to(device)
                 
                 outputs = model(inputs)
                 loss = criterion(outputs, labels)
@@ -125,22 +233,84 @@ def train():
         val_loss = val_loss / val_size
         val_acc = val_correct / val_total
         print(f"Val Loss: {val_loss:.4f} Acc: {val_acc:.4f}")
+
+        if args.target_acc and time_to_target is None and val_acc >= args.target_acc:
+            time_to_target = train_seconds
+            print(f"Reached target accuracy {args.target_acc:.2%} after {train_seconds / 60:.1f} min of training")
         
         # Save Best
         if val_acc > best_acc:
-            print(f"New best model! Saving to {MODEL_SAVE_PATH}")
+            print(f"New best model! Saving to {args.output}")
             best_acc = val_acc
-            torch.save(model.state_dict(), MODEL_SAVE_PATH)
-            
-            # Also save class names mapping
-            # full_dataset.classes gives us ['apple_pie', 'baby_back_ribs', ...]
+            # Pickle-free, memory-mappable weights with the class order embedded.
+            # classes is ['apple_pie', 'baby_back_ribs', ...]
             # We need to save this because the index depends on folder sort order
-            import json
-            class_map_path = MODEL_SAVE_PATH.with_suffix('.json')
+            save_weights(model.state_dict(), args.output, {"arch": args.arch, "classes": json.dumps(classes)})
+            
+            # Also keep the JSON class map for tooling that reads it directly
+            class_map_path = args.output.with_suffix('.json')
             with open(class_map_path, 'w') as f:
-                json.dump(full_dataset.classes, f)
+                json.dump(classes, f)
+
+        history.append({
+            "epoch": epoch + 1,
+            "frozen": frozen,
+            "train_loss": epoch_loss,
+            "val_acc": val_acc,
+            "epoch_seconds": epoch_seconds,
+            "samples_per_sec": total / epoch_seconds,
+            "lr": scheduler.get_last_lr()[0],
+        })
+        # Full state after every epoch, so a crash costs at most one epoch
+        save_checkpoint(args.checkpoint, {
+            "model": model.state_dict(),
+            "optimizer": optimizer.state_dict(),
+            "scheduler": scheduler.state_dict(),
+            "rng": rng_state(),
+            "epoch": epoch,
+            "best_acc": best_acc,
+            "train_seconds": train_seconds,
+            "time_to_target": time_to_target,
+            "history": history,
+            "config": {k: str(v) for k, v in vars(args).items()},
+        })
                 
     print(f"\nTraining Complete. Best Validation Accuracy: {best_acc:.4f}")
+    print(f"Training time: {train_seconds / 60:.1f} min"
+          + (f", time to {args.target_acc:.2%}: {time_to_target / 60:.1f} min" if time_to_target is not None else ""))
+    if args.log:
+        with open(args.log, "w") as f:
+            json.dump({"config": {k: str(v) for k, v in vars(args).items()}, "best_acc": best_acc,
+                       "train_seconds": train_seconds, "time_to_target_seconds": time_to_target,
+                       "epochs": history}, f, indent=2)
 
 if __name__ == "__main__":
-    train()
+    parser = argparse.ArgumentParser(description="Fine-tune a food classifier on Food-101.")
+    parser.add_argument("--arch", default="resnet50", choices=["resnet50", *COMPACT_ARCHS],
+                        help="resnet50 is the serving model; smaller archs feed the cascade (VISION_CASCADE_MODEL_PATH)")
+    parser.add_argument("--output", type=Path, default=MODEL_SAVE_PATH)
+    parser.add_argument("--cache-dir", type=Path, default=None,
+                        help="Pre-decoded cache from build_training_cache.py (skips JPEG decoding every epoch)")
+    parser.add_argument("--num-workers", type=int, default=2)
+    parser.add_argument("--epochs", type=int, default=NUM_EPOCHS)
+    parser.add_argument("--batch-size", type=int, default=BATCH_SIZE)
+    parser.add_argument("--lr", type=float, default=LEARNING_RATE, help="Peak learning rate of the one-cycle schedule")
+    parser.add_argument("--accum-steps", type=int, default=1,
+                        help="Micro-batches per optimizer step (effective batch = batch-size x accum-steps)")
+    parser.add_argument("--freeze-epochs", type=int, default=0, help="Train only the head for this many epochs first")
+
+    cpu = parser.add_argument_group("CPU training")
+    cpu.add_argument("--bf16", action="store_true", help="bfloat16 autocast (fast on CPUs with AVX512-BF16/AMX)")
+    cpu.add_argument("--channels-last", action="store_true", help="NHWC memory format for convolutions")
+    cpu.add_argument("--threads", type=int, default=0, help="torch intra-op threads (0 = torch default)")
+
+    parser.add_argument("--checkpoint", type=Path, default=CHECKPOINT_PATH,
+                        help="Full training state, rewritten after every epoch")
+    parser.add_argument("--resume", action="store_true", help="Continue from --checkpoint")
+    parser.add_argument("--target-acc", type=float, default=None, help="Log wall-clock time to reach this val accuracy")
+    parser.add_argument("--log", type=Path, default=None, help="Write per-epoch metrics as JSON for comparing configs")
+    args = parser.parse_args()
+
+    if args.threads:
+        torch.set_num_threads(args.threads)
+    train(args)
@@ -0,0 +1,33 @@
+import os
+import sys
+import tempfile
+
+# Add backend to path so we can import app modules
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+# Throwaway database, memory-only caches and the local fake LLM, so the suite
+# runs without network access and never touches nutrivision.db or data/
+os.environ["DATABASE_URL"] = f"sqlite:///{tempfile.mkdtemp()}/test.db"
+os.environ["ADVICE_CACHE_PATH"] = ""
+os.environ["NUTRITION_CACHE_PATH"] = ""
+os.environ["LLM_BACKEND"] = "fake"
+
+import pytest
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+
+
+@pytest.fixture
+def session_factory(tmp_path):
+    """
+    Sessions on a fresh SQLite database with every table. A file rather than
+    ":memory:", which is a single connection that concurrent sessions in
+    worker threads would share (interleaving their transactions).
+    """
+    from app.db.base import Base
+    import app.models.user, app.models.meal, app.models.chat  # noqa: F401 (register the tables)
+
+    engine = create_engine(f"sqlite:///{tmp_path}/test.db", connect_args={"check_same_thread": False})
+    Base.metadata.create_all(bind=engine)
+    yield sessionmaker(autocommit=False, autoflush=False, bind=engine)
+    engine.dispose()
@@ -0,0 +1,70 @@
+import asyncio
+import threading
+
+from app.models.meal import Meal
+from app.services import cache as cache_module
+from app.services.advice_cache import AdviceCache, advice_key
+from app.services.llm_service import advice_inputs
+
+PROFILE = {"goal": "lose weight", "preferences": "low carb", "language": "en"}
+CANDIDATES = [
+    {"food": "Pizza", "class": "pizza", "confidence": 0.6},
+    {"food": "Lasagna", "class": "lasagna", "confidence": 0.3},
+    {"food": "Garlic Bread", "class": "garlic_bread", "confidence": 0.1},
+]
+
+
+def test_upload_and_saved_meal_share_advice_key():
+    # What the upload path has: the prediction, portion and nutrition merged
+    meal_data = {"food_name": "Pizza", "class": "pizza", "class_id": 76, "confidence": 0.6, "is_food": True,
+                 "candidates": CANDIDATES, "portion_size": "1 slice", "weight_g": 107,
+                 "calories": 285.0, "protein": 12.0, "carbs": 36.0, "fats": 10.0}
+    saved = Meal(food_name="Pizza", portion_size="1 slice", calories=285.0, protein=12.0, carbs=36.0, fats=10.0,
+                 confidence=0.6, candidates=CANDIDATES)
+    assert advice_inputs(meal_data) == advice_inputs(saved)
+    assert advice_key(advice_inputs(meal_data), PROFILE) == advice_key(advice_inputs(saved), PROFILE)
+
+
+def test_new_variants_keep_the_pool_expiry(monkeypatch):
+    now = [1000.0]
+    monkeypatch.setattr(cache_module.time, "monotonic", lambda: now[0])
+    cache = AdviceCache(variants=3, max_entries=10, ttl_seconds=100.0, path=None)
+    asyncio.run(cache.add("key", "first"))
+    now[0] += 60.0
+    asyncio.run(cache.add("key", "second"))
+    assert cache.cache.get("key") == ["first", "second"]
+    assert cache.cache.ttl_remaining("key") == 40.0
+    assert cache.stats()["keys"] == len(cache.cache) == 1
+    now[0] += 41.0
+    assert asyncio.run(cache.lookup("key")) is None
+
+
+def test_concurrent_misses_share_one_generation():
+    cache = AdviceCache(variants=1, max_entries=10, ttl_seconds=100.0, path=None)
+    calls = []
+
+    async def generate():
+        calls.append(1)
+        await asyncio.sleep(0.01)
+        return "advice"
+
+    async def run():
+        return await asyncio.gather(*[cache.get_or_generate("key", generate) for _ in range(5)])
+
+    assert asyncio.run(run()) == ["advice"] * 5
+    assert len(calls) == 1 and cache.coalesced == 4
+    assert asyncio.run(cache.lookup("key")) == "advice"
+
+
+def test_pool_is_persisted_off_the_event_loop(tmp_path):
+    path = str(tmp_path / "advice.sqlite")
+    cache = AdviceCache(variants=1, max_entries=10, ttl_seconds=100.0, path=path)
+    store, threads = cache.cache.store, []
+    get, set_ = store.get, store.set
+    store.get = lambda *args: threads.append(threading.current_thread()) or get(*args)
+    store.set = lambda *args: threads.append(threading.current_thread()) or set_(*args)
+
+    asyncio.run(cache.add("key", "advice"))
+    assert len(threads) == 2 and threading.main_thread() not in threads
+    restarted = AdviceCache(variants=1, max_entries=10, ttl_seconds=100.0, path=path)
+    assert asyncio.run(restarted.lookup("key")) == "advice"
@@ -0,0 +1,121 @@
+import asyncio
+from datetime import datetime, timedelta
+
+import pytest
+
+from app.models.meal import AnalysisJob, Meal
+from app.services import analysis_worker as worker_module
+from app.services.analysis_worker import AnalysisWorker, job_payload
+from app.services.llm_service import llm_service
+
+
+@pytest.fixture
+def db(session_factory, monkeypatch):
+    monkeypatch.setattr(worker_module, "SessionLocal", session_factory)
+    return session_factory
+
+
+def add_job(db, **job_fields):
+    with db() as session:
+        meal = Meal(user_id=1, food_name="Pizza", portion_size="1 slice", calories=285, analysis_status="pending")
+        session.add(meal)
+        session.flush()
+        job = AnalysisJob(meal_id=meal.id, user_id=1, payload=job_payload({"food_name": "Pizza"}, {"language": "en"}),
+                          **job_fields)
+        session.add(job)
+        session.commit()
+        return job.id, meal.id
+
+
+def load(db, job_id, meal_id):
+    with db() as session:
+        job, meal = session.get(AnalysisJob, job_id), session.get(Meal, meal_id)
+        return job.status, job.attempts, meal.analysis_status, meal.analysis_text
+
+
+async def until(condition, timeout=5.0):
+    deadline = asyncio.get_running_loop().time() + timeout
+    while not condition():
+        assert asyncio.get_running_loop().time() < deadline, "timed out"
+        await asyncio.sleep(0.01)
+
+
+def fake_generation(monkeypatch, *outcomes):
+    """generate_dietary_analysis returns (or raises) the given outcomes in turn."""
+    calls = iter(outcomes)
+
+    async def generate(meal_data, user_profile, strict=False, user_id=None):
+        outcome = next(calls)
+        if isinstance(outcome, BaseException):
+            raise outcome
+        if outcome is None:
+            await asyncio.Event().wait()  # hangs until cancelled
+        return outcome
+
+    monkeypatch.setattr(llm_service, "generate_dietary_analysis", generate)
+
+
+def test_failed_attempt_is_retried(db, monkeypatch):
+    fake_generation(monkeypatch, RuntimeError("quota"), "Eat more greens.")
+    job_id, meal_id = add_job(db)
+    worker = AnalysisWorker(workers=2, max_attempts=3, retry_base_seconds=0.01)
+
+    async def run():
+        await worker.start()
+        worker.enqueue(job_id)
+        await until(lambda: worker.completed == 1)
+        await worker.stop()
+
+    asyncio.run(run())
+    assert load(db, job_id, meal_id) == ("done", 2, "done", "Eat more greens.")
+    assert worker.retried == 1 and worker.failed == 0
+
+
+def test_job_fails_after_max_attempts(db, monkeypatch):
+    fake_generation(monkeypatch, RuntimeError("quota"), RuntimeError("quota"))
+    job_id, meal_id = add_job(db)
+    worker = AnalysisWorker(workers=1, max_attempts=2, retry_base_seconds=0.01)
+
+    async def run():
+        await worker.start()
+        worker.enqueue(job_id)
+        await until(lambda: worker.failed == 1)
+        await worker.stop()
+
+    asyncio.run(run())
+    assert load(db, job_id, meal_id) == ("failed", 2, "failed", None)
+
+
+def test_sweep_recovers_expired_lease(db, monkeypatch):
+    fake_generation(monkeypatch, "Eat more greens.")
+    stale = datetime.utcnow() - timedelta(seconds=600)
+    job_id, meal_id = add_job(db, status="running", attempts=1, locked_at=stale)
+    fresh_id, _ = add_job(db, status="running", attempts=1, locked_at=datetime.utcnow())
+    worker = AnalysisWorker(workers=1, lease_seconds=300, sweep_seconds=3600)
+
+    async def run():
+        await worker.start()  # the first sweep runs right away
+        await until(lambda: worker.completed == 1)
+        await worker.stop()
+
+    asyncio.run(run())
+    assert worker.recovered == 1
+    assert load(db, job_id, meal_id)[:3] == ("done", 2, "done")
+    with db() as session:
+        assert session.get(AnalysisJob, fresh_id).status == "running"
+
+
+def test_stop_hands_back_interrupted_jobs(db, monkeypatch):
+    fake_generation(monkeypatch, None)
+    job_id, meal_id = add_job(db)
+    worker = AnalysisWorker(workers=1, sweep_seconds=3600)
+
+    async def run():
+        await worker.start()
+        await until(lambda: worker._active)
+        await until(lambda: load(db, job_id, meal_id)[0] == "running")
+        await worker.stop()
+
+    asyncio.run(run())
+    status, attempts, _, _ = load(db, job_id, meal_id)
+    assert (status, attempts) == ("pending", 1)
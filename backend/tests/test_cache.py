@@ -0,0 +1,102 @@
+import asyncio
+import threading
+
+import pytest
+
+from app.services.cache import AsyncTTLCache, SQLiteCacheStore
+
+
+def test_concurrent_misses_are_computed_once():
+    cache = AsyncTTLCache("test", max_entries=10)
+    calls = []
+
+    async def compute():
+        calls.append(1)
+        await asyncio.sleep(0.01)
+        return {"value": 1}
+
+    async def run():
+        results = await asyncio.gather(*[cache.get_or_compute("key", compute) for _ in range(5)])
+        return results, await cache.get_or_compute("key", compute)
+
+    results, cached = asyncio.run(run())
+    assert results == [{"value": 1}] * 5 and cached == {"value": 1}
+    assert len(calls) == 1
+    assert (cache.misses, cache.coalesced, cache.hits) == (1, 4, 1)
+
+
+def test_errors_reach_every_waiter_and_are_not_cached():
+    cache = AsyncTTLCache("test", max_entries=10)
+    calls = []
+
+    async def failing():
+        calls.append(1)
+        await asyncio.sleep(0.01)
+        raise RuntimeError("upstream down")
+
+    async def run():
+        results = await asyncio.gather(*[cache.get_or_compute("key", failing) for _ in range(3)],
+                                       return_exceptions=True)
+        assert all(isinstance(r, RuntimeError) for r in results)
+        with pytest.raises(RuntimeError):
+            await cache.get_or_compute("key", failing)
+
+    asyncio.run(run())
+    assert len(calls) == 2 and len(cache) == 0
+
+
+def test_cancelled_caller_does_not_cancel_the_shared_computation():
+    cache = AsyncTTLCache("test", max_entries=10)
+
+    async def compute():
+        await asyncio.sleep(0.02)
+        return "done"
+
+    async def run():
+        first = asyncio.ensure_future(cache.get_or_compute("key", compute))
+        second = asyncio.ensure_future(cache.get_or_compute("key", compute))
+        await asyncio.sleep(0.005)
+        first.cancel()
+        return await second
+
+    assert asyncio.run(run()) == "done"
+    assert cache.get("key") == "done"
+
+
+def test_lru_eviction_and_store_tier(tmp_path):
+    store = SQLiteCacheStore(str(tmp_path / "cache.sqlite"))
+    cache = AsyncTTLCache("test", max_entries=2, store=store)
+
+    async def value(v):
+        return v
+
+    async def run():
+        for key in ("a", "b", "c"):
+            await cache.get_or_compute(key, lambda key=key: value(key.upper()))
+        assert cache.get("a") is None and len(cache) == 2 and cache.evictions == 1
+        # Evicted from memory, still in the persistent tier
+        return await cache.get_or_compute("a", lambda: value("recomputed"))
+
+    assert asyncio.run(run()) == "A"
+    assert cache.store_hits == 1
+
+
+def test_store_is_only_used_off_the_event_loop(tmp_path):
+    store = SQLiteCacheStore(str(tmp_path / "cache.sqlite"))
+    cache = AsyncTTLCache("test", store=store)
+    threads = []
+    get, set_ = store.get, store.set
+    store.get = lambda *args: threads.append(threading.current_thread()) or get(*args)
+    store.set = lambda *args: threads.append(threading.current_thread()) or set_(*args)
+
+    async def value():
+        await asyncio.sleep(0.01)
+        return "v"
+
+    async def run():
+        return await asyncio.gather(*[cache.get_or_compute("key", value) for _ in range(3)])
+
+    assert asyncio.run(run()) == ["v"] * 3
+    # One lookup and one write-through for the three coalesced callers
+    assert len(threads) == 2 and threading.main_thread() not in threads
+    assert cache.coalesced == 2 and store.get("key")[0] == "v"
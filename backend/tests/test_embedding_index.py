@@ -0,0 +1,30 @@
+import numpy as np
+
+from app.services.embedding_index import EmbeddingIndex
+
+
+def add(db, meal_id, vector):
+    with db() as session:
+        EmbeddingIndex.store(session, meal_id, user_id=1, version="v1", vector=vector)
+        session.commit()
+
+
+def test_sync_picks_up_rows_committed_out_of_id_order(session_factory):
+    rng = np.random.default_rng(0)
+    vectors = {meal_id: rng.standard_normal(2048) for meal_id in range(1, 6)}
+    index = EmbeddingIndex(reduced_dim=32, rescan_window=8)
+
+    for meal_id in (1, 2, 4, 5):
+        add(session_factory, meal_id, vectors[meal_id])
+    with session_factory() as session:
+        index.sync(session, "v1")
+    assert index.stats()["indexed"] == 4
+
+    # Meal 3 commits after 4 and 5 were indexed
+    add(session_factory, 3, vectors[3])
+    with session_factory() as session:
+        index.sync(session, "v1")
+        index.sync(session, "v1")
+        assert index.stats()["indexed"] == 5
+        matches = index.similar(session, 3, 1, "v1", limit=4)
+    assert sorted(meal_id for meal_id, _ in matches) == [1, 2, 4, 5]
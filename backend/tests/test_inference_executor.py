@@ -0,0 +1,43 @@
+import asyncio
+import os
+
+import pytest
+import torch
+
+from app.services.inference_executor import InferenceExecutor
+
+
+def test_forward_thread_gets_the_process_share_of_cores():
+    executor = InferenceExecutor(max_workers=2, processes=1)
+    cores = os.cpu_count() or 1
+
+    async def run():
+        forward = await executor.run(torch.get_num_threads, forward=True)
+        decode = await executor.run(torch.get_num_threads)
+        return forward, decode
+
+    try:
+        forward, decode = asyncio.run(run())
+    finally:
+        executor.shutdown()
+    assert forward == executor.forward_torch_threads == cores
+    assert decode == executor.torch_threads == max(1, cores // 2)
+
+
+def test_only_successful_calls_count_as_completed():
+    executor = InferenceExecutor(max_workers=1)
+
+    def fail():
+        raise ValueError("bad image")
+
+    async def run():
+        await executor.run(sum, [1, 2])
+        with pytest.raises(ValueError):
+            await executor.run(fail)
+
+    try:
+        asyncio.run(run())
+    finally:
+        executor.shutdown()
+    stats = executor.stats()
+    assert (stats["completed"], stats["failed"], stats["in_flight"]) == (1, 1, 0)
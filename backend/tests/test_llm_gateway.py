@@ -0,0 +1,73 @@
+import asyncio
+
+import pytest
+
+from app.api.streaming import relay_text
+from app.services.llm_gateway import FakeBackend, LLMGateway
+from app.services.llm_service import LLMService
+
+
+def backend(latency_ms=1.0, tokens=5, token_ms=1.0):
+    return FakeBackend(latency_ms=latency_ms, distribution="fixed", token_ms=token_ms, tokens=tokens)
+
+
+def released(gateway):
+    return gateway.in_flight == 0 and gateway.waiting == 0 and not gateway._users \
+        and gateway._global._value == gateway.max_concurrency
+
+
+def test_per_user_and_global_limits():
+    gateway = LLMGateway(backend(latency_ms=20.0, tokens=1), max_concurrency=3, per_user_concurrency=1)
+
+    async def run():
+        await asyncio.gather(*[gateway.complete("hi", user_id=i % 2) for i in range(6)])
+        await asyncio.gather(*[gateway.complete("hi", user_id=i) for i in range(6)])
+
+    asyncio.run(run())
+    assert gateway.peak_in_flight == 3
+    assert released(gateway)
+
+
+def test_stream_closed_early_releases_its_slot():
+    gateway = LLMGateway(backend(tokens=50), max_concurrency=1)
+
+    async def run():
+        stream = gateway.stream("hi", user_id=7)
+        await stream.__anext__()
+        assert gateway.in_flight == 1
+        await stream.aclose()
+        assert released(gateway)
+        # The slot is free for the next call
+        assert (await gateway.complete("hi", user_id=7)).startswith("[fake]")
+
+    asyncio.run(run())
+
+
+def test_stream_waiting_for_a_slot_times_out_cleanly():
+    gateway = LLMGateway(backend(latency_ms=300.0, tokens=1), max_concurrency=1)
+
+    async def run():
+        busy = asyncio.ensure_future(gateway.complete("hi"))
+        await asyncio.sleep(0.01)
+        with pytest.raises(asyncio.TimeoutError):
+            async for _ in gateway.stream("hi", user_id=1, first_chunk_timeout=0.05):
+                pass
+        await busy
+
+    asyncio.run(run())
+    assert gateway.timeouts == 1
+    assert released(gateway)
+
+
+def test_client_disconnect_releases_the_gateway_slot():
+    gateway = LLMGateway(backend(tokens=50), max_concurrency=2)
+    service = LLMService(gateway)
+
+    async def run():
+        events = relay_text(service.stream_chat_response([], "hi", user_id=3))
+        await events.__anext__()
+        assert gateway.in_flight == 1
+        await events.aclose()
+        assert released(gateway)
+
+    asyncio.run(run())
@@ -0,0 +1,87 @@
+import asyncio
+
+from app.api.streaming import relay_text, sse_event
+from app.core.config import settings
+from app.services.advice_cache import advice_cache
+from app.services.llm_gateway import FakeBackend, LLMGateway
+from app.services.llm_service import LLMService
+
+MEAL = {"food_name": "Pizza", "portion_size": "1 slice", "calories": 285, "protein": 12, "carbs": 36, "fats": 10}
+PROFILE = {"goal": "lose weight", "preferences": "low carb", "language": "en"}
+
+
+def fast_backend(**kwargs):
+    return FakeBackend(latency_ms=1, distribution="fixed", token_ms=0, tokens=5, **kwargs)
+
+
+async def collect(chunks):
+    return [chunk async for chunk in chunks]
+
+
+async def _words(*words):
+    for word in words:
+        yield word
+
+
+def test_relay_text_ends_with_the_assembled_text():
+    events = asyncio.run(collect(relay_text(_words("a", " b"))))
+    assert events[:2] == [sse_event({"delta": "a"}), sse_event({"delta": " b"})]
+    assert events[-1] == sse_event({"text": "a b"}, event="done")
+
+
+def test_stream_text_completes_only_when_clean():
+    service = LLMService(LLMGateway(fast_backend()))
+    completed = []
+
+    async def failing():
+        yield "partial"
+        raise RuntimeError("boom")
+
+    async def slow():
+        raise asyncio.TimeoutError()
+        yield ""
+
+    clean = asyncio.run(collect(service._stream_text(_words("a", " b"), "timeout", "error", completed.append)))
+    assert clean == ["a", " b"] and completed == ["a b"]
+
+    failed = asyncio.run(collect(service._stream_text(failing(), "timeout", "error", completed.append)))
+    assert failed[-1] == "\n\nerror: boom"
+    timed_out = asyncio.run(collect(service._stream_text(slow(), "timeout", "error", completed.append)))
+    assert timed_out == ["timeout"]
+    assert completed == ["a b"]
+
+
+def test_stream_dietary_analysis_persists_only_real_advice(monkeypatch):
+    monkeypatch.setattr(settings, "ADVICE_CACHE_ENABLED", False)
+    saved = []
+
+    service = LLMService(LLMGateway(fast_backend()))
+    text = "".join(asyncio.run(collect(service.stream_dietary_analysis(MEAL, PROFILE, on_complete=saved.append))))
+    assert text.startswith("[fake]") and saved == [text]
+
+    broken = LLMService(LLMGateway(fast_backend(error_rate=1.0)))
+    asyncio.run(collect(broken.stream_dietary_analysis(MEAL, PROFILE, on_complete=saved.append)))
+    assert saved == [text]
+
+    # Vertex without GEMINI_API_KEY streams the mock text, which is not advice
+    vertex = fast_backend()
+    vertex.name = "vertex"
+    mock = LLMService(LLMGateway(vertex))
+    mock.api_key = None
+    chunks = asyncio.run(collect(mock.stream_dietary_analysis(MEAL, PROFILE, on_complete=saved.append)))
+    assert chunks[0].startswith("AI Analysis (Mock")
+    assert saved == [text]
+
+
+def test_stream_dietary_analysis_fills_cache_and_persists_cached_advice(monkeypatch):
+    monkeypatch.setattr(settings, "ADVICE_CACHE_ENABLED", True)
+    monkeypatch.setattr(advice_cache, "variants", 1)
+    advice_cache.cache.clear()
+    saved = []
+
+    service = LLMService(LLMGateway(fast_backend()))
+    first = "".join(asyncio.run(collect(service.stream_dietary_analysis(MEAL, PROFILE, on_complete=saved.append))))
+    second = "".join(asyncio.run(collect(service.stream_dietary_analysis(MEAL, PROFILE, on_complete=saved.append))))
+    assert first == second
+    assert saved == [first, first]
+    advice_cache.cache.clear()
@@ -0,0 +1,38 @@
+from app.services import upstream
+from app.services.upstream import CircuitBreaker
+
+
+def test_circuit_breaker_transitions(monkeypatch):
+    now = [100.0]
+    monkeypatch.setattr(upstream.time, "monotonic", lambda: now[0])
+    breaker = CircuitBreaker(failure_threshold=3, reset_seconds=30.0)
+
+    # Closed until the threshold of consecutive failures; a success resets the count
+    breaker.record_failure()
+    breaker.record_failure()
+    breaker.record_success()
+    breaker.record_failure()
+    breaker.record_failure()
+    assert breaker.state == "closed" and breaker.allow()
+    breaker.record_failure()
+    assert breaker.state == "open"
+    assert not breaker.allow() and breaker.rejected == 1
+
+    # After reset_seconds exactly one probe goes through
+    now[0] += 30.0
+    assert breaker.state == "half_open"
+    assert breaker.allow()
+    assert not breaker.allow() and breaker.rejected == 2
+
+    # A failed probe reopens it for another reset_seconds
+    breaker.record_failure()
+    assert breaker.state == "open"
+    now[0] += 29.0
+    assert not breaker.allow()
+    now[0] += 1.0
+    assert breaker.allow()
+
+    # A successful probe closes it
+    breaker.record_success()
+    assert breaker.state == "closed" and breaker.failures == 0
+    assert breaker.allow() and breaker.allow()
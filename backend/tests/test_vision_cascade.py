@@ -0,0 +1,75 @@
+import torch
+
+from app.core.config import settings
+from app.models.food_classifier import CompactFoodClassifier, FoodClassifier
+from app.services.vision_service import VisionService
+
+
+def confident_fast_model():
+    # Always answers class 0 with near-certainty, so the cascade keeps every row
+    model = CompactFoodClassifier("resnet18", pretrained=False)
+    torch.nn.init.zeros_(model.backbone.fc.weight)
+    torch.nn.init.zeros_(model.backbone.fc.bias)
+    model.backbone.fc.bias.data[0] = 20.0
+    return model.eval()
+
+
+def service(with_gate: bool) -> VisionService:
+    vision = VisionService()
+    vision.device = torch.device("cpu")
+    vision.categories = [f"class_{i}" for i in range(101)]
+    model = FoodClassifier(pretrained=False, with_gate=with_gate).eval()
+    if with_gate:
+        # Gate says non-food for everything
+        torch.nn.init.zeros_(model.gate.weight)
+        model.gate.bias.data = torch.tensor([10.0, -10.0])
+    vision.model = model
+    vision.fast_model = confident_fast_model()
+    return vision
+
+
+def images(n: int = 2):
+    return [torch.randn(3, 224, 224) for _ in range(n)]
+
+
+def test_cascade_keeps_confident_rows_without_gate(monkeypatch):
+    monkeypatch.setattr(settings, "VISION_EMBEDDINGS_ENABLED", False)
+    vision = service(with_gate=False)
+    predictions = vision._predict_batch(images())
+    assert [p["stage"] for p in predictions] == ["fast", "fast"]
+    assert all(p["is_food"] and p["class_id"] == 0 for p in predictions)
+    assert vision.stage_counts == {"fast": 2, "full": 0}
+
+
+def test_gate_checks_every_row_when_cascade_is_loaded(monkeypatch):
+    monkeypatch.setattr(settings, "VISION_EMBEDDINGS_ENABLED", False)
+    vision = service(with_gate=True)
+    predictions = vision._predict_batch(images())
+    assert [p["stage"] for p in predictions] == ["full", "full"]
+    assert all(p["is_food"] is False and p["food_probability"] < 0.01 for p in predictions)
+    assert vision.stage_counts == {"fast": 0, "full": 2}
+
+
+class DeviceTensor(torch.Tensor):
+    """Stands in for a CUDA/MPS tensor: numpy() fails until it is copied with .cpu()."""
+
+    def cpu(self):
+        return self.as_subclass(torch.Tensor)
+
+    def numpy(self, *args, **kwargs):
+        raise TypeError("can't convert cuda:0 device type tensor to numpy")
+
+
+def test_embeddings_are_copied_to_the_cpu(monkeypatch):
+    monkeypatch.setattr(settings, "VISION_EMBEDDINGS_ENABLED", True)
+    vision = service(with_gate=False)
+    vision.fast_model = None
+    forward = vision._forward
+
+    def device_forward(batch):
+        logits, gate_logits, features = forward(batch)
+        return logits, gate_logits, features.as_subclass(DeviceTensor)
+
+    monkeypatch.setattr(vision, "_forward", device_forward)
+    predictions = vision._predict_batch(images())
+    assert all(p["embedding"].dtype == "float16" and p["embedding"].shape == (2048,) for p in predictions)
@@ -0,0 +1,53 @@
+import api from './axios';
+
+// POSTs (or GETs, without a body) to a Server-Sent Events endpoint and calls
+// onDelta with each text chunk as it arrives. Resolves with the full text
+// from the final `done` event. EventSource can't send the auth header, hence fetch.
+export async function streamText(path, { method = 'POST', body, onDelta } = {}) {
+    const token = localStorage.getItem('token');
+    const response = await fetch(`${api.defaults.baseURL}${path}`, {
+        method,
+        headers: {
+            'Content-Type': 'application/json',
+            ...(token ? { Authorization: `Bearer ${token}` } : {}),
+        },
+        body: body ? JSON.stringify(body) : undefined,
+    });
+
+    if (response.status === 401) {
+        localStorage.removeItem('token');
+        localStorage.removeItem('user');
+        window.location.href = '/login';
+    }
+    if (!response.ok) {
+        throw new Error(`Stream request failed with status ${response.status}`);
+    }
+
+    const reader = response.body.getReader();
+    const decoder = new TextDecoder();
+    let buffer = '';
+    let text = '';
+    for (;;) {
+        const { value, done } = await reader.read();
+        if (done) break;
+        buffer += decoder.decode(value, { stream: true });
+
+        let boundary;
+        while ((boundary = buffer.indexOf('\n\n')) !== -1) {
+            const rawEvent = buffer.slice(0, boundary);
+            buffer = buffer.slice(boundary + 2);
+
+            let event = 'message';
+            let data = '';
+            for (const line of rawEvent.split('\n')) {
+                if (line.startsWith('event: ')) event = line.slice(7);
+                else if (line.startsWith('data: ')) data += line.slice(6);
+            }
+            const payload = JSON.parse(data);
+            if (event === 'done') return payload.text;
+            text += payload.delta;
+            onDelta?.(payload.delta, text);
+        }
+    }
+    return text;
+}
@@ -3,6 +3,7 @@ import { Send, User, Bot, Sparkles, Loader, Volume2, Square } from 'lucide-react
 import ReactMarkdown from 'react-markdown';
 import clsx from 'clsx';
 import api from '../api/axios';
+import { streamText } from '../api/stream';
 import { useAuth } from '../context/AuthContext';
 
 export default function Chat() {
@@ -21,6 +22,8 @@ export default function Chat() {
     const [messages, setMessages] = useState([
         { id: 1, role: 'assistant', text: GREETINGS.en }
     ]);
+    // Server-side chat session, created with the first message; the server keeps the history
+    const [sessionId, setSessionId] = useState(null);
     const [loading, setLoading] = useState(false);
     const [input, setInput] = useState('');
     const [speakingId, setSpeakingId] = useState(null);
@@ -83,23 +86,32 @@ export default function Chat() {
         if (!input.trim() || loading) return;
 
         const userMsg = { id: Date.now(), role: 'user', text: input };
-        const updatedMessages = [...messages, userMsg];
-        setMessages(updatedMessages);
+        setMessages(prev => [...prev, userMsg]);
         setInput('');
         setLoading(true);
 
+        // The reply is streamed into this message as it is generated
+        const botId = Date.now() + 1;
+        const setBotText = (text) => setMessages(prev => {
+            const others = prev.filter(m => m.id !== botId);
+            return [...others, { id: botId, role: 'assistant', text }];
+        });
+
         try {
-            const response = await api.post('/chat/message', {
-                message: userMsg.text,
-                history: updatedMessages.map(({ role, text }) => ({ role, text }))
+            let id = sessionId;
+            if (!id) {
+                const { data } = await api.post('/chat/sessions', {});
+                id = data.id;
+                setSessionId(id);
+            }
+            const reply = await streamText(`/chat/sessions/${id}/messages/stream`, {
+                body: { message: userMsg.text },
+                onDelta: (_, text) => setBotText(text),
             });
-
-            const botMsg = { id: Date.now() + 1, role: 'assistant', text: response.data.response };
-            setMessages(prev => [...prev, botMsg]);
+            setBotText(reply);
         } catch (error) {
             console.error(error);
-            const errorMsg = { id: Date.now() + 1, role: 'assistant', text: "Sorry, I'm having trouble connecting to the server." };
-            setMessages(prev => [...prev, errorMsg]);
+            setBotText("Sorry, I'm having trouble connecting to the server.");
         } finally {
             setLoading(false);
         }
@@ -1,4 +1,4 @@
-import { useState, useRef } from 'react';
+import { useState, useRef, useEffect } from 'react';
 import ReactMarkdown from 'react-markdown';
 import { Upload as UploadIcon, X, Loader, Camera, CheckCircle, AlertCircle, MessageSquare } from 'lucide-react';
 import api from '../api/axios';
@@ -12,6 +12,30 @@ export default function UploadPage() {
     const [error, setError] = useState(null);
     const fileInputRef = useRef(null);
 
+    // Advice is generated in the background after upload; poll until it's ready
+    const analysisPending = result?.meal && ['pending', 'running'].includes(result.analysis_status);
+    useEffect(() => {
+        if (!analysisPending) return;
+        const mealId = result.meal.id;
+        const timer = setInterval(async () => {
+            try {
+                const { data } = await api.get(`/meals/${mealId}/analysis`);
+                if (data.status === 'done' || data.status === 'failed') {
+                    setResult(prev => prev?.meal?.id === mealId ? {
+                        ...prev,
+                        analysis_status: data.status,
+                        advice: data.status === 'done'
+                            ? data.analysis_text
+                            : "Sorry, the coach couldn't analyze this meal right now.",
+                    } : prev);
+                }
+            } catch (err) {
+                console.error(err);
+            }
+        }, 1500);
+        return () => clearInterval(timer);
+    }, [analysisPending, result?.meal?.id]);
+
     const handleFileChange = (e) => {
         const selected = e.target.files[0];
         if (selected) {
@@ -161,9 +185,16 @@ export default function UploadPage() {
                             </div>
                             <h3 className="font-semibold text-text-main">Coach's Insight</h3>
                         </div>
-                        <div className="prose prose-sm prose-emerald dark:prose-invert max-w-none text-text-main prose-headings:text-text-main prose-strong:text-text-main leading-relaxed">
-                            <ReactMarkdown>{result.advice}</ReactMarkdown>
-                        </div>
+                        {analysisPending ? (
+                            <div className="flex items-center gap-2 text-text-muted text-sm">
+                                <Loader className="animate-spin" size={16} />
+                                Your coach is reviewing this meal...
+                            </div>
+                        ) : (
+                            <div className="prose prose-sm prose-emerald dark:prose-invert max-w-none text-text-main prose-headings:text-text-main prose-strong:text-text-main leading-relaxed">
+                                <ReactMarkdown>{result.advice}</ReactMarkdown>
+                            </div>
+                        )}
                     </div>
                 </div>
             )}